@@ -0,0 +1,89 @@
+from collections import Counter
+from collections.abc import Mapping
+
+# Heading texts listed per level and direction; counts are always complete
+MAX_HEADING_CHANGES = 50
+
+
+def _change(before, after):
+    if before == after:
+        return None
+    change = {'from': before, 'to': after}
+    if isinstance(before, (int, float)) and isinstance(after, (int, float)):
+        change['delta'] = round(after - before, 4)
+    return change
+
+
+def _section(analysis, name):
+    section = analysis.get(name)
+    return section if isinstance(section, Mapping) else {}
+
+
+def _heading_changes(before, after):
+    before = before.get('structure') or {}
+    after = after.get('structure') or {}
+    added, removed = {}, {}
+    for level in sorted(set(before) | set(after)):
+        old, new = Counter(before.get(level, [])), Counter(after.get(level, []))
+        for target, texts in ((added, new - old), (removed, old - new)):
+            if texts:
+                listed = list(texts.elements())
+                target[level] = {'count': len(listed), 'texts': listed[:MAX_HEADING_CHANGES]}
+    return {'added': added, 'removed': removed} if added or removed else None
+
+
+def diff_analyses(previous, current):
+    """What changed between two analyses of the same URL.
+
+    Only changed fields are included: seo_score and the score of every
+    section that has one, title and meta description text, headings added
+    or removed per level (as multisets, so a duplicated heading counts),
+    image alt coverage and word count. An empty dict means nothing changed.
+    """
+    changes = {}
+    score = _change(previous.get('seo_score'), current.get('seo_score'))
+    if score:
+        changes['seo_score'] = score
+
+    scores = {}
+    categories = [name for name, section in current.items() if isinstance(section, Mapping) and 'score' in section]
+    for category in categories:
+        change = _change(_section(previous, category).get('score'), _section(current, category).get('score'))
+        if change:
+            scores[category] = change
+    if scores:
+        changes['scores'] = scores
+
+    for name in ('title', 'meta_description'):
+        change = _change(_section(previous, name).get('text'), _section(current, name).get('text'))
+        if change:
+            changes[name] = change
+
+    headings = _heading_changes(_section(previous, 'headings'), _section(current, 'headings'))
+    if headings:
+        changes['headings'] = headings
+
+    before, after = _section(previous, 'images'), _section(current, 'images')
+    images = {}
+    for field in ('alt_ratio', 'total_images', 'images_with_alt'):
+        change = _change(before.get(field), after.get(field))
+        if change:
+            images[field] = change
+    if images:
+        changes['images'] = images
+
+    word_count = _change(_section(previous, 'content').get('word_count'), _section(current, 'content').get('word_count'))
+    if word_count:
+        changes['word_count'] = word_count
+    return changes
+
+
+def rescored_changes(changes, previous_score, current_score):
+    """changes with its seo_score entry recomputed after either analysis was re-scored"""
+    changes = dict(changes)
+    score = _change(previous_score, current_score)
+    if score:
+        changes['seo_score'] = score
+    else:
+        changes.pop('seo_score', None)
+    return changes
@@ -1,40 +1,73 @@
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import jwt
 from datetime import datetime, timedelta
+import logging
 import os
-from database import db, User, SEOAnalysis
-from seo_analyzer import SEOAnalyzer
-from gemini_integration import GeminiSEOAssistant
+import time
+from database import (db, User, SEOAnalysis, AnalysisJob, analysis_diff, configure_database, migrate_schema,
+                      save_analysis)
+from seo_analyzer import SEOAnalyzer, ANALYZER_VERSION, get_parse_pool
+from gemini_integration import GeminiSEOAssistant, is_fallback
 import json
-from gemini_chatbot import GeminiChatbot
+from gemini_chatbot import GeminiChatbot, ERROR_REPLIES
+from chat_context import create_chat_context
+from cache import content_key, create_analysis_cache
+from crawler import SiteCrawler
+from duplicates import create_duplicate_index
+from link_checker import get_link_checker
+from results import encode_json, extend_json
+from simhash import from_signed, to_hex
+from auth import create_rate_limiter, init_auth, rate_limited, require_auth
+from history import HistoryQueryError, parse_history_params, parse_trend_params, query_history, query_trend
+from jobs import JobQueue, QueueFull, job_to_dict, stream_job_events
+from telemetry import configure_logging, init_telemetry, render_metrics, span, trace
 
 load_dotenv()
+configure_logging()
+logger = logging.getLogger('app')
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret')
 
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///seo_analyzer.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-db.init_app(app)
-CORS(app)
+configure_database(app)
+init_telemetry(app)
+token_verifier = init_auth(app)
+# Per-user limits on the routes that fetch pages or call Gemini; per-client on login
+analyze_limiter = create_rate_limiter('ANALYZE', 10, 5)
+# Charged one token per URL of a batch, on top of the request's analyze token
+batch_limiter = create_rate_limiter('BATCH', 100, 500)
+chat_limiter = create_rate_limiter('CHATBOT', 30, 10)
+login_limiter = create_rate_limiter('LOGIN', 10, 5)
+CORS(app, expose_headers=['X-Cache', 'X-Cache-Key', 'X-Next-Cursor', 'Retry-After', 'X-Request-ID',
+                          'X-Profile-File'])
 
-seo_analyzer = SEOAnalyzer()
+link_checker = get_link_checker()
+seo_analyzer = SEOAnalyzer(link_checker=link_checker)
 try:
     gemini_assistant = GeminiSEOAssistant()
 except:
     gemini_assistant = None
-    print("Gemini API not configured - AI suggestions will be limited")
+    logger.warning("Gemini API not configured - AI suggestions will be limited")
 
 gemini_chatbot = GeminiChatbot()
+chat_context = create_chat_context()
+
+analysis_cache = create_analysis_cache()
+duplicate_index = create_duplicate_index()
 
 with app.app_context():
-    db.create_all()
+    migrate_schema()
 
 @app.route('/api/register', methods=['POST'])
 def register():
+    limited = rate_limited(login_limiter, f'register:{request.remote_addr}')
+    if limited is not None:
+        return limited
+    
     data = request.get_json()
     
     if User.query.filter_by(username=data['username']).first():
@@ -53,6 +86,11 @@ def register():
 
 @app.route('/api/login', methods=['POST'])
 def login():
+    # Checked before the deliberately slow password hash
+    limited = rate_limited(login_limiter, f'login:{request.remote_addr}')
+    if limited is not None:
+        return limited
+    
     data = request.get_json()
     user = User.query.filter_by(username=data['username']).first()
     
@@ -73,127 +111,473 @@ def login():
     
     return jsonify({'error': 'Invalid credentials'}), 401
 
-@app.route('/api/analyze', methods=['POST'])
-def analyze_seo():
-   
-    token = request.headers.get('Authorization')
-    if not token:
-        return jsonify({'error': 'No token provided'}), 401
+def get_ai_suggestions(analysis):
+    if gemini_assistant:
+        ai_suggestions = gemini_assistant.generate_seo_suggestions(analysis)
+        if not isinstance(ai_suggestions, dict):
+            logger.error("AI suggestions are not a dict", extra={'type': type(ai_suggestions).__name__})
+        return ai_suggestions
     
-    try:
-        token = token.split(' ')[1] 
-        data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-        user_id = data['user_id']
-    except:
-        return jsonify({'error': 'Invalid token'}), 401
-    
-    url = request.get_json()['url']
+    logger.warning("Gemini assistant not available")
     
-    try:
-        
-        print(f"🔍 Analyzing URL: {url}")
-        analysis = seo_analyzer.analyze_page(url)
-        print(f"✅ SEO analysis completed. Score: {analysis.get('seo_score', 'N/A')}")
-        
+    return {
+        "fallback": True,
+        "priority_issues": [
+            {
+                "issue": "AI Analysis Unavailable",
+                "recommendation": "Gemini API not configured. Please check the manual analysis above.",
+                "impact": "Use the detailed scores to identify priority areas",
+                "difficulty": "easy"
+            }
+        ],
+        "quick_wins": [
+            "Review title tag length (should be 50-60 characters)",
+            "Optimize meta description (150-160 characters)",
+            "Add alt text to images",
+            "Check heading structure"
+        ],
+        "overall_assessment": "Manual SEO analysis completed. Configure Gemini API for AI-powered suggestions."
+    }
+
+def run_analysis(user_id, url, progress=None, check_links=False):
+    """Fetch, analyze, get AI suggestions and persist; shared by the sync and job endpoints.
+
+    Returns (analysis, encoded, cache_hit, cache_key). encoded is the
+    response body: the analysis is encoded to JSON once, those bytes are
+    compressed into the stored payload, and analysis_id, changes, duplicates
+    and timings are appended to them without encoding the analysis again.
+
+    The response carries 'timings', the milliseconds spent in each stage of
+    this run. They are not stored or cached. check_links adds the
+    link_health section, cached separately from plain analyses.
+    """
+    started = time.perf_counter()
+    with trace() as timings:
+        with span('fetch'):
+            page = seo_analyzer.scrape_page(url)
+        if progress:
+            progress('fetched')
+        version = f'{ANALYZER_VERSION}/{seo_analyzer.scoring.version}' + ('+links' if check_links else '')
+        cache_key = content_key(url, page.body, version)
+        with span('cache'):
+            cached = analysis_cache.get(cache_key) if analysis_cache is not None else None
         
-        if gemini_assistant:
-            print("🤖 Getting AI suggestions...")
-            ai_suggestions = gemini_assistant.generate_seo_suggestions(analysis)
-            
-           
-            print(f"🔍 AI suggestions type: {type(ai_suggestions)}")
-            if isinstance(ai_suggestions, dict):
-                print(f"✅ AI suggestions is dict with keys: {list(ai_suggestions.keys())}")
-            else:
-                print(f"❌ AI suggestions is not dict: {ai_suggestions}")
-            
-            analysis['ai_suggestions'] = ai_suggestions
+        if cached is not None:
+            analysis = cached
+            if progress:
+                progress('cached')
         else:
-            print("⚠️  Gemini assistant not available")
-            
-            analysis['ai_suggestions'] = {
-                "priority_issues": [
-                    {
-                        "issue": "AI Analysis Unavailable",
-                        "recommendation": "Gemini API not configured. Please check the manual analysis above.",
-                        "impact": "Use the detailed scores to identify priority areas",
-                        "difficulty": "easy"
-                    }
-                ],
-                "quick_wins": [
-                    "Review title tag length (should be 50-60 characters)",
-                    "Optimize meta description (150-160 characters)",
-                    "Add alt text to images",
-                    "Check heading structure"
-                ],
-                "overall_assessment": "Manual SEO analysis completed. Configure Gemini API for AI-powered suggestions."
-            }
+            analysis = seo_analyzer.analyze_html(page.body, url, page.encoding, progress=progress,
+                                                 check_links=check_links)
+            with span('ai'):
+                analysis['ai_suggestions'] = get_ai_suggestions(analysis)
+            if progress:
+                progress('ai_done')
+            # Placeholder suggestions are not cached, so a repeat audit asks the API again
+            if analysis_cache is not None and not is_fallback(analysis['ai_suggestions']):
+                analysis_cache.set(cache_key, analysis)
         
+        analysis = dict(analysis, fetch=page.to_dict())
         
-        seo_analysis = SEOAnalysis(
-            user_id=user_id,
-            url=url,
-            seo_score=analysis['seo_score'],
-            analysis_data=json.dumps(analysis)
-        )
-        db.session.add(seo_analysis)
-        db.session.commit()
+        with span('encode'):
+            encoded = encode_json(analysis)
+        with span('persist'):
+            seo_analysis, diff = save_analysis(user_id, url, analysis, encoded)
+        with span('duplicates'):
+            duplicates = duplicate_index.find_duplicates(seo_analysis) if duplicate_index is not None else None
+        with span('persist'):
+            db.session.commit()
+    extra = {
+        'analysis_id': seo_analysis.id,
+        'changes': diff.to_dict() if diff else None,
+        'duplicates': duplicates,
+        'timings': dict(timings, total=round((time.perf_counter() - started) * 1000, 3))
+    }
+    analysis.update(extra)
+    
+    logger.info("analysis saved", extra={
+        'url': url, 'analysis_id': seo_analysis.id, 'seo_score': analysis.get('seo_score'),
+        'cache_hit': cached is not None, 'timings': extra['timings']
+    })
+    return analysis, extend_json(encoded, extra), cached is not None, cache_key
+
+def run_analysis_job(user_id, payload, progress):
+    _, encoded, _, _ = run_analysis(user_id, payload['url'], progress=progress,
+                                    check_links=payload.get('check_links', False))
+    return encoded
+
+def run_crawl_job(user_id, payload, progress):
+    crawler = SiteCrawler(
+        seo_analyzer,
+        payload['url'],
+        max_pages=payload['max_pages'],
+        max_depth=payload['max_depth'],
+        sitemap_url=payload.get('sitemap_url'),
+        workdir=app.instance_path
+    )
+    try:
+        return crawler.crawl(progress=progress)
+    finally:
+        crawler.close()
+
+job_queue = JobQueue(
+    app,
+    runners={'analyze': run_analysis_job, 'crawl': run_crawl_job},
+    workers=int(os.environ.get('JOB_WORKERS', '4')),
+    max_depth=int(os.environ.get('JOB_QUEUE_MAX_DEPTH', '50'))
+)
+
+@app.route('/api/analyze', methods=['POST'])
+@require_auth(limiter=analyze_limiter)
+def analyze_seo():
+    user_id = g.user_id
+    
+    data = request.get_json()
+    url = data['url']
+    
+    try:
+        _, encoded, cache_hit, cache_key = run_analysis(user_id, url, check_links=bool(data.get('check_links')))
         
-        print("✅ Analysis saved to database")
-        return jsonify(analysis)
+        response = Response(encoded, mimetype='application/json')
+        response.headers['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+        response.headers['X-Cache-Key'] = cache_key[:16]
+        return response
     
     except Exception as e:
-        print(f"❌ Error in analyze_seo: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("analysis failed", extra={'url': url})
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/analyze/batch', methods=['POST'])
+@require_auth(limiter=analyze_limiter)
+def analyze_batch():
+    user_id = g.user_id
+    
+    urls = (request.get_json() or {}).get('urls')
+    if not isinstance(urls, list) or not urls:
+        return jsonify({'error': 'No urls provided'}), 400
+    max_urls = int(os.environ.get('BATCH_MAX_URLS', '500'))
+    if len(urls) > max_urls:
+        return jsonify({'error': f'At most {max_urls} urls per batch'}), 400
+    urls = list(dict.fromkeys(urls))
+    limited = rate_limited(batch_limiter, f'user:{user_id}', cost=len(urls))
+    if limited is not None:
+        return limited
+    
+    def generate():
+        rows = []
+        failed = 0
+        started = time.perf_counter()
+        pool = get_parse_pool()
+        for analysis in seo_analyzer.analyze_many(urls, processes=0 if pool is None else None, pool=pool):
+            if 'error' in analysis:
+                failed += 1
+                yield encode_json(analysis) + b"\n"
+                continue
+            # Encoded once without timings: the same bytes are stored and streamed
+            timings = analysis.pop('timings', None)
+            encoded = encode_json(analysis)
+            rows.append((analysis, encoded))
+            yield extend_json(encoded, {'timings': timings}) + b"\n"
+        
+        # Saved together at the end so the write transaction stays short
+        with span('persist'):
+            saved = [save_analysis(user_id, analysis['url'], analysis, encoded)[0] for analysis, encoded in rows]
+            db.session.commit()
+        duplicates = None
+        if duplicate_index is not None:
+            duplicates = []
+            # After the commit, so the lookups do not hold the write transaction open
+            with span('duplicates'):
+                for row in saved:
+                    found = duplicate_index.find_duplicates(row)
+                    if found:
+                        duplicates.append({'url': row.url, 'analysis_id': row.id, 'duplicates': found})
+        elapsed = time.perf_counter() - started
+        logger.info("batch analyzed", extra={
+            'urls': len(urls), 'saved': len(rows), 'failed': failed, 'elapsed_s': round(elapsed, 3)
+        })
+        yield encode_json({'summary': {
+            'total': len(urls),
+            'succeeded': len(rows),
+            'failed': failed,
+            'elapsed': round(elapsed, 3),
+            'pages_per_sec': round(len(urls) / elapsed, 2) if elapsed else None,
+            'duplicates': duplicates
+        }}) + b"\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/analyze/jobs', methods=['POST'])
+@require_auth(limiter=analyze_limiter)
+def submit_analysis_job():
+    user_id = g.user_id
+    
+    data = request.get_json() or {}
+    url = data.get('url')
+    if not url:
+        return jsonify({'error': 'No url provided'}), 400
+    
+    try:
+        job = job_queue.submit(user_id, 'analyze', {'url': url, 'check_links': bool(data.get('check_links'))})
+    except QueueFull as e:
+        response = jsonify({'error': 'Analysis queue is full, please retry later', 'retry_after': e.retry_after})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    
+    response = jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f"/api/analyze/jobs/{job.id}",
+        'events_url': f"/api/analyze/jobs/{job.id}/events"
+    })
+    response.headers['Location'] = f"/api/analyze/jobs/{job.id}"
+    return response, 202
+
+@app.route('/api/crawl', methods=['POST'])
+@require_auth(limiter=analyze_limiter)
+def submit_crawl():
+    user_id = g.user_id
+    
+    data = request.get_json() or {}
+    if not data.get('url'):
+        return jsonify({'error': 'No url provided'}), 400
+    
+    payload = {
+        'url': data['url'],
+        'sitemap_url': data.get('sitemap_url'),
+        'max_pages': min(int(data.get('max_pages', 500)), int(os.environ.get('CRAWL_MAX_PAGES', '50000'))),
+        'max_depth': min(int(data.get('max_depth', 3)), 10)
+    }
+    try:
+        job = job_queue.submit(user_id, 'crawl', payload)
+    except QueueFull as e:
+        response = jsonify({'error': 'Analysis queue is full, please retry later', 'retry_after': e.retry_after})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    
+    response = jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f"/api/analyze/jobs/{job.id}",
+        'events_url': f"/api/analyze/jobs/{job.id}/events"
+    })
+    response.headers['Location'] = f"/api/analyze/jobs/{job.id}"
+    return response, 202
+
+@app.route('/api/analyze/jobs/<job_id>', methods=['GET'])
+@require_auth()
+def get_analysis_job(job_id):
+    user_id = g.user_id
+    
+    job = AnalysisJob.query.filter_by(id=job_id, user_id=user_id).first()
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_to_dict(job))
+
+@app.route('/api/analyze/jobs/<job_id>/events', methods=['GET'])
+@require_auth(allow_query_token=True)
+def stream_analysis_job(job_id):
+    user_id = g.user_id
+    
+    if not AnalysisJob.query.filter_by(id=job_id, user_id=user_id).first():
+        return jsonify({'error': 'Job not found'}), 404
+    
+    events = stream_with_context(stream_job_events(job_queue, job_id))
+    return Response(events, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def collect_stats():
+    return {
+        'analysis_cache': analysis_cache.stats() if analysis_cache is not None else None,
+        'ai_suggestions': gemini_assistant.stats() if gemini_assistant else None,
+        'job_queue': {'depth': job_queue.queued(), 'process_depth': job_queue.depth(),
+                      'workers': job_queue.workers},
+        'link_checker': link_checker.stats(),
+        'duplicate_index': duplicate_index.stats() if duplicate_index is not None else None,
+        'auth': {
+            'token_cache': token_verifier.stats(),
+            'rate_limits': {limiter.name: limiter.stats()
+                            for limiter in (analyze_limiter, batch_limiter, chat_limiter, login_limiter)
+                            if limiter is not None}
+        }
+    }
+
+@app.route('/api/stats', methods=['GET'])
+@require_auth()
+def get_stats():
+    return jsonify(collect_stats())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Scraped by Prometheus, so no user JWT; protect with METRICS_TOKEN when exposed
+    metrics_token = os.environ.get('METRICS_TOKEN')
+    if metrics_token and request.headers.get('Authorization') != f'Bearer {metrics_token}':
+        return jsonify({'error': 'Invalid token'}), 401
+    return Response(render_metrics(collect_stats()), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/history', methods=['GET'])
+@require_auth()
 def get_analysis_history():
-    token = request.headers.get('Authorization')
-    if not token:
-        return jsonify({'error': 'No token provided'}), 401
+    user_id = g.user_id
     
     try:
-        token = token.split(' ')[1]
-        data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-        user_id = data['user_id']
-    except:
-        return jsonify({'error': 'Invalid token'}), 401
+        params = parse_history_params(request.args)
+    except HistoryQueryError as e:
+        return jsonify({'error': str(e)}), 400
     
-    analyses = SEOAnalysis.query.filter_by(user_id=user_id).order_by(SEOAnalysis.created_at.desc()).limit(10).all()
+    history, next_cursor = query_history(user_id, params)
     
-    history = []
-    for analysis in analyses:
-        history.append({
-            'id': analysis.id,
-            'url': analysis.url,
-            'seo_score': analysis.seo_score,
-            'created_at': analysis.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        })
+    response = jsonify(history)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@app.route('/api/history/<int:analysis_id>', methods=['GET'])
+@require_auth()
+def get_analysis_detail(analysis_id):
+    user_id = g.user_id
+    
+    row = SEOAnalysis.query.filter_by(id=analysis_id, user_id=user_id).first()
+    analysis = row.load_analysis() if row else None
+    if analysis is None:
+        return jsonify({'error': 'Analysis not found'}), 404
+    
+    analysis['analysis_id'] = row.id
+    analysis['created_at'] = row.created_at.strftime('%Y-%m-%d %H:%M:%S')
+    return jsonify(analysis)
+
+@app.route('/api/history/<int:analysis_id>/diff', methods=['GET'])
+@require_auth()
+def get_analysis_diff(analysis_id):
+    user_id = g.user_id
+    
+    row = SEOAnalysis.query.filter_by(id=analysis_id, user_id=user_id).first()
+    if row is None:
+        return jsonify({'error': 'Analysis not found'}), 404
+    
+    diff = analysis_diff(row)
+    if diff is None:
+        return jsonify({'error': 'No earlier analysis of this URL'}), 404
+    return jsonify(diff.to_dict())
+
+@app.route('/api/history/<int:analysis_id>/duplicates', methods=['GET'])
+@require_auth()
+def get_analysis_duplicates(analysis_id):
+    user_id = g.user_id
+    
+    if duplicate_index is None:
+        return jsonify({'error': 'Duplicate detection is disabled'}), 404
+    row = SEOAnalysis.query.filter_by(id=analysis_id, user_id=user_id).first()
+    if row is None:
+        return jsonify({'error': 'Analysis not found'}), 404
     
-    return jsonify(history)
+    try:
+        limit = min(int(request.args.get('limit', duplicate_index.limit)), 100)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    return jsonify({
+        'analysis_id': row.id,
+        'url': row.url,
+        'fingerprint': to_hex(from_signed(row.content_simhash)),
+        'duplicates': duplicate_index.find_duplicates(row, limit=limit)
+    })
+
+@app.route('/api/trends', methods=['GET'])
+@require_auth()
+def get_trend():
+    user_id = g.user_id
+    
+    try:
+        params = parse_trend_params(request.args)
+    except HistoryQueryError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(query_trend(user_id, params))
+
+def prepare_chat(user_id, req_data):
+    """Return ((report summary, conversation key, conversation, rendered history), None) or (None, error response)"""
+    summary = None
+    analysis_id = req_data.get('analysis_id')
+    if analysis_id is not None:
+        try:
+            analysis_id = int(analysis_id)
+        except (TypeError, ValueError):
+            return None, (jsonify({'error': 'Invalid analysis_id'}), 400)
+        
+        def load_analysis():
+            row = SEOAnalysis.query.filter_by(id=analysis_id, user_id=user_id).first()
+            return row.load_analysis() if row else None
+        
+        summary = chat_context.report_summary(user_id, analysis_id, load_analysis)
+        if summary is None:
+            return None, (jsonify({'error': 'Analysis not found'}), 404)
+    elif req_data.get('seo_report'):
+        summary = chat_context.inline_summary(req_data['seo_report'])
+    
+    key = chat_context.conversation_key(user_id, req_data.get('conversation_id'))
+    if req_data.get('reset'):
+        chat_context.reset(key)
+    conversation = chat_context.load(key)
+    return (summary, key, conversation, chat_context.render_history(conversation)), None
 
 @app.route('/api/chatbot', methods=['POST'])
+@require_auth(limiter=chat_limiter)
 def chatbot():
-    token = request.headers.get('Authorization')
-    if not token:
-        return jsonify({'error': 'No token provided'}), 401
-    try:
-        token = token.split(' ')[1]
-        data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-        user_id = data['user_id']
-    except:
-        return jsonify({'error': 'Invalid token'}), 401
+    user_id = g.user_id
     req_data = request.get_json()
     user_message = req_data.get('message')
-    seo_report = req_data.get('seo_report')  
     if not user_message:
         return jsonify({'error': 'No message provided'}), 400
     
+    context, error = prepare_chat(user_id, req_data)
+    if error:
+        return error
+    summary, key, conversation, history = context
     
-    response = gemini_chatbot.ask(user_message)
+    with span('chatbot'):
+        response = gemini_chatbot.ask(user_message, summary, history)
+    if response['reply'] not in ERROR_REPLIES.values():
+        chat_context.record(key, conversation, user_message, response['reply'])
     return jsonify(response)
 
+@app.route('/api/chatbot/stream', methods=['POST'])
+@require_auth(limiter=chat_limiter)
+def chatbot_stream():
+    user_id = g.user_id
+    
+    req_data = request.get_json() or {}
+    user_message = req_data.get('message')
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
+    
+    context, error = prepare_chat(user_id, req_data)
+    if error:
+        return error
+    summary, key, conversation, history = context
+    
+    def generate():
+        pieces = []
+        failed = False
+        for piece in gemini_chatbot.ask_stream(user_message, summary, history):
+            pieces.append(piece)
+            failed = failed or piece in ERROR_REPLIES.values()
+            yield f"event: delta\ndata: {json.dumps({'text': piece})}\n\n"
+        reply = ''.join(pieces)
+        if not failed:
+            chat_context.record(key, conversation, user_message, reply)
+        yield f"event: done\ndata: {json.dumps({'reply': reply})}\n\n"
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+if os.environ.get('JOB_QUEUE_AUTOSTART', '1') == '1':
+    job_queue.ensure_started()
+
 if __name__ == '__main__':
+    # Pool processes would re-import this script as their __main__, so the dev server parses batches inline
+    os.environ.setdefault('BATCH_PROCESSES', '0')
     app.run(debug=True)
\ No newline at end of file
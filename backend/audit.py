@@ -0,0 +1,284 @@
+"""Offline SEO audit of pages stored on disk, without the API, auth or fetching.
+
+Runs the SEOAnalyzer pipeline over HTML files, directory trees and WARC
+archives (see page_sources.py) on a process pool, and writes one result
+per page as NDJSON (the full analysis, as the API returns it) or CSV (the
+scores). Results are written in input order, so the output can be resumed:
+every --checkpoint-every pages the output is flushed and the number of
+pages written and the output size are saved to <output>.checkpoint.
+--resume truncates the output to the checkpointed size and carries on
+from there.
+
+Usage (from backend/):
+    python audit.py crawl/ site.warc.gz -o audit.ndjson [--format ndjson|csv] [--workers N]
+        [--base-url https://example.com/] [--keywords] [--resume]
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from page_sources import iter_pages, open_mapped
+from results import encode_json
+from scoring import CATEGORIES
+from seo_analyzer import SEOAnalyzer
+
+CSV_COLUMNS = ['source', 'url', 'seo_score', 'score_profile'] + [f'{category}_score' for category in CATEGORIES] + [
+    'title', 'word_count', 'error']
+
+_worker_analyzer = None
+
+
+class CheckpointError(Exception):
+    pass
+
+
+def _csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue().encode('utf-8')
+
+
+def csv_header():
+    return _csv_line(CSV_COLUMNS)
+
+
+def _init_worker(extractor, keywords):
+    global _worker_analyzer
+    _worker_analyzer = SEOAnalyzer(extractor=extractor, keywords=keywords)
+
+
+def _format(analysis, output_format):
+    if output_format == 'ndjson':
+        return encode_json(analysis) + b'\n'
+    row = {'source': analysis.get('source'), 'url': analysis.get('url'), 'seo_score': analysis.get('seo_score'),
+           'score_profile': analysis.get('score_profile'), 'error': analysis.get('error')}
+    for category in CATEGORIES:
+        section = analysis.get(category)
+        row[f'{category}_score'] = section.get('score') if section is not None else None
+    if 'title' in analysis:
+        row['title'] = analysis['title']['text']
+        row['word_count'] = analysis['content']['word_count']
+    return _csv_line([row.get(column) for column in CSV_COLUMNS])
+
+
+def analyze_record(record, output_format):
+    """(ok, output line) for one PageRecord; runs in the pool workers"""
+    if record.error is not None:
+        return False, _format({'source': record.source, 'url': record.url, 'error': record.error}, output_format)
+    body = None
+    try:
+        # The extractor reads the mapping in chunks, so the file is never copied whole
+        body = record.body if record.path is None else open_mapped(record.path)
+        if not len(body):
+            return False, _format({'source': record.source, 'url': record.url, 'error': 'Empty page'}, output_format)
+        analysis = _worker_analyzer.analyze_html(body, record.url, record.encoding)
+    except Exception as e:
+        return False, _format({'source': record.source, 'url': record.url, 'error': str(e)}, output_format)
+    finally:
+        if record.path is not None and hasattr(body, 'close'):
+            body.close()
+    return True, _format(dict(analysis, source=record.source), output_format)
+
+
+def run_ordered(records, output_format, workers, extractor, keywords):
+    """(record, ok, line) in input order, with at most a few pages per worker in flight"""
+    if workers == 0:
+        _init_worker(extractor, keywords)
+        for record in records:
+            yield (record,) + analyze_record(record, output_format)
+        return
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(extractor, keywords))
+    try:
+        pending = deque()
+        for record in records:
+            pending.append((record, pool.submit(analyze_record, record, output_format)))
+            if len(pending) >= workers * 4:
+                record, future = pending.popleft()
+                yield (record,) + future.result()
+        while pending:
+            record, future = pending.popleft()
+            yield (record,) + future.result()
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+class Checkpoint:
+    """Position of a run in <output>.checkpoint: pages written, output size and the last source"""
+
+    def __init__(self, path, settings):
+        self.path = path
+        self.settings = settings
+        self.done = 0
+        self.offset = 0
+        self.last_source = None
+
+    def load(self):
+        with open(self.path) as f:
+            state = json.load(f)
+        if state['settings'] != self.settings:
+            raise CheckpointError(f"{self.path} was written for other inputs or options: {state['settings']}")
+        self.done, self.offset, self.last_source = state['done'], state['offset'], state['last_source']
+
+    def save(self):
+        state = {'settings': self.settings, 'done': self.done, 'offset': self.offset,
+                 'last_source': self.last_source}
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(self.path + '.tmp', self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def skip_done(records, done, last_source):
+    """records after the first done; fails if the inputs changed since the checkpoint was written"""
+    skipped = 0
+    for record in records:
+        if skipped < done:
+            skipped += 1
+            if skipped == done and record.source != last_source:
+                raise CheckpointError(f"Inputs changed since the checkpoint: page {skipped} is {record.source}, "
+                                      f"not {last_source}")
+            continue
+        yield record
+    if skipped < done:
+        raise CheckpointError(f"Inputs changed since the checkpoint: only {skipped} of {done} pages left")
+
+
+class Progress:
+    """Pages/sec readout on stderr, refreshed at most every interval seconds"""
+
+    def __init__(self, stream=sys.stderr, interval=None):
+        self.stream = stream
+        self.interactive = stream.isatty()
+        # A log file gets a line every 10 s, a terminal an updating line every second
+        self.interval = interval if interval is not None else (1.0 if self.interactive else 10.0)
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.pages = 0
+        self.errors = 0
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.pages / elapsed if elapsed else 0.0
+
+    def update(self, ok):
+        self.pages += 1
+        self.errors += not ok
+        now = time.perf_counter()
+        if now - self.last >= self.interval:
+            self.last = now
+            self._write(f"{self.pages} pages  {self.rate():.1f} pages/sec  {self.errors} errors")
+
+    def _write(self, line):
+        if self.interactive:
+            self.stream.write(f"\r{line}\033[K")
+        else:
+            self.stream.write(line + '\n')
+        self.stream.flush()
+
+    def finish(self, resumed=0):
+        elapsed = time.perf_counter() - self.started
+        if self.interactive:
+            self.stream.write('\n')
+        self.stream.write(f"{self.pages} pages in {elapsed:.1f} s ({self.rate():.1f} pages/sec), {self.errors} errors"
+                          + (f", {resumed} done before resuming" if resumed else '') + '\n')
+
+
+def audit(paths, output, output_format='ndjson', workers=None, extractor='auto', keywords=False, base_url=None,
+          resume=False, checkpoint_every=1000, progress=None):
+    """Analyze every page under paths into output; returns (pages analyzed now, errors)"""
+    workers = os.cpu_count() if workers is None else workers
+    records = iter_pages(paths, base_url=base_url)
+    progress = progress or Progress()
+    to_stdout = output == '-'
+    checkpoint = None
+    if not to_stdout:
+        settings = {'inputs': [os.path.abspath(path) for path in paths], 'format': output_format,
+                    'base_url': base_url, 'keywords': keywords}
+        checkpoint = Checkpoint(output + '.checkpoint', settings)
+        if resume and os.path.exists(checkpoint.path):
+            checkpoint.load()
+            records = skip_done(records, checkpoint.done, checkpoint.last_source)
+    elif resume:
+        raise CheckpointError("--resume needs an output file")
+
+    if to_stdout:
+        out = sys.stdout.buffer
+    elif checkpoint.done:
+        out = open(output, 'r+b')
+        out.truncate(checkpoint.offset)
+        out.seek(checkpoint.offset)
+    else:
+        out = open(output, 'wb')
+    resumed = checkpoint.done if checkpoint else 0
+    try:
+        if output_format == 'csv' and not resumed:
+            out.write(csv_header())
+        for record, ok, line in run_ordered(records, output_format, workers, extractor, keywords):
+            out.write(line)
+            progress.update(ok)
+            if checkpoint is not None:
+                checkpoint.done += 1
+                checkpoint.last_source = record.source
+                if checkpoint.done % checkpoint_every == 0:
+                    out.flush()
+                    checkpoint.offset = out.tell()
+                    checkpoint.save()
+    except BaseException:
+        # Everything written so far is kept, whether the run was interrupted or hit a bad input
+        if checkpoint is not None and progress.pages:
+            out.flush()
+            checkpoint.offset = out.tell()
+            checkpoint.save()
+            progress.stream.write(f"\nStopped after {checkpoint.done} pages; continue with --resume\n")
+        raise
+    finally:
+        if not to_stdout:
+            out.close()
+    if checkpoint is not None:
+        checkpoint.remove()
+    progress.finish(resumed)
+    return progress.pages, progress.errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='HTML files, directories or WARC archives (.warc, .warc.gz)')
+    parser.add_argument('-o', '--output', required=True, help="output file, or - for stdout")
+    parser.add_argument('--format', choices=('ndjson', 'csv'), default=None,
+                        help='default: from the output extension, else ndjson')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='parser processes (default: all cores; 0 analyzes in this process)')
+    parser.add_argument('--extractor', choices=('auto', 'lxml', 'stdlib'), default='auto')
+    parser.add_argument('--keywords', action='store_true', help='run the spaCy keyword stage (slow)')
+    parser.add_argument('--base-url', help='URL of the input directory, for internal/external link counts')
+    parser.add_argument('--resume', action='store_true', help='continue from <output>.checkpoint')
+    parser.add_argument('--checkpoint-every', type=int, default=1000)
+    args = parser.parse_args()
+
+    from telemetry import configure_logging
+    configure_logging()
+    output_format = args.format or ('csv' if args.output.lower().endswith('.csv') else 'ndjson')
+    try:
+        audit(args.paths, args.output, output_format, workers=args.workers, extractor=args.extractor,
+              keywords=args.keywords, base_url=args.base_url, resume=args.resume,
+              checkpoint_every=args.checkpoint_every)
+    except (CheckpointError, FileNotFoundError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import jwt
+from flask import current_app, g, jsonify, request
+
+
+class TokenVerifier:
+    """Verifies JWTs, remembering recently verified tokens in a small LRU.
+
+    A cached token is trusted until its own exp claim or max_age seconds,
+    whichever comes first, so a cache hit never outlives the token. Failed
+    verifications are not cached.
+    """
+
+    def __init__(self, secret, max_entries=1024, max_age=300):
+        self.secret = secret
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    def verify(self, token):
+        """Return the token's user_id, or None if it is invalid or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                user_id, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return user_id
+                del self._entries[token]
+            self.misses += 1
+
+        try:
+            data = jwt.decode(token, self.secret, algorithms=['HS256'])
+            user_id = data['user_id']
+        except (jwt.InvalidTokenError, KeyError):
+            with self._lock:
+                self.failures += 1
+            return None
+
+        expires_at = min(data.get('exp', now + self.max_age), now + self.max_age)
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[token] = (user_id, expires_at)
+                self._entries.move_to_end(token)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return user_id
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'failures': self.failures,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None
+            }
+
+
+class RateLimiter:
+    """Per-key token bucket: burst requests at once, refilled at rate_per_min.
+
+    Buckets live in this process only, so with several gunicorn workers a
+    client can get up to workers x the configured rate. A bucket that has
+    refilled completely is the same as no bucket, so those are dropped to
+    keep memory bounded by the number of recently active keys.
+    """
+
+    def __init__(self, rate_per_min, burst, name='default'):
+        self.name = name
+        self.rate = rate_per_min / 60.0
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+        self.allowed = 0
+        self.limited = 0
+
+    def allow(self, key, cost=1):
+        """Take cost tokens for key; return (allowed, seconds until there are enough).
+
+        A cost above burst needs, and empties, a full bucket.
+        """
+        cost = min(cost, self.burst)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                self.allowed += 1
+                allowed, retry_after = True, 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                self.limited += 1
+                allowed, retry_after = False, (cost - tokens) / self.rate
+            if now - self._last_prune > 60:
+                self._prune(now)
+        return allowed, retry_after
+
+    def _prune(self, now):
+        self._buckets = {
+            key: (tokens, updated) for key, (tokens, updated) in self._buckets.items()
+            if tokens + (now - updated) * self.rate < self.burst
+        }
+        self._last_prune = now
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate_per_min': round(self.rate * 60, 2),
+                'burst': self.burst,
+                'active_keys': len(self._buckets),
+                'allowed': self.allowed,
+                'limited': self.limited
+            }
+
+
+def create_rate_limiter(prefix, rate_per_min, burst):
+    """Build a limiter from <prefix>_RATE_PER_MIN and <prefix>_BURST; a rate of 0 disables it"""
+    rate = float(os.environ.get(f'{prefix}_RATE_PER_MIN', rate_per_min))
+    if rate <= 0:
+        return None
+    return RateLimiter(rate, int(os.environ.get(f'{prefix}_BURST', burst)), name=prefix.lower())
+
+
+def init_auth(app):
+    """Attach the token verifier to app, sized by AUTH_TOKEN_CACHE_SIZE and AUTH_TOKEN_CACHE_TTL"""
+    verifier = TokenVerifier(
+        app.config['SECRET_KEY'],
+        max_entries=int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', '1024')),
+        max_age=int(os.environ.get('AUTH_TOKEN_CACHE_TTL', '300'))
+    )
+    app.extensions['auth'] = verifier
+    return verifier
+
+
+def rate_limited(limiter, key, cost=1):
+    """Return a 429 response if key is over limiter's rate, else None"""
+    if limiter is None:
+        return None
+    allowed, retry_after = limiter.allow(key, cost)
+    if allowed:
+        return None
+    response = jsonify({'error': 'Too many requests, please slow down'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response
+
+
+def _request_token(allow_query_token):
+    header = request.headers.get('Authorization')
+    if header:
+        parts = header.split(' ')
+        return parts[1] if len(parts) > 1 else None
+    if allow_query_token:
+        # EventSource cannot set headers, so SSE endpoints also accept ?token=
+        return request.args.get('token')
+    return None
+
+
+def require_auth(limiter=None, allow_query_token=False):
+    """Route decorator: verify the JWT, set g.user_id, then apply the per-user rate limit"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            token = _request_token(allow_query_token)
+            if not token:
+                return jsonify({'error': 'No token provided'}), 401
+            user_id = current_app.extensions['auth'].verify(token)
+            if user_id is None:
+                return jsonify({'error': 'Invalid token'}), 401
+            limited = rate_limited(limiter, f'user:{user_id}')
+            if limited is not None:
+                return limited
+            g.user_id = user_id
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
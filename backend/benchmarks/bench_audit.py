@@ -0,0 +1,72 @@
+"""Throughput of the offline audit CLI (audit.py) on files and WARC archives.
+
+Writes --pages copies of the benchmark corpus (benchmarks/pages/) to a
+temporary directory, once as HTML files and once as a .warc.gz archive
+(one gzip member per record, with request records in between), then runs
+audit.audit() over each input with the pages analyzed in this process
+(--workers 0) and on a process pool of --workers processes.
+
+Usage (from backend/):
+    python -m benchmarks.bench_audit [--pages 400] [--workers N]
+"""
+
+import argparse
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from audit import Progress, audit
+from benchmarks.corpus import load_corpus
+
+
+def warc_record(kind, url, block):
+    content_type = b'application/http; msgtype=' + kind
+    return (b'WARC/1.0\r\nWARC-Type: ' + kind + b'\r\nWARC-Target-URI: ' + url.encode() +
+            b'\r\nContent-Type: ' + content_type + b'\r\nContent-Length: ' + str(len(block)).encode() +
+            b'\r\n\r\n' + block + b'\r\n\r\n')
+
+
+def write_inputs(workdir, pages):
+    corpus = [html.encode('utf-8') if isinstance(html, str) else html for _, html in sorted(load_corpus().items())]
+    site = os.path.join(workdir, 'site')
+    os.makedirs(site)
+    with gzip.open(os.path.join(workdir, 'crawl.warc.gz'), 'wb') as warc:
+        for index in range(pages):
+            html = corpus[index % len(corpus)]
+            with open(os.path.join(site, f'page{index:05d}.html'), 'wb') as f:
+                f.write(html)
+            url = f'https://example.com/page{index}'
+            warc.write(warc_record(b'request', url, b'GET /page%d HTTP/1.1\r\nHost: example.com\r\n\r\n' % index))
+            warc.write(warc_record(b'response', url, b'HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n'
+                                   b'Content-Length: %d\r\n\r\n' % len(html) + html))
+    return site, os.path.join(workdir, 'crawl.warc.gz')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=400)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-audit-')
+    try:
+        site, warc = write_inputs(workdir, args.pages)
+        output = os.path.join(workdir, 'audit.ndjson')
+        print(f"{args.pages} pages, {os.cpu_count()} cores\n")
+        print(f"{'input':<12}{'workers':>8}{'seconds':>10}{'pages/sec':>12}")
+        for label, path in (('html files', site), ('warc.gz', warc)):
+            for workers in (0, args.workers):
+                start = time.perf_counter()
+                pages, errors = audit([path], output, workers=workers, progress=Progress(stream=io.StringIO()))
+                elapsed = time.perf_counter() - start
+                assert pages == args.pages and errors == 0, (pages, errors)
+                print(f"{label:<12}{workers:>8}{elapsed:>10.2f}{pages / elapsed:>12.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Per-request cost of authentication and rate limiting.
+
+Micro timings (per call):
+  jwt.decode         the inline decode every protected route used to run
+  verifier miss      TokenVerifier.verify with the LRU disabled
+  verifier hit       TokenVerifier.verify for a recently verified token
+  rate limiter       RateLimiter.allow for one user
+
+End to end (Flask test client, per request) on a trivial JSON view:
+  none               no authentication at all, the framework floor
+  inline             header split + jwt.decode + bare except, as before
+  require_auth       the decorator with a warm token cache
+  require_auth+rl    the decorator plus a (never exhausted) rate limiter
+
+Usage (from backend/):
+    python -m benchmarks.bench_auth [--calls 20000] [--requests 3000]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import jwt
+from flask import Flask, g, jsonify, request
+
+from auth import RateLimiter, TokenVerifier, init_auth, require_auth
+
+SECRET = 'bench-secret'
+
+
+def per_call(func, calls):
+    func()
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def create_app():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = SECRET
+    init_auth(app)
+    limiter = RateLimiter(1e9, 1e9, name='bench')
+
+    @app.route('/none')
+    def no_auth():
+        return jsonify({'user_id': 1})
+
+    @app.route('/inline')
+    def inline():
+        token = request.headers.get('Authorization')
+        if not token:
+            return jsonify({'error': 'No token provided'}), 401
+        try:
+            token = token.split(' ')[1]
+            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+            user_id = data['user_id']
+        except:
+            return jsonify({'error': 'Invalid token'}), 401
+        return jsonify({'user_id': user_id})
+
+    @app.route('/decorated')
+    @require_auth()
+    def decorated():
+        return jsonify({'user_id': g.user_id})
+
+    @app.route('/limited')
+    @require_auth(limiter)
+    def limited():
+        return jsonify({'user_id': g.user_id})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=20000, help='calls per micro timing')
+    parser.add_argument('--requests', type=int, default=3000, help='requests per end-to-end timing')
+    args = parser.parse_args()
+
+    token = jwt.encode({'user_id': 1, 'exp': datetime.utcnow() + timedelta(days=1)}, SECRET)
+    cold = TokenVerifier(SECRET, max_entries=0)
+    warm = TokenVerifier(SECRET)
+    limiter = RateLimiter(1e9, 1e9)
+
+    print(f"{'micro':<20}{'us/call':>10}")
+    for label, func in (
+        ('jwt.decode', lambda: jwt.decode(token, SECRET, algorithms=['HS256'])),
+        ('verifier miss', lambda: cold.verify(token)),
+        ('verifier hit', lambda: warm.verify(token)),
+        ('rate limiter', lambda: limiter.allow('user:1')),
+    ):
+        print(f"{label:<20}{per_call(func, args.calls):>10.2f}")
+
+    client = create_app().test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    print(f"\n{'end to end':<20}{'us/req':>10}{'auth us':>10}")
+    floor = None
+    for label, path in (('none', '/none'), ('inline', '/inline'),
+                        ('require_auth', '/decorated'), ('require_auth+rl', '/limited')):
+        assert client.get(path, headers=headers).status_code == 200
+        cost = per_call(lambda: client.get(path, headers=headers), args.requests)
+        floor = cost if floor is None else floor
+        print(f"{label:<20}{cost:>10.1f}{cost - floor:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Batch analysis throughput against the local fixture server.
+
+Compares sequential analyze_page calls with analyze_many (concurrent fetch,
+process-pool parsing) and prints pages/sec for each.
+
+Usage (from backend/):
+    python -m benchmarks.bench_batch [--pages 200] [--processes N]
+"""
+
+import argparse
+import time
+
+from benchmarks.fixture_server import FixtureServer
+from seo_analyzer import SEOAnalyzer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--fetch-workers', type=int, default=16)
+    parser.add_argument('--per-host', type=int, default=8)
+    args = parser.parse_args()
+
+    analyzer = SEOAnalyzer()
+    names = ['landing', 'article', 'catalog', 'malformed']
+
+    with FixtureServer() as server:
+        # Distinct query strings so every URL is fetched in full
+        urls = [server.url(f"{names[i % len(names)]}?n={i}") for i in range(args.pages)]
+
+        start = time.perf_counter()
+        for url in urls[:max(1, args.pages // 4)]:
+            analyzer.analyze_page(url)
+        sequential = (time.perf_counter() - start) / max(1, args.pages // 4)
+        print(f"sequential analyze_page   {1 / sequential:8.1f} pages/sec")
+
+        start = time.perf_counter()
+        results = list(analyzer.analyze_many(urls, fetch_workers=args.fetch_workers,
+                                             per_host=args.per_host, processes=args.processes))
+        elapsed = time.perf_counter() - start
+        errors = sum(1 for result in results if 'error' in result)
+        print(f"analyze_many              {len(results) / elapsed:8.1f} pages/sec "
+              f"({len(results)} pages, {errors} errors, {elapsed:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
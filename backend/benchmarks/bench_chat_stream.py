@@ -0,0 +1,78 @@
+"""Chatbot time-to-first-token: streaming ask_stream() vs blocking ask().
+
+Runs both against the local Gemini stub, which starts answering after
+--latency-ms and then produces the reply in --chunks pieces --chunk-ms
+apart. For ask() the first visible text is the whole reply; for
+ask_stream() it is the first formatted piece. Also checks that the streamed
+pieces join to exactly the reply ask() returns.
+
+Usage (from backend/):
+    python -m benchmarks.bench_chat_stream [--latency-ms 150] [--chunks 40] [--chunk-ms 50] [--repeat 3]
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from benchmarks.gemini_stub import GeminiStub
+
+REPLY = (
+    "Twinkle's Response: Great question! Here is where I would start.\n\n"
+    "<strong>Meta description:</strong> yours is only 81 characters.\n"
+    "- Aim for 120-160 characters\n"
+    "- Put the main keyword near the start\n\n"
+    "<strong>Readability:</strong> sentences are long and dense.<br>\n"
+    "1. Split sentences over 25 words\n"
+    "2. Use subheadings every few paragraphs\n\n\n"
+    "Fixing these two should lift your score noticeably. "
+) * 4
+
+
+def measure_blocking(chatbot):
+    start = time.perf_counter()
+    reply = chatbot.ask("How can I improve my page?")['reply']
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, reply
+
+
+def measure_streaming(chatbot):
+    start = time.perf_counter()
+    first = None
+    pieces = []
+    for piece in chatbot.ask_stream("How can I improve my page?"):
+        if first is None:
+            first = time.perf_counter() - start
+        pieces.append(piece)
+    return first, time.perf_counter() - start, ''.join(pieces)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency-ms', type=int, default=150, help='stub time to first token')
+    parser.add_argument('--chunks', type=int, default=40)
+    parser.add_argument('--chunk-ms', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault('GEMINI_API_KEY2', 'stub-key')
+    from gemini_chatbot import GeminiChatbot
+
+    with GeminiStub(latency_ms=args.latency_ms, reply=REPLY, chunks=args.chunks, chunk_ms=args.chunk_ms) as stub:
+        chatbot = GeminiChatbot(endpoint=stub.endpoint())
+        replies = {}
+        print(f"{'mode':<12}{'first text ms':>15}{'complete ms':>14}")
+        for label, measure in (('blocking', measure_blocking), ('streaming', measure_streaming)):
+            runs = [measure(chatbot) for _ in range(args.repeat)]
+            replies[label] = runs[-1][2]
+            print(f"{label:<12}{statistics.median(run[0] for run in runs) * 1000:>15.0f}"
+                  f"{statistics.median(run[1] for run in runs) * 1000:>14.0f}")
+
+    same = replies['blocking'] == replies['streaming']
+    print(f"streamed reply identical to blocking reply: {same} ({len(replies['streaming'])} characters)")
+    if not same:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Near-duplicate lookups in a SimHashIndex at the scale of one large client.
+
+Builds an index of --entries random 64-bit fingerprints, a tenth of them
+planted near-duplicates (1 to 3 bits flipped from another entry), and
+measures:
+
+  build      SimHashIndex.extend() of all entries at once (the first load
+             of a user's index) and its memory
+  add        add() one by one for --adds more entries (new analyses),
+             merges included
+  lookup     latency of --queries lookups, p50/p99, against a linear scan
+             of every fingerprint for the first --scans of them, which also
+             checks that the banded lookup finds exactly the same matches
+  simhash    time to fingerprint the main text of each corpus page
+
+Usage (from backend/):
+    python -m benchmarks.bench_duplicates [--entries 300000] [--queries 2000] [--adds 5000] [--scans 100]
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks.corpus import load_corpus
+from html_extractor import get_extractor
+from simhash import BITS, MAX_DISTANCE, SimHashIndex, distance, simhash
+
+
+def near(rng, fingerprint):
+    for bit in rng.sample(range(BITS), rng.randint(1, MAX_DISTANCE)):
+        fingerprint ^= 1 << bit
+    return fingerprint
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=300000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--adds', type=int, default=5000)
+    parser.add_argument('--scans', type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    fingerprints = []
+    for _ in range(args.entries):
+        if fingerprints and rng.random() < 0.1:
+            fingerprints.append(near(rng, rng.choice(fingerprints)))
+        else:
+            fingerprints.append(rng.getrandbits(BITS))
+
+    index = SimHashIndex()
+    start = time.perf_counter()
+    index.extend(enumerate(fingerprints, 1))
+    build = time.perf_counter() - start
+    print(f"{'build':<10}{args.entries} entries in {build:.2f} s, "
+          f"{index.memory_bytes() / 2 ** 20:.1f} MB ({index.memory_bytes() / len(index):.0f} bytes/entry)")
+
+    start = time.perf_counter()
+    for analysis_id in range(args.entries + 1, args.entries + args.adds + 1):
+        index.add(analysis_id, near(rng, rng.choice(fingerprints)) if rng.random() < 0.5 else rng.getrandbits(BITS))
+    add = time.perf_counter() - start
+    print(f"{'add':<10}{add / args.adds * 1e6:.0f} us per entry, merges included")
+
+    all_fingerprints = list(zip(index.fingerprints, index.ids))
+    queries = [near(rng, rng.choice(fingerprints)) if rng.random() < 0.5 else rng.getrandbits(BITS)
+               for _ in range(args.queries)]
+    latencies, scans = [], []
+    mismatches = found = 0
+    for number, query in enumerate(queries):
+        start = time.perf_counter()
+        matches = index.lookup(query)
+        latencies.append(time.perf_counter() - start)
+        found += len(matches)
+        if number >= args.scans:
+            continue
+        start = time.perf_counter()
+        expected = [(bits, analysis_id) for bits, analysis_id in
+                    ((distance(query, fingerprint), analysis_id) for fingerprint, analysis_id in all_fingerprints)
+                    if bits <= MAX_DISTANCE]
+        scans.append(time.perf_counter() - start)
+        expected.sort(key=lambda match: (match[0], -match[1]))
+        mismatches += matches != expected
+    p50, p99 = (statistics.quantiles(latencies, n=100)[q - 1] * 1000 for q in (50, 99))
+    scan = statistics.median(scans) * 1000
+    print(f"{'lookup':<10}p50 {p50:.3f} ms  p99 {p99:.3f} ms   linear scan {scan:.1f} ms   "
+          f"{scan / p50:.0f}x\n{'':<10}{found} matches; {mismatches} of {len(scans)} scanned queries differ")
+
+    extractor = get_extractor()
+    for name, html in sorted(load_corpus().items()):
+        text = extractor.extract(html).main_text
+        start = time.perf_counter()
+        simhash(text)
+        print(f"{'simhash':<10}{name:<11}{len(text.split()):>7} words  {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
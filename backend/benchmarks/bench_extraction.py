@@ -0,0 +1,67 @@
+"""Compare parse+analyze time of the extraction backends on the fixture corpus.
+
+Usage (from backend/):
+    python -m benchmarks.bench_extraction [--repeat 5] [--scale 1]
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.corpus import build_corpus
+from html_extractor import etree
+from seo_analyzer import SEOAnalyzer
+
+
+def available_backends():
+    backends = []
+    try:
+        import bs4  # noqa: F401
+        backends.append('soup')
+    except ImportError:
+        pass
+    backends.append('stdlib')
+    if etree is not None:
+        backends.append('lxml')
+    return backends
+
+
+def time_backend(backend, pages, repeat):
+    analyzer = SEOAnalyzer(extractor=backend)
+    results = {}
+    for name, html in pages.items():
+        body = html.encode('utf-8')
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            analysis = analyzer.analyze_html(body, 'https://example.com/' + name)
+            samples.append(time.perf_counter() - start)
+        results[name] = (statistics.median(samples), analysis['seo_score'])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scale', type=int, default=1, help='repeat each page body this many times')
+    args = parser.parse_args()
+
+    pages = build_corpus()
+    if args.scale > 1:
+        pages = {name: html.replace('</body>', html.split('<body>', 1)[1].split('</body>', 1)[0] * (args.scale - 1) + '</body>')
+                 for name, html in pages.items()}
+
+    backends = available_backends()
+    timings = {backend: time_backend(backend, pages, args.repeat) for backend in backends}
+
+    print(f"{'page':<12}{'size KB':>10}" + "".join(f"{backend + ' ms':>14}" for backend in backends) + f"{'score':>8}")
+    for name, html in pages.items():
+        row = f"{name:<12}{len(html) / 1024:>10.1f}"
+        for backend in backends:
+            row += f"{timings[backend][name][0] * 1000:>14.2f}"
+        row += f"{timings[backends[-1]][name][1]:>8}"
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Fetch-layer benchmark against the local fixture server.
+
+Compares bare requests.get (a new connection per call) with the pooled
+PageFetcher, and reports revalidation, gzip and Brotli compression and body-cap behaviour.
+
+Usage (from backend/):
+    python -m benchmarks.bench_fetch [--requests 50]
+"""
+
+import argparse
+import time
+
+import requests
+
+from benchmarks.fixture_server import FixtureServer
+from fetcher import PageFetcher, FetchError
+
+
+def bench_bare(url, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        requests.get(url, timeout=10).content
+    return (time.perf_counter() - start) / count
+
+
+def bench_pooled(fetcher, url, count):
+    start = time.perf_counter()
+    results = [fetcher.fetch(url) for _ in range(count)]
+    return (time.perf_counter() - start) / count, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    with FixtureServer() as server:
+        url = server.url('article')
+
+        bare = bench_bare(url, args.requests)
+        print(f"bare requests.get       {bare * 1000:8.2f} ms/page")
+
+        fetcher = PageFetcher(validator_cache_bytes=0)
+        pooled, results = bench_pooled(fetcher, url, args.requests)
+        print(f"pooled, no revalidation {pooled * 1000:8.2f} ms/page")
+        first = results[0].to_dict()
+        print(f"  first fetch timings   {first['timings']}  encoding={first['content_encoding']}")
+        print(f"  reused fetch timings  {results[-1].to_dict()['timings']}")
+
+        fetcher = PageFetcher()
+        revalidated, results = bench_pooled(fetcher, url, args.requests)
+        print(f"pooled + revalidation   {revalidated * 1000:8.2f} ms/page "
+              f"({sum(r.revalidated for r in results)} of {len(results)} answered with 304)")
+        assert all(r.body == results[0].body for r in results)
+
+        for encoding in ('gzip', 'br'):
+            response = requests.get(url, headers={'Accept-Encoding': encoding}, stream=True, timeout=10)
+            wire = response.raw.read(decode_content=False)
+            print(f"{encoding + ' on the wire':<24}{len(wire):8d} bytes "
+                  f"(Content-Encoding: {response.headers.get('Content-Encoding', 'identity')})")
+
+        capped = PageFetcher(max_body_bytes=256 * 1024).fetch(server.url('large?kb=2048'))
+        print(f"body cap                {len(capped.body)} bytes kept, truncated={capped.truncated}")
+
+        try:
+            fetcher.fetch(server.url('missing'))
+        except FetchError as e:
+            print(f"missing page            FetchError: {e}")
+
+        print(f"server stats            {server.handler.stats}")
+
+
+if __name__ == '__main__':
+    main()
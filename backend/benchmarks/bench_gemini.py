@@ -0,0 +1,65 @@
+"""AI suggestion layer: cache + single-flight + pooled session vs one POST per analysis.
+
+Replays a workload of repeated analyses (several users auditing the same
+pages at once) against the local Gemini stub. The baseline posts every
+prompt with a fresh connection, the way the assistant used to; the new path
+goes through GeminiSEOAssistant.generate_seo_suggestions.
+
+Usage (from backend/):
+    python -m benchmarks.bench_gemini [--requests 64] [--concurrency 8] [--latency-ms 200]
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.corpus import build_corpus
+from benchmarks.gemini_stub import GeminiStub
+from seo_analyzer import SEOAnalyzer
+
+
+def run(label, func, workload, concurrency, stub):
+    calls_before = stub.handler.stats['calls']
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(func, workload))
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for result in results if 'error' in result)
+    api_calls = stub.handler.stats['calls'] - calls_before
+    print(f"{label:<12}{elapsed:>10.2f} s{len(workload) / elapsed:>12.1f} req/s{api_calls:>10} API calls{failed:>8} failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency-ms', type=int, default=200, help='simulated Gemini response time')
+    args = parser.parse_args()
+
+    os.environ.setdefault('GEMINI_API_KEY', 'stub-key')
+    from gemini_integration import GeminiSEOAssistant
+
+    analyzer = SEOAnalyzer(keywords=False)
+    analyses = [analyzer.analyze_html(html, f'https://example.com/{name}') for name, html in build_corpus().items()]
+    workload = [analyses[index % len(analyses)] for index in range(args.requests)]
+    print(f"{args.requests} requests over {len(analyses)} distinct analyses, "
+          f"concurrency {args.concurrency}, stub latency {args.latency_ms} ms")
+
+    with GeminiStub(latency_ms=args.latency_ms) as stub:
+        baseline = GeminiSEOAssistant(endpoint=stub.endpoint())
+        # requests.post opens a new connection per call, as the assistant did before
+        baseline.session = requests
+        run('baseline', lambda analysis: baseline._request(baseline._format_prompt(analysis)),
+            workload, args.concurrency, stub)
+
+        assistant = GeminiSEOAssistant(endpoint=stub.endpoint())
+        run('cached', assistant.generate_seo_suggestions, workload, args.concurrency, stub)
+        print(json.dumps(assistant.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
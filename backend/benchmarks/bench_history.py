@@ -0,0 +1,164 @@
+"""Analysis history queries on a seeded SQLite database.
+
+Seeds --rows analyses spread over --users users (so the user being queried
+owns rows/users audits) and times the history queries three ways:
+
+  legacy   the old access path: no indexes, OFFSET paging, filters that
+           deserialize analysis_data for every one of the user's rows
+  no index the new keyset/summary-column queries with the indexes dropped
+  indexed  the new queries as /api/history runs them
+
+The database is kept between runs (--db) so seeding only happens once.
+
+Usage (from backend/):
+    python -m benchmarks.bench_history [--rows 1000000] [--users 20] [--repeat 5] [--db /tmp/bench_history.db]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import text
+
+from database import SCORE_CATEGORIES, SEOAnalysis, db, summary_columns
+from history import build_history_query, encode_cursor, parse_history_params
+
+USER_ID = 1
+DOMAINS = [f'site{i}.example.com' for i in range(200)]
+
+
+def fake_analysis(rng, url):
+    analysis = {'url': url}
+    for category in SCORE_CATEGORIES:
+        analysis[category] = {'score': rng.randint(0, 100), 'issues': ['Example issue'] * rng.randint(0, 3)}
+    analysis['seo_score'] = round(sum(analysis[c]['score'] for c in SCORE_CATEGORIES) / len(SCORE_CATEGORIES), 1)
+    analysis['ai_suggestions'] = {'suggestions': 'Lorem ipsum dolor sit amet. ' * 20}
+    return analysis
+
+
+def seed(rows, users, batch=20000):
+    rng = random.Random(42)
+    start = datetime(2023, 1, 1)
+    table = SEOAnalysis.__table__
+    with db.engine.begin() as conn:
+        conn.execute(text("INSERT INTO user (id, username, email) VALUES " + ", ".join(
+            f"({i}, 'user{i}', 'user{i}@example.com')" for i in range(1, users + 1))))
+    for offset in range(0, rows, batch):
+        values = []
+        for n in range(offset, min(rows, offset + batch)):
+            url = f'https://{rng.choice(DOMAINS)}/page-{n}'
+            analysis = fake_analysis(rng, url)
+            values.append(dict(
+                summary_columns(url, analysis),
+                user_id=n % users + 1,
+                url=url,
+                analysis_data=json.dumps(analysis),
+                created_at=start + timedelta(seconds=n * 30)
+            ))
+        with db.engine.begin() as conn:
+            conn.execute(table.insert(), values)
+        print(f"\rseeded {min(rows, offset + batch):,} rows", end='', flush=True)
+    print()
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+
+def keyset_page(params):
+    return lambda: build_history_query(USER_ID, params).all()
+
+
+def legacy_offset_page(offset):
+    return lambda: (SEOAnalysis.query.filter_by(user_id=USER_ID)
+                    .order_by(SEOAnalysis.created_at.desc()).offset(offset).limit(10).all())
+
+
+def legacy_blob_filter(predicate):
+    def run():
+        matches = []
+        rows = (SEOAnalysis.query.with_entities(SEOAnalysis.id, SEOAnalysis.analysis_data)
+                .filter_by(user_id=USER_ID).order_by(SEOAnalysis.created_at.desc()))
+        for row_id, data in rows:
+            if predicate(json.loads(data)):
+                matches.append(row_id)
+                if len(matches) == 10:
+                    break
+        return matches
+    return run
+
+
+def legacy_blob_sort(key):
+    def run():
+        rows = SEOAnalysis.query.with_entities(SEOAnalysis.id, SEOAnalysis.analysis_data).filter_by(user_id=USER_ID)
+        scored = [(key(json.loads(data)), row_id) for row_id, data in rows]
+        return sorted(scored, reverse=True)[:10]
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--db', default='/tmp/bench_history.db')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.abspath(args.db)}'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        existing = db.session.query(SEOAnalysis.id).count()
+        if existing != args.rows:
+            db.drop_all()
+            db.create_all()
+            seed(args.rows, args.users)
+        user_rows = SEOAnalysis.query.filter_by(user_id=USER_ID).count()
+        deep_offset = user_rows // 2
+        print(f"{args.rows:,} rows, user {USER_ID} owns {user_rows:,}; deep page at offset {deep_offset:,}")
+
+        # Cursor for the same deep page the OFFSET query reads
+        anchor = legacy_offset_page(deep_offset - 1)()[0]
+        deep_params = parse_history_params({'cursor': encode_cursor(anchor.created_at, anchor.id)})
+        domain = DOMAINS[7]
+        cases = [
+            ('newest page', legacy_offset_page(0), keyset_page(parse_history_params({}))),
+            ('deep page', legacy_offset_page(deep_offset), keyset_page(deep_params)),
+            ('domain filter', legacy_blob_filter(lambda a: domain in a['url']),
+             keyset_page(parse_history_params({'domain': domain}))),
+            ('score range', legacy_blob_filter(lambda a: 40 <= a['seo_score'] <= 45),
+             keyset_page(parse_history_params({'min_score': 40, 'max_score': 45}))),
+            ('best readability', legacy_blob_sort(lambda a: a['readability']['score']),
+             keyset_page(parse_history_params({'sort': 'readability_score'}))),
+        ]
+
+        indexes = list(SEOAnalysis.__table__.indexes)
+        for index in indexes:
+            index.drop(db.engine, checkfirst=True)
+        results = {}
+        for label, legacy, new in cases:
+            results[label] = [timed(legacy, args.repeat)[0], timed(new, args.repeat)[0]]
+        for index in indexes:
+            index.create(db.engine)
+        db.session.execute(text('ANALYZE'))
+        for label, _, new in cases:
+            results[label].append(timed(new, args.repeat)[0])
+
+    print(f"{'query':<18}{'legacy ms':>11}{'no index ms':>13}{'indexed ms':>12}{'speedup':>10}")
+    for label, (legacy_ms, unindexed_ms, indexed_ms) in results.items():
+        print(f"{label:<18}{legacy_ms:>11.1f}{unindexed_ms:>13.1f}{indexed_ms:>12.2f}{legacy_ms / indexed_ms:>9.0f}x")
+
+
+if __name__ == '__main__':
+    main()
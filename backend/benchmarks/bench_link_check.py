@@ -0,0 +1,143 @@
+"""Link and asset health checking against a local server.
+
+Builds a page with --links links plus images, scripts and stylesheets. The
+targets are spread over two host names for the same server (127.0.0.1 and
+localhost), so per-host limits apply. The mix:
+
+  /ok/N          200, with a size that varies per asset
+  /redirect/N    301 -> /ok/N
+  /missing/N     404
+  /nohead/N      405 for HEAD, 206 for a ranged GET (exercises the fallback)
+  /slow/N        200 after --slow-ms
+
+It then times three ways of checking them:
+
+  sequential   requests.get on every URL, one at a time (the naive baseline)
+  cold         LinkChecker.check_page with an empty cache
+  warm         a second page sharing the links, served from the TTL cache
+
+Usage (from backend/):
+    python -m benchmarks.bench_link_check [--links 500] [--slow-ms 50] [--workers 32] [--per-host 8]
+"""
+
+import argparse
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from cache import TTLCache
+from html_extractor import get_extractor
+from link_checker import LinkChecker, resolve_target
+
+_PATH_RE = re.compile(r'^/(ok|redirect|missing|nohead|slow)/(\d+)')
+
+
+class TargetHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    slow_ms = 50
+    requests_seen = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, length=0, headers=None, send_body=True):
+        type(self).requests_seen += 1
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        body = b'x' * length if send_body else b''
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(length))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, send_body):
+        match = _PATH_RE.match(self.path)
+        if not match:
+            return self._reply(404, send_body=send_body)
+        kind, number = match.group(1), int(match.group(2))
+        size = 200 + number * 37 % 5000
+        if kind == 'redirect':
+            return self._reply(301, headers={'Location': f'/ok/{number}'}, send_body=send_body)
+        if kind == 'missing':
+            return self._reply(404, send_body=send_body)
+        if kind == 'nohead':
+            if self.command == 'HEAD':
+                return self._reply(405, send_body=False)
+            return self._reply(206, 1, headers={'Content-Range': f'bytes 0-0/{size}'})
+        if kind == 'slow':
+            time.sleep(self.slow_ms / 1000)
+        return self._reply(200, size, send_body=send_body)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+
+def build_page(port, links, offset=0):
+    hosts = [f'http://127.0.0.1:{port}', f'http://localhost:{port}']
+    kinds = ['ok'] * 6 + ['redirect', 'missing', 'nohead', 'slow']
+    anchors = [f'<a href="{hosts[n % 2]}/{kinds[n % len(kinds)]}/{n + offset}">link {n}</a>' for n in range(links)]
+    # Footer links and assets shared by every page
+    shared = [f'<a href="{hosts[0]}/ok/{1000000 + n}">footer</a>' for n in range(20)]
+    assets = [f'<img src="{hosts[n % 2]}/ok/{2000000 + n}" alt="">' for n in range(40)]
+    assets += [f'<script src="{hosts[0]}/ok/{3000000 + n}"></script>' for n in range(10)]
+    assets += [f'<link rel="stylesheet" href="{hosts[1]}/ok/{4000000 + n}">' for n in range(5)]
+    return ('<html><head><title>Links</title>' + ''.join(assets[-15:]) + '</head><body>'
+            + ''.join(anchors) + ''.join(assets[:-15]) + ''.join(shared) + '</body></html>')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', type=int, default=500)
+    parser.add_argument('--slow-ms', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--per-host', type=int, default=8)
+    args = parser.parse_args()
+
+    TargetHandler.slow_ms = args.slow_ms
+    server = ThreadingHTTPServer(('127.0.0.1', 0), TargetHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    base_url = f'http://127.0.0.1:{port}/page'
+    extractor = get_extractor()
+    first = extractor.extract(build_page(port, args.links))
+    second = extractor.extract(build_page(port, args.links, offset=args.links))
+
+    urls = []
+    for ref in first.links + [image['src'] for image in first.images] + first.scripts + first.stylesheets:
+        url = resolve_target(base_url, ref)
+        if url not in urls:
+            urls.append(url)
+    print(f"{len(urls)} unique URLs on the page, {args.slow_ms} ms for /slow/, "
+          f"{args.workers} workers, {args.per_host} per host")
+
+    session = requests.Session()
+    start = time.perf_counter()
+    broken = 0
+    for url in urls:
+        broken += session.get(url, timeout=5).status_code >= 400
+    sequential = time.perf_counter() - start
+    print(f"{'sequential GET':<16}{sequential:>8.2f} s   {broken} broken")
+
+    checker = LinkChecker(workers=args.workers, per_host=args.per_host, cache=TTLCache(max_entries=50000, ttl=3600))
+    for label, facts in (('cold', first), ('warm', second)):
+        TargetHandler.requests_seen = 0
+        start = time.perf_counter()
+        health = checker.check_page(facts, base_url)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<16}{elapsed:>8.2f} s   {health['broken']} broken, {health['redirected']} redirected, "
+              f"{health['cache_hits']} cache hits, {TargetHandler.requests_seen} requests to the server")
+    print(f"checker stats   {checker.stats()}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
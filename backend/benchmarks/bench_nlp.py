@@ -0,0 +1,60 @@
+"""Keyword/entity stage: batched nlp.pipe vs a per-page nlp(text) baseline.
+
+The baseline runs the full pipeline (parser included) once per page on the
+whole text, the way a naive integration would. The batched path is
+KeywordAnalyzer.analyze_batch: unused pipes disabled, text chunked, all
+pages through one nlp.pipe call.
+
+Usage (from backend/):
+    python -m benchmarks.bench_nlp [--model en_core_web_sm] [--copies 4]
+"""
+
+import argparse
+import sys
+import time
+
+from benchmarks.corpus import build_corpus
+from html_extractor import get_extractor
+from keyword_analyzer import KeywordAnalyzer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model', default='en_core_web_sm')
+    parser.add_argument('--copies', type=int, default=4, help='how many times to repeat the corpus')
+    args = parser.parse_args()
+
+    import spacy
+    try:
+        nlp = spacy.load(args.model)
+    except OSError:
+        sys.exit(f"spaCy model {args.model!r} is not installed: python -m spacy download {args.model}")
+
+    extractor = get_extractor()
+    pages = []
+    for _ in range(args.copies):
+        for html in build_corpus().values():
+            facts = extractor.extract(html)
+            pages.append((facts.text, facts.title or '', facts.headings['h1']))
+    words = sum(len(text.split()) for text, _, _ in pages)
+    print(f"{len(pages)} pages, {words} words, pipes: {nlp.pipe_names}")
+
+    # Baseline needs the whole page in one doc
+    nlp.max_length = max(nlp.max_length, max(len(text) for text, _, _ in pages) + 1)
+    start = time.perf_counter()
+    for text, _, _ in pages:
+        nlp(text)
+    baseline = time.perf_counter() - start
+    print(f"per-page nlp(text)        {baseline:8.2f}s  {words / baseline:10.0f} words/s")
+
+    analyzer = KeywordAnalyzer(nlp, max_chars=10 ** 9)
+    start = time.perf_counter()
+    reports = analyzer.analyze_batch(pages)
+    batched = time.perf_counter() - start
+    print(f"batched nlp.pipe          {batched:8.2f}s  {words / batched:10.0f} words/s  "
+          f"({baseline / batched:.1f}x, disabled: {analyzer.disabled})")
+    print(f"stuffing flagged on {sum(report['keyword_stuffing'] for report in reports)} of {len(reports)} pages")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""Reproducible benchmark of the analysis pipeline, checked against a baseline.
+
+Serves the checked-in pages (benchmarks/pages/: a tiny landing page, a huge
+article, an image-heavy catalog and malformed markup) from a local
+FixtureServer and runs SEOAnalyzer.analyze_page on each of them:
+
+  timing pass  --warmup, then --runs sequential calls per page: pages/sec,
+               latency p50/p95/p99 and the median time of every stage
+               (fetch, parse, analyze_<section>, score)
+  memory pass  one call per page under tracemalloc: peak memory of every
+               stage and of the whole call, above the level at its start
+
+Every fetch downloads the full page (no 304 revalidation) so runs are
+comparable.
+
+The results are compared with a baseline file. A page is a regression when
+its seo_score changed, its p50 latency or throughput got worse by more
+than --time-tolerance, or a peak memory grew by more than --memory-tolerance
+(and by at least 64 KB). Any regression makes the script exit with status 1.
+Timings only compare on the machine that recorded them, so the baseline
+stores an environment fingerprint, and timing checks are skipped with a
+warning when it differs. Scores and memory are always checked.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pipeline --save-baseline   # record a baseline
+    python -m benchmarks.bench_pipeline                   # compare, exit 1 on regression
+        [--runs 20] [--warmup 3] [--baseline PATH] [--json results.json]
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.fixture_server import FixtureServer
+from fetcher import PageFetcher
+from seo_analyzer import ANALYZER_VERSION, SEOAnalyzer
+from telemetry import memory_trace, trace
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'pipeline.json')
+# Memory growth below this is noise (allocator and interning), never a regression
+MEMORY_SLACK = 64 * 1024
+
+
+def environment(analyzer):
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(terse=True),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'extractor': analyzer.extractor.backend,
+        'nlp': analyzer.nlp is not None,
+        'analyzer_version': ANALYZER_VERSION,
+    }
+
+
+def percentile(samples, q):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[q - 1]
+
+
+def time_page(analyzer, url, runs, warmup):
+    for _ in range(warmup):
+        analyzer.analyze_page(url)
+    latencies = []
+    stages = {}
+    for _ in range(runs):
+        start = time.perf_counter()
+        with trace() as timings:
+            analysis = analyzer.analyze_page(url)
+        latencies.append(time.perf_counter() - start)
+        for stage, ms in timings.items():
+            stages.setdefault(stage, []).append(ms)
+    return analysis, {
+        'pages_per_sec': round(runs / sum(latencies), 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'stages_ms': {stage: round(statistics.median(values), 3) for stage, values in stages.items()},
+    }
+
+
+def memory_page(analyzer, url):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        # Per-stage peaks reset the tracemalloc peak, so the whole call is measured separately
+        start = tracemalloc.get_traced_memory()[0]
+        analyzer.analyze_page(url)
+        total = tracemalloc.get_traced_memory()[1] - start
+        with memory_trace() as peaks:
+            analyzer.analyze_page(url)
+    finally:
+        tracemalloc.stop()
+    return {
+        'peak_kb': round(total / 1024, 1),
+        'stages_kb': {stage: round(peak / 1024, 1) for stage, peak in peaks.items()}
+    }
+
+
+def run(args):
+    analyzer = SEOAnalyzer(fetcher=PageFetcher(validator_cache_bytes=0))
+    results = {'environment': environment(analyzer), 'runs': args.runs, 'pages': {}}
+    with FixtureServer() as server:
+        names = sorted(server.handler.pages)
+        for name in names:
+            url = server.url(name)
+            analysis, timing = time_page(analyzer, url, args.runs, args.warmup)
+            results['pages'][name] = dict(
+                size_kb=round(len(server.handler.pages[name]) / 1024, 1),
+                seo_score=analysis['seo_score'],
+                **timing,
+                **memory_page(analyzer, url)
+            )
+    total = sum(args.runs / page['pages_per_sec'] for page in results['pages'].values())
+    results['pages_per_sec'] = round(args.runs * len(names) / total, 2)
+    return results
+
+
+def compare(results, baseline, time_tolerance, memory_tolerance):
+    """Return (regressions, warnings) as lists of messages"""
+    regressions, warnings = [], []
+    check_time = results['environment'] == baseline.get('environment')
+    if not check_time:
+        changed = {key: (baseline.get('environment', {}).get(key), value)
+                   for key, value in results['environment'].items()
+                   if baseline.get('environment', {}).get(key) != value}
+        warnings.append(f"environment differs from the baseline {changed}; timing checks skipped")
+
+    for name, page in results['pages'].items():
+        old = baseline['pages'].get(name)
+        if old is None:
+            warnings.append(f"{name}: not in the baseline")
+            continue
+        if page['seo_score'] != old['seo_score']:
+            regressions.append(f"{name}: seo_score changed {old['seo_score']} -> {page['seo_score']}")
+        if check_time:
+            if page['p50_ms'] > old['p50_ms'] * (1 + time_tolerance):
+                regressions.append(f"{name}: p50 {old['p50_ms']:.1f} -> {page['p50_ms']:.1f} ms")
+            if page['pages_per_sec'] < old['pages_per_sec'] / (1 + time_tolerance):
+                regressions.append(f"{name}: throughput {old['pages_per_sec']} -> {page['pages_per_sec']} pages/sec")
+        memory = [('total', page['peak_kb'], old['peak_kb'])]
+        memory += [(stage, kb, old['stages_kb'].get(stage)) for stage, kb in page['stages_kb'].items()]
+        for stage, kb, old_kb in memory:
+            if old_kb is None:
+                continue
+            if kb > old_kb * (1 + memory_tolerance) and (kb - old_kb) * 1024 >= MEMORY_SLACK:
+                regressions.append(f"{name}: {stage} peak memory {old_kb:.0f} -> {kb:.0f} KB")
+    for name in baseline['pages']:
+        if name not in results['pages']:
+            warnings.append(f"{name}: in the baseline but not in the corpus")
+    return regressions, warnings
+
+
+def report(results, baseline):
+    old_pages = baseline['pages'] if baseline else {}
+    print(f"{'page':<11}{'KB':>7}{'score':>7}{'pages/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'peak KB':>9}"
+          f"{'p50 vs base':>13}")
+    for name, page in results['pages'].items():
+        old = old_pages.get(name)
+        change = f"{(page['p50_ms'] / old['p50_ms'] - 1) * 100:+.1f}%" if old else '-'
+        print(f"{name:<11}{page['size_kb']:>7.0f}{page['seo_score']:>7}{page['pages_per_sec']:>9.1f}"
+              f"{page['p50_ms']:>9.1f}{page['p95_ms']:>9.1f}{page['p99_ms']:>9.1f}{page['peak_kb']:>9.0f}{change:>13}")
+    print(f"overall {results['pages_per_sec']} pages/sec")
+
+    stages = sorted({stage for page in results['pages'].values() for stage in page['stages_ms']},
+                    key=lambda stage: -max(page['stages_ms'].get(stage, 0) for page in results['pages'].values()))
+    names = list(results['pages'])
+    print(f"\n{'stage (p50 ms / peak KB)':<26}" + ''.join(f"{name:>20}" for name in names))
+    for stage in stages:
+        cells = []
+        for name in names:
+            page = results['pages'][name]
+            ms = page['stages_ms'].get(stage)
+            kb = page['stages_kb'].get(stage)
+            cells.append(f"{ms:.2f} / {kb:.0f}" if ms is not None and kb is not None else '-')
+        print(f"{stage:<26}" + ''.join(f"{cell:>20}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--time-tolerance', type=float, default=0.15)
+    parser.add_argument('--memory-tolerance', type=float, default=0.10)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    results = run(args)
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; record one with --save-baseline")
+        return 0
+
+    regressions, warnings = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+    for message in warnings:
+        print(f"warning: {message}")
+    for message in regressions:
+        print(f"REGRESSION: {message}")
+    print(f"\n{len(regressions)} regressions against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
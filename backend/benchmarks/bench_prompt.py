@@ -0,0 +1,78 @@
+"""Gemini prompt size and latency: compact prompt builder vs the full analysis dump.
+
+The legacy prompt embeds json.dumps(analysis, indent=2), every heading
+included. The compact prompt is what GeminiSEOAssistant sends now:
+score-relevant facts, failing checks first, minified and held to the token
+budget. Both are sent to the local Gemini stub, whose response time grows
+with the prompt size (--per-kb-ms), with the suggestion cache disabled.
+
+Usage (from backend/):
+    python -m benchmarks.bench_prompt [--latency-ms 150] [--per-kb-ms 15] [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+from benchmarks.corpus import build_corpus
+from benchmarks.gemini_stub import GeminiStub
+from prompt_builder import estimate_tokens
+from results import Section
+from seo_analyzer import SEOAnalyzer
+
+
+def time_calls(assistant, analysis, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = assistant.generate_seo_suggestions(analysis)
+        samples.append(time.perf_counter() - start)
+        if 'error' in result:
+            raise SystemExit(f"stub call failed: {result['error']}")
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency-ms', type=int, default=150, help='fixed stub response time')
+    parser.add_argument('--per-kb-ms', type=float, default=15, help='extra stub time per KB of prompt')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-kb', type=int, default=1024, help='skip timing legacy prompts larger than this')
+    args = parser.parse_args()
+
+    os.environ.setdefault('GEMINI_API_KEY', 'stub-key')
+    os.environ['GEMINI_CACHE_MAX_ENTRIES'] = '0'
+    from gemini_integration import PROMPT_INSTRUCTIONS, GeminiSEOAssistant
+
+    class LegacyPromptAssistant(GeminiSEOAssistant):
+        def _format_prompt(self, analysis_data):
+            # Sections are typed results now; to_dict() gives the dicts the old prompt embedded
+            return PROMPT_INSTRUCTIONS + json.dumps(analysis_data, indent=2, default=Section.to_dict)
+
+    analyzer = SEOAnalyzer(keywords=False)
+    analyses = {name: analyzer.analyze_html(html, f'https://example.com/{name}') for name, html in build_corpus().items()}
+
+    with GeminiStub(latency_ms=args.latency_ms, per_kb_ms=args.per_kb_ms) as stub:
+        legacy = LegacyPromptAssistant(endpoint=stub.endpoint())
+        compact = GeminiSEOAssistant(endpoint=stub.endpoint())
+        print(f"token budget {compact.prompt_token_budget}, stub {args.latency_ms} ms + {args.per_kb_ms} ms/KB")
+        print(f"{'page':<12}{'legacy KB':>11}{'tokens':>9}{'ms':>8}   {'compact KB':>11}{'tokens':>9}{'ms':>8}{'size':>8}")
+        for name, analysis in analyses.items():
+            old_prompt = legacy._format_prompt(analysis)
+            new_prompt = compact._format_prompt(analysis)
+            # Unclosed headings on malformed pages swallow the rest of the page, so the
+            # legacy prompt can run to megabytes; timing those would only measure the stub
+            if len(old_prompt) > args.max_kb * 1024:
+                old_ms = 'n/a'
+            else:
+                old_ms = f"{time_calls(legacy, analysis, args.repeat) * 1000:.0f}"
+            new_ms = time_calls(compact, analysis, args.repeat) * 1000
+            print(f"{name:<12}{len(old_prompt) / 1024:>11.1f}{estimate_tokens(old_prompt):>9}{old_ms:>8}   "
+                  f"{len(new_prompt) / 1024:>11.1f}{estimate_tokens(new_prompt):>9}{new_ms:>8.0f}"
+                  f"{len(new_prompt) / len(old_prompt):>8.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Readability: single-pass readability module vs the textstat calls it replaced.
+
+The baseline is the old _analyze_readability: textstat's flesch_reading_ease
+and flesch_kincaid_grade run separately over the whole page text. The new
+path is readability_scores() over the boilerplate-free main text, computing
+five metrics from one tokenization. textstat is only needed for the baseline
+(pip install textstat).
+
+Usage (from backend/):
+    python -m benchmarks.bench_readability [--words 100000] [--repeat 3]
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.corpus import article_page
+from html_extractor import get_extractor
+from readability import count_syllables, readability_scores
+
+
+def median_time(func, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--words', type=int, default=100000, help='approximate page size in words')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # article_page() yields roughly 125 words per section
+    facts = get_extractor().extract(article_page(sections=max(1, args.words // 125)))
+    print(f"page text: {len(facts.text.split())} words, main text: {len(facts.main_text.split())} words")
+
+    count_syllables.cache_clear()
+    cold, _ = median_time(lambda: readability_scores(facts.main_text), 1)
+    fast, scores = median_time(lambda: readability_scores(facts.main_text), args.repeat)
+    print(f"readability_scores   cold {cold * 1000:8.1f} ms   warm {fast * 1000:8.1f} ms")
+    print("  " + ", ".join(f"{name}={value}" for name, value in scores.items()))
+
+    try:
+        import textstat
+    except ImportError:
+        print("textstat is not installed, skipping the baseline")
+        return
+
+    runs = iter(range(args.repeat))
+
+    def baseline():
+        # textstat memoizes on the exact text, so give every run a distinct string
+        text = facts.text + ' ' * next(runs)
+        return textstat.flesch_reading_ease(text), textstat.flesch_kincaid_grade(text)
+
+    slow, (flesch, grade) = median_time(baseline, args.repeat)
+    print(f"textstat (2 metrics)          {slow * 1000:8.1f} ms")
+    print(f"  flesch_reading_ease={flesch}, flesch_kincaid_grade={grade}")
+    print(f"speed-up: {slow / fast:.1f}x warm, {slow / cold:.1f}x cold")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Bulk re-scoring of stored analyses with a new scoring profile.
+
+Fills a temporary SQLite database with --rows synthetic analyses, scored
+with the default profile, then applies a second profile in two ways:
+
+  payload loop   decode every stored payload, score the dict with
+                 ScoringProfile.score() and write seo_score back with the
+                 same batched UPDATE (re-scoring without the promoted
+                 columns)
+  bulk           rescore.rescore_analyses(): section score columns only,
+                 scored in batches by ScoringProfile.score_rows()
+
+and checks that both give exactly the same seo_score for every row. The
+scoring step alone is also timed on in-memory rows.
+
+Usage (from backend/):
+    python -m benchmarks.bench_rescore [--rows 100000] [--batch-size 5000]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from sqlalchemy import bindparam
+
+
+def synthetic_analysis(rng, categories):
+    analysis = {'url': f'https://example.com/{rng.random()}', 'keywords': {'available': False, 'score': 0}}
+    for category in categories:
+        score = rng.choice([100, 50, 0, rng.randint(0, 100), rng.random() * 100, min(100, rng.randint(0, 900) / 3)])
+        analysis[category] = {'score': score, 'text': 'x' * rng.randint(0, 80)}
+    return analysis
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-rescore-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'rescore.db')
+
+    from flask import Flask
+
+    from database import SCORE_CATEGORIES, SEOAnalysis, User, configure_database, db, payload_store, summary_columns
+    from rescore import rescore_analyses
+    from scoring import ScoringProfile, get_scoring_profile
+
+    app = Flask(__name__)
+    configure_database(app)
+    default = get_scoring_profile()
+    tuned = ScoringProfile('bench', dict(default.weights, title=0.25, readability=0.1, links=0.05))
+    rng = random.Random(42)
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com')
+        db.session.add(user)
+        db.session.commit()
+
+        start = time.perf_counter()
+        analyses = []
+        for offset in range(0, args.rows, args.batch_size):
+            rows = []
+            for _ in range(min(args.batch_size, args.rows - offset)):
+                analysis = synthetic_analysis(rng, SCORE_CATEGORIES)
+                analysis['seo_score'] = default.score(analysis)
+                analysis['score_profile'] = default.version
+                analyses.append(analysis)
+                rows.append(dict(summary_columns(analysis['url'], analysis), user_id=user.id, url=analysis['url'],
+                                 payload=payload_store.encode(analysis)))
+            db.session.execute(db.insert(SEOAnalysis), rows)
+            db.session.commit()
+        print(f"{args.rows} analyses stored in {time.perf_counter() - start:.1f} s")
+
+        start = time.perf_counter()
+        loop_scores = [tuned.score(analysis) for analysis in analyses]
+        loop_seconds = time.perf_counter() - start
+        matrix = [[analysis[category]['score'] for category in tuned.categories] for analysis in analyses]
+        start = time.perf_counter()
+        bulk_scores = tuned.score_rows(matrix)
+        bulk_seconds = time.perf_counter() - start
+        print(f"{'scoring only':<16}{'score() loop':>14}{loop_seconds:>8.3f} s   "
+              f"{'score_rows()':>14}{bulk_seconds:>8.3f} s   {loop_seconds / bulk_seconds:.1f}x, "
+              f"{sum(a != b for a, b in zip(loop_scores, bulk_scores))} differences")
+
+        table = SEOAnalysis.__table__
+        update = db.update(table).where(table.c.id == bindparam('row_id')).values(seo_score=bindparam('new_score'))
+        start = time.perf_counter()
+        expected = {}
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                db.select(SEOAnalysis.id, SEOAnalysis.payload).where(SEOAnalysis.id > last_id)
+                .order_by(SEOAnalysis.id).limit(args.batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            updates = [{'row_id': row_id, 'new_score': tuned.score(payload_store.decode(payload))}
+                       for row_id, payload in rows]
+            db.session.connection().execute(update, updates)
+            db.session.commit()
+            expected.update((item['row_id'], item['new_score']) for item in updates)
+        loop = time.perf_counter() - start
+        print(f"{'payload loop':<16}{loop:>8.2f} s   {args.rows / loop:>10.0f} rows/sec")
+
+        summary = rescore_analyses(tuned, batch_size=args.batch_size)
+        print(f"{'bulk':<16}{summary['seconds']:>8.2f} s   {summary['rows_per_sec']:>10.0f} rows/sec   "
+              f"{loop / summary['seconds']:.1f}x")
+
+        stored = dict(db.session.execute(db.select(SEOAnalysis.id, SEOAnalysis.seo_score)).all())
+        mismatches = sum(stored[row_id] != score for row_id, score in expected.items())
+        print(f"{mismatches} rows differ between the payload loop and the bulk re-score")
+        db.engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
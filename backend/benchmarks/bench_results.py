@@ -0,0 +1,114 @@
+"""Memory and serialization cost of analysis results, typed sections vs plain dicts.
+
+For every page of the benchmark corpus (benchmarks/pages/), the analysis is
+built once and then measured in two forms:
+
+  dicts    every section converted back to the dict the analyzers used to
+           return (section.to_dict())
+  typed    the slotted section dataclasses from results.py
+
+memory     tracemalloc allocation count and retained bytes of --copies
+           copies of the sections
+encode     time per analysis to produce the JSON the request needs:
+           before: json.dumps for the stored payload, plus Flask's jsonify
+                   (sorted keys, ASCII escapes) for the response
+           after:  results.encode_json once (orjson when installed), with
+                   analysis_id/changes/timings appended by extend_json
+
+Usage (from backend/):
+    python -m benchmarks.bench_results [--runs 200] [--copies 1000]
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from flask import Flask
+
+import results
+from benchmarks.corpus import load_corpus
+from results import Section, encode_json, extend_json
+from seo_analyzer import SEOAnalyzer
+
+EXTRA = {'analysis_id': 1, 'changes': None, 'timings': {'total': 12.5}}
+
+
+def as_dicts(analysis):
+    return {key: value.to_dict() if isinstance(value, Section) else value for key, value in analysis.items()}
+
+
+def sections(analysis):
+    return [value for value in analysis.values() if isinstance(value, (dict, Section))]
+
+
+def allocations(build, copies):
+    """(allocated blocks, retained bytes) of copies results of build()"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        kept = [build() for _ in range(copies)]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    blocks = sum(stat.count_diff for stat in stats)
+    size = sum(stat.size_diff for stat in stats)
+    del kept
+    return blocks, size
+
+
+def per_call_us(function, runs):
+    function()
+    start = time.perf_counter()
+    for _ in range(runs):
+        function()
+    return (time.perf_counter() - start) / runs * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--copies', type=int, default=1000)
+    args = parser.parse_args()
+
+    analyzer = SEOAnalyzer(keywords=False)
+    flask_json = Flask(__name__).json
+    print(f"encoder: {'orjson' if results.orjson is not None else 'json (orjson not installed)'}\n")
+    print(f"{'page':<11}{'KB JSON':>8}{'blocks dict':>13}{'blocks typed':>14}{'KB dict':>9}{'KB typed':>10}"
+          f"{'before us':>11}{'after us':>10}{'speedup':>9}")
+
+    for name, html in sorted(load_corpus().items()):
+        facts = analyzer.extractor.extract(html.encode('utf-8') if isinstance(html, str) else html)
+        typed = analyzer.analyze_facts(facts, f'https://example.com/{name}')
+        plain = as_dicts(typed)
+        assert encode_json(typed) == json.dumps(plain, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+        # Copies share the page's strings and lists, so only the section containers are counted
+        dict_blocks, dict_size = allocations(
+            lambda: [dict(section) if isinstance(section, dict) else section.to_dict() for section in sections(plain)],
+            args.copies)
+        typed_blocks, typed_size = allocations(
+            lambda: [type(section)(**section) if isinstance(section, Section) else dict(section)
+                     for section in sections(typed)],
+            args.copies)
+
+        def before():
+            json.dumps(plain, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+            flask_json.dumps(dict(plain, **EXTRA))
+
+        def after():
+            extend_json(encode_json(typed), EXTRA)
+
+        before_us, after_us = per_call_us(before, args.runs), per_call_us(after, args.runs)
+        print(f"{name:<11}{len(encode_json(typed)) / 1024:>8.0f}{dict_blocks / args.copies:>13.1f}"
+              f"{typed_blocks / args.copies:>14.1f}{dict_size / args.copies / 1024:>9.2f}"
+              f"{typed_size / args.copies / 1024:>10.2f}{before_us:>11.0f}{after_us:>10.0f}"
+              f"{before_us / after_us:>8.1f}x")
+    print("\nblocks / KB: allocations and retained memory of one analysis' sections")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Backend cold-start benchmark: import time, time-to-first-request and RSS.
+
+Each measurement runs in a fresh interpreter so module caches do not leak
+between runs. Prints a table, or one JSON object with --json for CI tracking.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup [--runs 3] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = r"""
+import json, os, resource, sys, time, tempfile
+os.chdir(tempfile.mkdtemp())
+os.environ.setdefault('JOB_QUEUE_AUTOSTART', '0')
+sys.path.insert(0, BACKEND)
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+if WARM:
+    app.seo_analyzer.warm_up()
+warmed = time.perf_counter()
+
+from benchmarks.corpus import landing_page
+client = app.app.test_client()
+request_start = time.perf_counter()
+client.get('/api/history')
+app.seo_analyzer.analyze_html(landing_page().encode(), 'https://example.com/')
+first_request = time.perf_counter()
+
+print(json.dumps({
+    'import_s': imported - start,
+    'warm_up_s': warmed - imported,
+    'first_request_s': first_request - request_start,
+    'rss_mb': rss_mb(),
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def run_probe(warm):
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = f"BACKEND = {backend!r}\nWARM = {warm!r}\n" + PROBE
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    return {key: round(statistics.median(sample[key] for sample in samples), 3) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    results = {
+        'lazy': summarize([run_probe(False) for _ in range(args.runs)]),
+        'warmed': summarize([run_probe(True) for _ in range(args.runs)]),
+    }
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    keys = list(results['lazy'])
+    print(f"{'mode':<8}" + "".join(f"{key:>18}" for key in keys))
+    for mode, values in results.items():
+        print(f"{mode:<8}" + "".join(f"{values[key]:>18}" for key in keys))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Analysis storage: plain JSON text vs compressed payloads.
+
+Analyzes --distinct generated pages, then saves --rows analyses (cycling
+through them with distinct URLs and AI suggestion text) into one SQLite
+database per storage mode and reports file size, write latency (one commit
+per analysis, as /api/analyze does), history page latency and detail read
+latency.
+
+  json        json.dumps(analysis) in the analysis_data column, the old format
+  zlib        payload column, zlib without a dictionary
+  zlib+dict   payload column, zlib with a dictionary trained on the first rows
+  zstd+dict   same with zstd (only when zstandard is installed)
+
+Usage (from backend/):
+    python -m benchmarks.bench_storage [--rows 2000] [--distinct 60] [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from flask import Flask
+
+from benchmarks.corpus import _sentence, article_page, catalog_page, landing_page
+from database import SEOAnalysis, db, payload_store, summary_columns, train_payload_dictionary
+from history import build_history_query, parse_history_params
+from payload_store import PayloadStore, zstandard
+from results import Section
+from seo_analyzer import SEOAnalyzer
+
+
+def build_analyses(distinct):
+    analyzer = SEOAnalyzer(keywords=False)
+    rng = random.Random(7)
+    analyses = []
+    for i in range(distinct):
+        kind = i % 3
+        if kind == 0:
+            html = landing_page(i)
+        elif kind == 1:
+            html = article_page(i, sections=rng.randint(3, 30))
+        else:
+            html = catalog_page(i, products=rng.randint(10, 80))
+        analyses.append(analyzer.analyze_html(html, f'https://site{i % 20}.example.com/page-{i}'))
+    return analyses
+
+
+def generate_rows(analyses, rows):
+    rng = random.Random(11)
+    for n in range(rows):
+        analysis = dict(analyses[n % len(analyses)], url=f'https://site{n % 20}.example.com/page-{n}')
+        # Gemini suggestions are different for every page
+        analysis['ai_suggestions'] = {'suggestions': ' '.join(_sentence(rng, 14) for _ in range(20))}
+        yield analysis
+
+
+def save_rows(mode, analyses, rows):
+    latencies = []
+    for n, analysis in enumerate(generate_rows(analyses, rows)):
+        start = time.perf_counter()
+        if mode == 'json':
+            row = SEOAnalysis(user_id=1, url=analysis['url'], analysis_data=json.dumps(analysis, default=Section.to_dict),
+                              **summary_columns(analysis['url'], analysis))
+        else:
+            row = SEOAnalysis.from_analysis(1, analysis['url'], analysis)
+        db.session.add(row)
+        db.session.commit()
+        latencies.append(time.perf_counter() - start)
+        if n == 99 and mode.endswith('+dict'):
+            # The app trains its first dictionary once PAYLOAD_DICT_MIN_SAMPLES rows exist
+            train_payload_dictionary()
+    return latencies
+
+
+def read_detail(mode, row_id):
+    if mode == 'json':
+        # The old code read the whole row and parsed analysis_data
+        row = db.session.get(SEOAnalysis, row_id)
+        return json.loads(row.analysis_data)
+    return db.session.get(SEOAnalysis, row_id).load_analysis()
+
+
+def read_history(mode):
+    if mode == 'json':
+        # The old history route loaded whole rows, analysis_data included
+        return (SEOAnalysis.query.options(db.undefer(SEOAnalysis.analysis_data)).filter_by(user_id=1)
+                .order_by(SEOAnalysis.created_at.desc()).limit(10).all())
+    return build_history_query(1, parse_history_params({})).all()
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def run_mode(mode, analyses, args, workdir):
+    path = os.path.join(workdir, f"{mode.replace('+', '_')}.db")
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+
+    codec = mode.split('+')[0]
+    store = PayloadStore(codec='zlib' if codec == 'json' else codec)
+    payload_store.__dict__.update(store.__dict__)
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.text("INSERT INTO user (id, username, email) VALUES (1, 'bench', 'bench@example.com')"))
+        db.session.commit()
+        writes = save_rows(mode, analyses, args.rows)
+        db.session.expire_all()
+        rng = random.Random(3)
+        detail_ms = timed(lambda: read_detail(mode, rng.randint(1, args.rows)), args.repeat)
+        history_ms = timed(lambda: read_history(mode), args.repeat)
+        db.session.remove()
+        db.engine.dispose()
+    return os.path.getsize(path), statistics.median(writes) * 1000, detail_ms, history_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--distinct', type=int, default=60, help='number of distinct pages analyzed')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    analyses = build_analyses(args.distinct)
+    modes = ['json', 'zlib', 'zlib+dict'] + (['zstd+dict'] if zstandard is not None else [])
+    print(f"{args.rows} analyses, {args.distinct} distinct pages")
+    print(f"{'mode':<12}{'DB MB':>8}{'size':>8}{'write ms':>10}{'detail ms':>11}{'history ms':>12}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in modes:
+            size, write_ms, detail_ms, history_ms = run_mode(mode, analyses, args, workdir)
+            baseline = baseline or size
+            print(f"{mode:<12}{size / 1e6:>8.1f}{size / baseline:>8.1%}{write_ms:>10.2f}{detail_ms:>11.2f}{history_ms:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Deterministic HTML pages used by the benchmark scripts.
+
+The pages are also checked in under benchmarks/pages/ so the pipeline
+benchmark keeps measuring the same bytes even if these generators change.
+Regenerate them (and then the baseline) with:
+    python -m benchmarks.corpus
+"""
+
+import os
+import random
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+WORDS = (
+    "search engine optimisation content ranking crawl index page title meta description "
+    "heading product catalog price shipping review customer checkout category brand "
+    "quality fast delivery support guide article readers traffic organic keyword link"
+).split()
+
+
+def _sentence(rng, length):
+    words = [rng.choice(WORDS) for _ in range(length)]
+    words[0] = words[0].capitalize()
+    return " ".join(words) + "."
+
+
+def _paragraph(rng, sentences=5):
+    return "<p>" + " ".join(_sentence(rng, rng.randint(8, 20)) for _ in range(sentences)) + "</p>"
+
+
+def _page(title, body, description="A representative page used for benchmarking the SEO analyzer pipeline end to end."):
+    return (
+        "<!DOCTYPE html><html lang=\"en\"><head>"
+        "<meta charset=\"utf-8\">"
+        "<meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">"
+        f"<title>{title}</title>"
+        f"<meta name=\"description\" content=\"{description}\">"
+        "<script>window.dataLayer = window.dataLayer || []; function gtag(){dataLayer.push(arguments);}</script>"
+        "<style>body { font-family: sans-serif; } .nav a { margin: 0 4px; }</style>"
+        "</head><body>"
+        "<nav class=\"nav\">" + "".join(f"<a href=\"/category/{i}\">Category {i}</a>" for i in range(12)) + "</nav>"
+        f"{body}"
+        "<footer><a href=\"https://twitter.com/example\">Twitter</a> <a href=\"/privacy\">Privacy</a></footer>"
+        "</body></html>"
+    )
+
+
+def landing_page(seed=1):
+    rng = random.Random(seed)
+    body = "<h1>Fast delivery for every order</h1><h2>Why customers choose us</h2>" + _paragraph(rng, 3)
+    return _page("Example Store - Fast Delivery and Great Prices", body)
+
+
+def article_page(seed=2, sections=400):
+    rng = random.Random(seed)
+    parts = ["<article><h1>The complete guide to organic search traffic</h1>"]
+    for index in range(sections):
+        parts.append(f"<h2>Section {index}: {_sentence(rng, 5)}</h2>")
+        parts.append(_paragraph(rng, 8))
+        if index % 5 == 0:
+            parts.append(f"<h3>Notes on section {index}</h3>" + _paragraph(rng, 3))
+    parts.append("</article>")
+    return _page("The Complete Guide to Organic Search Traffic in Practice", "".join(parts))
+
+
+def catalog_page(seed=3, products=2000):
+    rng = random.Random(seed)
+    parts = ["<h1>All products</h1><h2>Catalog</h2><ul class=\"grid\">"]
+    for index in range(products):
+        alt = f" alt=\"Product {index}\"" if index % 3 else ""
+        parts.append(
+            f"<li><a href=\"/product/{index}\"><img src=\"/img/{index}.jpg\"{alt} loading=\"lazy\"></a>"
+            f"<h3>{_sentence(rng, 4)}</h3><span class=\"price\">${rng.randint(5, 500)}.99</span>"
+            f"<a href=\"https://cdn.example.net/spec/{index}.pdf\">Spec sheet</a></li>"
+        )
+    parts.append("</ul>")
+    return _page("Product Catalog - Example Store", "".join(parts))
+
+
+def malformed_page(seed=4, blocks=300):
+    rng = random.Random(seed)
+    parts = ["<h1>Unclosed <b>heading"]
+    for index in range(blocks):
+        parts.append(f"<div><p>{_sentence(rng, 12)}<span><a href=/p/{index}>link {index}</div>")
+        parts.append(f"<img src=x{index}.png alt={index}><h2>Sub {index}")
+    return _page("Malformed markup page", "".join(parts))
+
+
+def build_corpus():
+    return {
+        'landing': landing_page(),
+        'article': article_page(),
+        'catalog': catalog_page(),
+        'malformed': malformed_page(),
+    }
+
+
+def load_corpus(directory=PAGES_DIR):
+    """The checked-in pages as {name: bytes}"""
+    pages = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.html'):
+            with open(os.path.join(directory, filename), 'rb') as f:
+                pages[filename[:-len('.html')]] = f.read()
+    return pages
+
+
+def write_corpus(directory=PAGES_DIR):
+    os.makedirs(directory, exist_ok=True)
+    for name, html in build_corpus().items():
+        with open(os.path.join(directory, f'{name}.html'), 'w', encoding='utf-8', newline='') as f:
+            f.write(html)
+
+
+if __name__ == '__main__':
+    write_corpus()
+    print(f"Wrote {len(build_corpus())} pages to {PAGES_DIR}")
@@ -0,0 +1,147 @@
+"""Local HTTP server that serves the benchmark corpus.
+
+Supports keep-alive, gzip and Brotli (when brotli is installed), ETag / Last-Modified revalidation and a few
+special paths used by the fetch benchmarks:
+
+    /<page>          a corpus page (see corpus.load_corpus)
+    /large?kb=N      an N KB page, for body size limits
+    /slow?ms=N       a page delayed by N milliseconds
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from benchmarks.corpus import load_corpus
+
+LAST_MODIFIED = formatdate(1700000000, usegmt=True)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs add ~40 ms to small responses on keep-alive connections
+    disable_nagle_algorithm = True
+    pages = {}
+    compressed = {}
+    stats = {'requests': 0, 'not_modified': 0, 'gzip': 0, 'br': 0}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body_for(self, path, query):
+        if path == '/large':
+            size = int(query.get('kb', ['1024'])[0]) * 1024
+            filler = b'<p>' + b'x' * 1000 + b'</p>'
+            return b'<html><head><title>Large</title></head><body>' + filler * (size // len(filler) + 1) + b'</body></html>'
+        if path == '/slow':
+            time.sleep(int(query.get('ms', ['100'])[0]) / 1000)
+            return self.pages['landing']
+        return self.pages.get(path.strip('/') or 'landing')
+
+    def do_HEAD(self):
+        self.do_GET(send_body=False)
+
+    def do_GET(self, send_body=True):
+        parsed = urlparse(self.path)
+        self.stats['requests'] += 1
+        body = self._body_for(parsed.path, parse_qs(parsed.query))
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        if self.headers.get('If-None-Match') == etag or self.headers.get('If-Modified-Since') == LAST_MODIFIED:
+            self.stats['not_modified'] += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        accepted = {value.split(';')[0].strip() for value in self.headers.get('Accept-Encoding', '').split(',')}
+        encoding = None
+        if 'br' in accepted and brotli is not None:
+            encoding = 'br'
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+        if encoding:
+            # Compressed once per body so server CPU does not count as fetch time
+            compressed = self.compressed.get((encoding, etag))
+            if compressed is None:
+                compressed = self.compressed[encoding, etag] = (
+                    brotli.compress(body, quality=5) if encoding == 'br' else gzip.compress(body, compresslevel=5))
+            body = compressed
+            self.stats[encoding] += 1
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', LAST_MODIFIED)
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+class FixtureServer:
+    """Runs FixtureHandler on a background thread; usable as a context manager."""
+
+    def __init__(self, pages=None, host='127.0.0.1', port=0):
+        handler = type('Handler', (FixtureHandler,), {
+            'pages': {name: html.encode('utf-8') if isinstance(html, str) else html
+                      for name, html in (pages or load_corpus()).items()},
+            'compressed': {},
+            'stats': {'requests': 0, 'not_modified': 0, 'gzip': 0, 'br': 0},
+        })
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.handler = handler
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path):
+        return self.base_url + '/' + path.lstrip('/')
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    server = FixtureServer(port=args.port)
+    print(f"Serving benchmark corpus on {server.base_url}")
+    server.httpd.serve_forever()
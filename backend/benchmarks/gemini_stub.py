@@ -0,0 +1,181 @@
+"""Local stand-in for the Gemini generateContent / streamGenerateContent endpoints.
+
+Answers POST /v1beta/models/<model>:generateContent with a canned reply
+(the suggestions payload unless another reply is given) after an optional
+delay, and counts the calls it received, so the AI layer can be exercised
+without an API key or network. per_kb_ms adds a delay proportional to the
+prompt size, standing in for the time the model spends reading its input.
+
+:streamGenerateContent?alt=sse sends the same reply as `chunks` server-sent
+events over a chunked response: the first after latency_ms, the rest
+chunk_ms apart. The non-streaming method waits for all of them, as the real
+API does.
+
+    with GeminiStub(latency_ms=300) as stub:
+        assistant = GeminiSEOAssistant(endpoint=stub.endpoint())
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+SUGGESTIONS = {
+    "priority_issues": [
+        {
+            "issue": "Meta description is too short",
+            "recommendation": "Write a 120-160 character description that includes the main keyword",
+            "impact": "Higher click-through rate from search results",
+            "difficulty": "easy"
+        },
+        {
+            "issue": "Several images are missing alt text",
+            "recommendation": "Describe each image in its alt attribute",
+            "impact": "Better image search visibility and accessibility",
+            "difficulty": "easy"
+        },
+        {
+            "issue": "Content is hard to read",
+            "recommendation": "Shorten sentences and break up long paragraphs",
+            "impact": "Longer dwell time and better engagement signals",
+            "difficulty": "medium"
+        }
+    ],
+    "quick_wins": [
+        "Add alt text to every image",
+        "Lengthen the meta description",
+        "Link to related pages from the introduction"
+    ],
+    "overall_assessment": "The page has a solid structure but its metadata and readability need work."
+}
+
+
+class GeminiStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    per_kb = 0.0
+    chunk_delay = 0.0
+    chunks = 1
+    reply = None
+    status = 200
+    stats = {'calls': 0, 'prompt_chars': 0}
+    prompts = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        prompt = request['contents'][0]['parts'][0]['text']
+        with self.lock:
+            self.stats['calls'] += 1
+            self.stats['prompt_chars'] += len(prompt)
+            self.prompts.append(prompt)
+
+        delay = self.latency + self.per_kb * len(prompt) / 1024
+        if delay:
+            time.sleep(delay)
+        streaming = path.endswith(':streamGenerateContent')
+        if not streaming and not path.endswith(':generateContent'):
+            self._send_json(404, {'error': {'code': 404, 'message': 'Unknown method'}})
+            return
+        if self.status != 200:
+            self._send_json(self.status, {'error': {'code': self.status, 'message': 'Stubbed failure'}})
+            return
+
+        reply = self.reply if self.reply is not None else json.dumps(SUGGESTIONS)
+        size = -(-len(reply) // self.chunks)
+        pieces = [reply[offset:offset + size] for offset in range(0, len(reply), size)] or ['']
+        if streaming:
+            self._stream(pieces)
+            return
+        time.sleep(self.chunk_delay * (len(pieces) - 1))
+        self._send_json(200, {
+            'candidates': [{'content': {'parts': [{'text': reply}], 'role': 'model'}}],
+            'usageMetadata': {'promptTokenCount': len(prompt) // 4},
+        })
+
+    def _stream(self, pieces):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for index, piece in enumerate(pieces):
+            if index:
+                time.sleep(self.chunk_delay)
+            event = {'candidates': [{'content': {'parts': [{'text': piece}], 'role': 'model'}}]}
+            data = f"data: {json.dumps(event)}\r\n\r\n".encode('utf-8')
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            self.wfile.flush()
+        self.wfile.write(b'0\r\n\r\n')
+
+
+class GeminiStub:
+    """Runs GeminiStubHandler on a background thread; usable as a context manager."""
+
+    def __init__(self, latency_ms=0, per_kb_ms=0, reply=None, chunks=1, chunk_ms=0, status=200,
+                 host='127.0.0.1', port=0):
+        handler = type('Handler', (GeminiStubHandler,), {
+            'latency': latency_ms / 1000,
+            'per_kb': per_kb_ms / 1000,
+            'reply': reply,
+            'chunks': max(1, chunks),
+            'chunk_delay': chunk_ms / 1000,
+            'status': status,
+            'stats': {'calls': 0, 'prompt_chars': 0},
+            'prompts': [],
+            'lock': threading.Lock(),
+        })
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.handler = handler
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def endpoint(self, model='gemini-1.5-flash', method='generateContent'):
+        return f"{self.base_url}/v1beta/models/{model}:{method}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency-ms', type=int, default=0)
+    parser.add_argument('--per-kb-ms', type=float, default=0)
+    parser.add_argument('--chunks', type=int, default=1)
+    parser.add_argument('--chunk-ms', type=int, default=0)
+    args = parser.parse_args()
+    stub = GeminiStub(latency_ms=args.latency_ms, per_kb_ms=args.per_kb_ms, chunks=args.chunks,
+                      chunk_ms=args.chunk_ms, port=args.port)
+    print(f"Gemini stub listening on {stub.endpoint()}")
+    stub.httpd.serve_forever()
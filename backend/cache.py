@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from results import encode_json
+
+_WHITESPACE_RE = re.compile(rb'\s+')
+
+
+def content_key(url, body, version):
+    """Cache key for an analysis: the normalized page body, its URL and the analyzer version"""
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    digest = hashlib.sha256()
+    digest.update(version.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(url.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(_WHITESPACE_RE.sub(b' ', body).strip())
+    return digest.hexdigest()
+
+
+class TTLCache:
+    """Thread-safe in-memory LRU cache whose entries also expire after ttl seconds"""
+
+    def __init__(self, max_entries=1000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': 'memory',
+            'entries': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class SQLiteCache:
+    """JSON value cache in a SQLite file, shared by every worker on the host.
+
+    Entries expire after ttl seconds; once more than max_entries are stored the
+    least recently used ones are evicted.
+    """
+
+    def __init__(self, path, max_entries=10000, ttl=86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Opened on first use, one per thread and process: a connection must
+        # not be shared with workers forked after the app was imported
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != pid:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache_entries ("
+                    " key TEXT PRIMARY KEY,"
+                    " value TEXT NOT NULL,"
+                    " expires_at REAL,"
+                    " accessed_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed ON cache_entries (accessed_at)")
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        if row is not None and (row[1] is None or row[1] > now):
+            with conn:
+                conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+            with self._lock:
+                self.hits += 1
+            return json.loads(row[0])
+        if row is not None:
+            with conn:
+                conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, encode_json(value).decode('utf-8'), now + ttl if ttl else None, now)
+            )
+            overflow = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE key IN ("
+                    " SELECT key FROM cache_entries ORDER BY accessed_at LIMIT ?)",
+                    (overflow,)
+                )
+                with self._lock:
+                    self.evictions += overflow
+
+    def delete(self, key):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM cache_entries")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': 'sqlite',
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    The first caller runs the function; callers arriving while it is in flight
+    wait and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, func):
+        """Return (result, shared) where shared is True if another caller did the work"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return call.result(), True
+
+        try:
+            result = func()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+def create_cache_from_env(prefix, ttl, max_entries, path, backend='memory'):
+    """Build a cache from <prefix>_BACKEND (memory|sqlite|none), _TTL, _MAX_ENTRIES and _PATH"""
+    backend = os.environ.get(f'{prefix}_BACKEND', backend).lower()
+    ttl = int(os.environ.get(f'{prefix}_TTL', str(ttl)))
+    max_entries = int(os.environ.get(f'{prefix}_MAX_ENTRIES', str(max_entries)))
+
+    if backend == 'none':
+        return None
+    if backend == 'sqlite':
+        return SQLiteCache(os.environ.get(f'{prefix}_PATH', path), max_entries=max_entries, ttl=ttl)
+    return TTLCache(max_entries=max_entries, ttl=ttl)
+
+
+def create_analysis_cache():
+    """Build the analysis result cache from ANALYSIS_CACHE_* environment variables"""
+    return create_cache_from_env('ANALYSIS_CACHE', 3600, 1000, os.path.join('instance', 'analysis_cache.db'))
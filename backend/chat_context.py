@@ -0,0 +1,115 @@
+import json
+import os
+import re
+
+from cache import TTLCache, create_cache_from_env
+from prompt_builder import compact_prompt_data, estimate_tokens
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def _plain(text, limit):
+    """Chat text without HTML formatting, clipped to limit characters"""
+    text = _SPACE_RE.sub(' ', _TAG_RE.sub(' ', text or '')).strip()
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+class ChatContext:
+    """Report summaries and per-conversation memory for the chatbot prompt.
+
+    Summaries of stored analyses are built once per (user, analysis) and
+    cached, so follow-up questions neither reload nor resend the report.
+    Conversations keep the last max_turns messages; older user questions are
+    condensed into a short list of earlier topics. render_history() fits the
+    window into history_token_budget, newest turns first, so the prompt stays
+    the same size however long the conversation runs.
+
+    The conversation store is a cache.TTLCache or SQLiteCache, so with the
+    sqlite backend every worker process sees the same conversations.
+    """
+
+    def __init__(self, memory=None, summary_cache=None, summary_token_budget=600,
+                 history_token_budget=800, max_turns=12, max_topics=8, turn_chars=600):
+        self.memory = memory if memory is not None else TTLCache(max_entries=1000, ttl=86400)
+        self.summaries = summary_cache if summary_cache is not None else TTLCache(max_entries=256, ttl=3600)
+        self.summary_token_budget = summary_token_budget
+        self.history_token_budget = history_token_budget
+        self.max_turns = max_turns
+        self.max_topics = max_topics
+        self.turn_chars = turn_chars
+
+    def report_summary(self, user_id, analysis_id, load_analysis):
+        """Compact summary of a stored analysis; load_analysis() is only called on a cache miss"""
+        key = f"{user_id}:{analysis_id}"
+        summary = self.summaries.get(key)
+        if summary is None:
+            analysis = load_analysis()
+            if analysis is None:
+                return None
+            summary = compact_prompt_data(analysis, self.summary_token_budget)
+            self.summaries.set(key, summary)
+        return summary
+
+    def inline_summary(self, seo_report):
+        """Summary of a report sent by the client instead of an analysis id"""
+        if isinstance(seo_report, str):
+            try:
+                seo_report = json.loads(seo_report)
+            except ValueError:
+                return _plain(seo_report, self.summary_token_budget * 4)
+        if isinstance(seo_report, dict):
+            return compact_prompt_data(seo_report, self.summary_token_budget)
+        return None
+
+    def conversation_key(self, user_id, conversation_id=None):
+        return f"{user_id}:{conversation_id or 'default'}"
+
+    def load(self, key):
+        return self.memory.get(key) or {'turns': [], 'topics': []}
+
+    def reset(self, key):
+        self.memory.delete(key)
+
+    def record(self, key, conversation, user_message, reply):
+        turns = conversation['turns'] + [['user', _plain(user_message, self.turn_chars)],
+                                         ['model', _plain(reply, self.turn_chars)]]
+        topics = list(conversation['topics'])
+        if len(turns) > self.max_turns:
+            evicted, turns = turns[:-self.max_turns], turns[-self.max_turns:]
+            topics.extend(_plain(text, 80) for role, text in evicted if role == 'user')
+        conversation = {'turns': turns, 'topics': topics[-self.max_topics:]}
+        self.memory.set(key, conversation)
+        return conversation
+
+    def render_history(self, conversation):
+        """Conversation so far as prompt text, at most history_token_budget tokens"""
+        budget = self.history_token_budget
+        lines = []
+        for role, text in reversed(conversation['turns']):
+            line = f"{'User' if role == 'user' else 'Twinkle'}: {text}"
+            cost = estimate_tokens(line) + 1
+            if cost > budget:
+                break
+            lines.append(line)
+            budget -= cost
+
+        # Turns that no longer fit become topics, like turns evicted from the window
+        skipped = conversation['turns'][:len(conversation['turns']) - len(lines)]
+        topics = conversation['topics'] + [_plain(text, 80) for role, text in skipped if role == 'user']
+        if topics:
+            line = _plain("Earlier the user asked about: " + "; ".join(topics[-self.max_topics:]), budget * 4)
+            if estimate_tokens(line) <= budget:
+                lines.append(line)
+        return "\n".join(reversed(lines))
+
+
+def create_chat_context():
+    """Build the chatbot context from CHAT_* environment variables"""
+    memory = create_cache_from_env('CHAT_MEMORY', 86400, 1000, os.path.join('instance', 'chat_memory.db'))
+    return ChatContext(
+        memory=memory,
+        summary_token_budget=int(os.environ.get('CHAT_SUMMARY_TOKEN_BUDGET', '600')),
+        history_token_budget=int(os.environ.get('CHAT_HISTORY_TOKEN_BUDGET', '800')),
+        max_turns=int(os.environ.get('CHAT_MAX_TURNS', '12'))
+    )
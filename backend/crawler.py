@@ -0,0 +1,352 @@
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from io import BytesIO
+from urllib.parse import urldefrag, urljoin, urlparse, urlunparse, parse_qsl, urlencode
+from urllib.robotparser import RobotFileParser
+
+from fetcher import USER_AGENT, PageFetcher
+
+logger = logging.getLogger(__name__)
+
+SKIP_EXTENSIONS = (
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.pdf', '.zip', '.gz',
+    '.mp3', '.mp4', '.webm', '.avi', '.mov', '.css', '.js', '.json', '.xml', '.woff', '.woff2',
+    '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.exe', '.dmg'
+)
+MAX_SITEMAPS = 50
+# The sitemap protocol's limit for one file, uncompressed; far above the page fetcher's body cap
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+# Seconds between progress reports; each one also keeps the job from being recovered as stale
+PROGRESS_INTERVAL = 5
+
+
+def canonicalize_url(url):
+    """Normalize a URL for deduplication: lowercase scheme/host, no fragment, sorted query"""
+    url, _ = urldefrag(url)
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme == 'http' and netloc.endswith(':80')) or (scheme == 'https' and netloc.endswith(':443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, netloc, parsed.path or '/', parsed.params, query, ''))
+
+
+def _url_hash(url):
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+
+
+class SiteCrawler:
+    """Audits a whole site by following internal links from a start URL or sitemap.
+
+    The frontier, the seen-URL set and per-page results all live in a SQLite
+    file rather than Python containers, so memory use stays flat however large
+    the site is. Only the pages currently being fetched are held in memory.
+    """
+
+    def __init__(self, analyzer, start_url, max_pages=500, max_depth=3, concurrency=8,
+                 sitemap_url=None, respect_robots=True, workdir=None):
+        self.analyzer = analyzer
+        self.start_url = canonicalize_url(start_url)
+        self.host = urlparse(self.start_url).netloc
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.sitemap_url = sitemap_url
+        self.respect_robots = respect_robots
+        self.robots = None
+        self.crawl_delay = None
+        self._sitemap_fetcher = None
+
+        if workdir is not None:
+            os.makedirs(workdir, exist_ok=True)
+        self._workdir = tempfile.mkdtemp(prefix='crawl-', dir=workdir)
+        self.db = sqlite3.connect(os.path.join(self._workdir, 'crawl.db'), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.executescript("""
+            CREATE TABLE urls (
+                url_hash BLOB PRIMARY KEY,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                from_sitemap INTEGER NOT NULL DEFAULT 0,
+                inlinks INTEGER NOT NULL DEFAULT 0,
+                referrer TEXT
+            );
+            CREATE INDEX ix_urls_frontier ON urls (state, depth);
+            CREATE TABLE pages (
+                url_hash BLOB PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER,
+                score REAL,
+                title TEXT,
+                meta_description TEXT,
+                error TEXT
+            );
+        """)
+
+    def close(self):
+        self.db.close()
+        if self._sitemap_fetcher is not None:
+            self._sitemap_fetcher.session.close()
+        shutil.rmtree(self._workdir, ignore_errors=True)
+
+    def _is_internal(self, url):
+        parsed = urlparse(url)
+        return parsed.scheme in ('http', 'https') and parsed.netloc.lower() == self.host
+
+    def _allowed(self, url):
+        if self.robots is None:
+            return True
+        return self.robots.can_fetch(USER_AGENT, url)
+
+    def _enqueue(self, links, depth, referrer=None, from_sitemap=False):
+        """Insert new URLs into the frontier, or bump the inlink count of known ones"""
+        state = 'queued' if depth <= self.max_depth else 'skipped'
+        rows = []
+        for url in links:
+            if not self._is_internal(url) or url.lower().endswith(SKIP_EXTENSIONS):
+                continue
+            if not self._allowed(url):
+                continue
+            rows.append((_url_hash(url), url, depth, state, int(from_sitemap), 0 if from_sitemap else 1, referrer))
+        # A URL first seen beyond max_depth is promoted if it is later found at a shallower depth
+        self.db.executemany("""
+            INSERT INTO urls (url_hash, url, depth, state, from_sitemap, inlinks, referrer)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url_hash) DO UPDATE SET
+                inlinks = inlinks + excluded.inlinks,
+                from_sitemap = MAX(from_sitemap, excluded.from_sitemap),
+                referrer = COALESCE(referrer, excluded.referrer),
+                state = CASE WHEN state = 'skipped' AND excluded.state = 'queued' THEN 'queued' ELSE state END,
+                depth = MIN(depth, excluded.depth)
+        """, rows)
+
+    def _load_robots(self):
+        robots_url = urlunparse((urlparse(self.start_url).scheme, self.host, '/robots.txt', '', '', ''))
+        parser = RobotFileParser(robots_url)
+        try:
+            page = self.analyzer.fetcher.fetch(robots_url)
+            parser.parse(page.body.decode('utf-8', errors='replace').splitlines())
+        except Exception:
+            # No robots.txt (or an unreachable one) means everything is allowed
+            parser.parse([])
+        self.robots = parser
+        self.crawl_delay = parser.crawl_delay(USER_AGENT)
+
+    def _sitemap_urls(self, sitemap_url):
+        """Yield page URLs from a sitemap or sitemap index, streaming the XML"""
+        pending = [sitemap_url]
+        visited = 0
+        while pending and visited < MAX_SITEMAPS:
+            url = pending.pop()
+            visited += 1
+            if self._sitemap_fetcher is None:
+                self._sitemap_fetcher = PageFetcher(max_body_bytes=SITEMAP_MAX_BYTES, validator_cache_bytes=0)
+            try:
+                page = self._sitemap_fetcher.fetch(url)
+                body = page.body
+                if body[:2] == b'\x1f\x8b':
+                    body = gzip.decompress(body)
+            except Exception as e:
+                logger.warning("could not fetch sitemap", extra={'sitemap': url, 'error': str(e)})
+                continue
+            if page.truncated:
+                # The URLs before the cut are still read; the parse error at the cut is expected
+                logger.warning("sitemap truncated", extra={'sitemap': url, 'max_bytes': SITEMAP_MAX_BYTES})
+            try:
+                for _, elem in ElementTree.iterparse(BytesIO(body), events=('end',)):
+                    tag = elem.tag.rsplit('}', 1)[-1]
+                    if tag == 'loc' and elem.text:
+                        loc = elem.text.strip()
+                        if loc.endswith('.xml') or loc.endswith('.xml.gz'):
+                            pending.append(loc)
+                        else:
+                            yield canonicalize_url(loc)
+                    elem.clear()
+            except ElementTree.ParseError as e:
+                if not page.truncated:
+                    logger.warning("invalid sitemap", extra={'sitemap': url, 'error': str(e)})
+
+    def _seed(self):
+        self._enqueue([self.start_url], 0)
+        sitemap_url = self.sitemap_url
+        if sitemap_url is None and self.start_url.endswith('.xml'):
+            sitemap_url = self.start_url
+        if sitemap_url:
+            batch = []
+            for url in self._sitemap_urls(sitemap_url):
+                batch.append(url)
+                if len(batch) >= 1000:
+                    self._enqueue(batch, 0, from_sitemap=True)
+                    batch = []
+            self._enqueue(batch, 0, from_sitemap=True)
+        self.db.commit()
+
+    def _next_batch(self, limit):
+        rows = self.db.execute(
+            "SELECT url_hash, url, depth FROM urls WHERE state = 'queued' ORDER BY depth LIMIT ?", (limit,)
+        ).fetchall()
+        self.db.executemany("UPDATE urls SET state = 'fetching' WHERE url_hash = ?", [(row[0],) for row in rows])
+        return rows
+
+    def _crawl_page(self, url):
+        if self.crawl_delay:
+            time.sleep(self.crawl_delay)
+        page = self.analyzer.fetcher.fetch(url)
+        facts = self.analyzer.extractor.extract(page.body, page.encoding)
+        analysis = self.analyzer.analyze_facts(facts, url, keywords=False)
+        links = set()
+        for href in facts.links:
+            if href.startswith(('mailto:', 'tel:', 'javascript:', '#')):
+                continue
+            links.add(canonicalize_url(urljoin(page.final_url or url, href)))
+        aliases = {canonicalize_url(page.final_url or url)}
+        if facts.canonical:
+            aliases.add(canonicalize_url(urljoin(url, facts.canonical)))
+        aliases.discard(url)
+        return page, analysis, links, aliases
+
+    def _record(self, url_hash, url, depth, result, error):
+        if error is not None:
+            status = getattr(error, 'status_code', None)
+            self.db.execute("UPDATE urls SET state = 'failed' WHERE url_hash = ?", (url_hash,))
+            self.db.execute("INSERT OR REPLACE INTO pages (url_hash, url, status, error) VALUES (?, ?, ?, ?)",
+                            (url_hash, url, status, str(error)))
+            return
+
+        page, analysis, links, aliases = result
+        self.db.execute("UPDATE urls SET state = 'done' WHERE url_hash = ?", (url_hash,))
+        self.db.execute(
+            "INSERT OR REPLACE INTO pages (url_hash, url, status, score, title, meta_description) VALUES (?, ?, ?, ?, ?, ?)",
+            (url_hash, url, page.status_code, analysis['seo_score'],
+             analysis['title']['text'], analysis['meta_description']['text'])
+        )
+        # Redirect targets and declared canonicals are the same page: never crawl them again
+        self.db.executemany(
+            "INSERT INTO urls (url_hash, url, depth, state, inlinks) VALUES (?, ?, ?, 'duplicate', 0) "
+            "ON CONFLICT(url_hash) DO UPDATE SET state = CASE WHEN state IN ('queued', 'skipped') THEN 'duplicate' ELSE state END",
+            [(_url_hash(alias), alias, depth) for alias in aliases if self._is_internal(alias)]
+        )
+        self._enqueue(links, depth + 1, referrer=url)
+
+    def _report_progress(self, progress, crawled):
+        queued = self.db.execute("SELECT COUNT(*) FROM urls WHERE state = 'queued'").fetchone()[0]
+        # Pages crawled / pages expected so far; at most max_pages, so it fits AnalysisJob.stage
+        progress(f'crawling {crawled}/{crawled + min(queued, self.max_pages - crawled)}')
+
+    def crawl(self, progress=None):
+        started = time.perf_counter()
+        if self.respect_robots:
+            self._load_robots()
+        self._seed()
+        if progress:
+            self._report_progress(progress, 0)
+        reported = time.monotonic()
+
+        concurrency = 1 if self.crawl_delay else self.concurrency
+        crawled = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            in_flight = {}
+            while True:
+                free = min(concurrency - len(in_flight), self.max_pages - crawled - len(in_flight))
+                if free > 0:
+                    for url_hash, url, depth in self._next_batch(free):
+                        in_flight[pool.submit(self._crawl_page, url)] = (url_hash, url, depth)
+                if not in_flight:
+                    break
+                # Time out so progress is reported even while every fetch in flight is slow
+                done, _ = wait(in_flight, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url_hash, url, depth = in_flight.pop(future)
+                    try:
+                        self._record(url_hash, url, depth, future.result(), None)
+                    except Exception as e:
+                        self._record(url_hash, url, depth, None, e)
+                    crawled += 1
+                self.db.commit()
+                if progress and time.monotonic() - reported >= PROGRESS_INTERVAL:
+                    self._report_progress(progress, crawled)
+                    reported = time.monotonic()
+
+        report = self.report()
+        report['elapsed'] = round(time.perf_counter() - started, 2)
+        report['pages_per_sec'] = round(crawled / report['elapsed'], 2) if report['elapsed'] else None
+        return report
+
+    def _duplicates(self, column, limit):
+        rows = self.db.execute(f"""
+            SELECT {column}, COUNT(*) AS n, GROUP_CONCAT(url, '\n') FROM (
+                SELECT {column}, url FROM pages WHERE error IS NULL AND {column} != ''
+            ) GROUP BY {column} HAVING n > 1 ORDER BY n DESC LIMIT ?
+        """, (limit,)).fetchall()
+        return [{'text': text, 'count': count, 'urls': urls.split('\n')[:10]} for text, count, urls in rows]
+
+    def report(self, limit=50):
+        crawled, failed, average = self.db.execute(
+            "SELECT COUNT(*), SUM(error IS NOT NULL), AVG(score) FROM pages"
+        ).fetchone()
+        buckets = dict(self.db.execute(
+            "SELECT MIN(CAST(score / 10 AS INTEGER), 9), COUNT(*) FROM pages WHERE score IS NOT NULL GROUP BY 1"
+        ).fetchall())
+        distribution = {f"{bucket * 10}-{bucket * 10 + 10}": buckets.get(bucket, 0) for bucket in range(10)}
+
+        orphans = [row[0] for row in self.db.execute(
+            "SELECT url FROM urls WHERE from_sitemap = 1 AND inlinks = 0 AND url != ? LIMIT ?",
+            (self.start_url, limit)
+        )]
+        broken = [
+            {'url': url, 'status': status, 'error': error, 'linked_from': referrer, 'inlinks': inlinks}
+            for url, status, error, referrer, inlinks in self.db.execute("""
+                SELECT pages.url, pages.status, pages.error, urls.referrer, urls.inlinks
+                FROM pages JOIN urls ON urls.url_hash = pages.url_hash
+                WHERE pages.error IS NOT NULL ORDER BY urls.inlinks DESC LIMIT ?
+            """, (limit,))
+        ]
+        unvisited = self.db.execute("SELECT COUNT(*) FROM urls WHERE state IN ('queued', 'skipped')").fetchone()[0]
+
+        return {
+            'start_url': self.start_url,
+            'pages_crawled': crawled,
+            'pages_failed': failed or 0,
+            'urls_not_crawled': unvisited,
+            'average_score': round(average, 1) if average is not None else None,
+            'score_distribution': distribution,
+            'duplicate_titles': self._duplicates('title', limit),
+            'duplicate_meta_descriptions': self._duplicates('meta_description', limit),
+            'orphan_pages': orphans,
+            'broken_links': broken,
+        }
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    from seo_analyzer import SEOAnalyzer
+
+    parser = argparse.ArgumentParser(description="Crawl and audit a whole site")
+    parser.add_argument('url')
+    parser.add_argument('--sitemap')
+    parser.add_argument('--max-pages', type=int, default=500)
+    parser.add_argument('--max-depth', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--ignore-robots', action='store_true')
+    args = parser.parse_args()
+
+    crawler = SiteCrawler(SEOAnalyzer(), args.url, max_pages=args.max_pages, max_depth=args.max_depth,
+                          concurrency=args.concurrency, sitemap_url=args.sitemap,
+                          respect_robots=not args.ignore_robots)
+    try:
+        print(json.dumps(crawler.crawl(), indent=2))
+    finally:
+        crawler.close()
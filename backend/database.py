@@ -1,8 +1,81 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect, text
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+import logging
+from urllib.parse import urlparse
+import json
+import os
+import zlib
+from collections.abc import Mapping
+from contextlib import contextmanager
+from payload_store import MissingDictionary, create_payload_store
+from results import encode_json
+from simhash import from_hex, to_signed
+from analysis_diff import diff_analyses
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_lock key held while migrate_schema() runs
+MIGRATION_LOCK_ID = 72150413
 
 db = SQLAlchemy()
+payload_store = create_payload_store()
+
+DEFAULT_DATABASE_URL = 'sqlite:///seo_analyzer.db'
+
+def database_url():
+    """DATABASE_URL, with the postgres:// scheme some hosts hand out mapped to postgresql://"""
+    url = os.environ.get('DATABASE_URL') or DEFAULT_DATABASE_URL
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def engine_options(url):
+    """SQLAlchemy engine options for url from the DB_* environment variables"""
+    if url in ('sqlite://', 'sqlite:///:memory:'):
+        # In-memory databases use a single shared connection, nothing to size
+        return {}
+    options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', '30')),
+    }
+    if url.startswith('sqlite'):
+        # sqlite3's own lock timeout; the busy_timeout pragma below covers the same wait
+        options['connect_args'] = {'timeout': int(os.environ.get('DB_BUSY_TIMEOUT_MS', '5000')) / 1000}
+    else:
+        # Server connections can be dropped by the database or a proxy while idle
+        options['pool_recycle'] = int(os.environ.get('DB_POOL_RECYCLE', '1800'))
+        options['pool_pre_ping'] = True
+    return options
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers run alongside the single writer, and writers wait
+    busy_timeout ms for the lock instead of failing with 'database is locked'"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(os.environ.get('DB_BUSY_TIMEOUT_MS', '5000'))}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+def configure_database(app):
+    """Point db at DATABASE_URL with pool settings and, for SQLite, the concurrency pragmas"""
+    url = database_url()
+    # Flask-SQLAlchemy only creates the instance folder for relative SQLite paths; crawls keep their work files there
+    os.makedirs(app.instance_path, exist_ok=True)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+    db.init_app(app)
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _sqlite_pragmas)
+        logger.info("database configured", extra={'database': db.engine.url.render_as_string(hide_password=True)})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -17,10 +90,338 @@ class User(db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+# Analysis categories whose scores are promoted to <category>_score columns
+SCORE_CATEGORIES = ('title', 'meta_description', 'headings', 'content', 'images', 'links', 'technical', 'readability')
+
 class SEOAnalysis(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     url = db.Column(db.String(500), nullable=False)
+    domain = db.Column(db.String(255))
     seo_score = db.Column(db.Float)
-    analysis_data = db.Column(db.Text)  
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    title_score = db.Column(db.Float)
+    meta_description_score = db.Column(db.Float)
+    headings_score = db.Column(db.Float)
+    content_score = db.Column(db.Float)
+    images_score = db.Column(db.Float)
+    links_score = db.Column(db.Float)
+    technical_score = db.Column(db.Float)
+    readability_score = db.Column(db.Float)
+    # Version of the scoring profile seo_score was computed with; NULL for rows saved before profiles
+    score_profile = db.Column(db.String(20))
+    # SimHash of the page's main text (simhash.py) as a signed 64-bit integer; NULL for rows saved before it
+    content_simhash = db.Column(db.BigInteger)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Uncompressed JSON of rows saved before payload existed, emptied by migrate_payloads()
+    analysis_data = db.deferred(db.Column(db.Text))
+    # Full analysis, compressed by payload_store. Deferred, and the last column, so
+    # list queries neither load it nor walk its overflow pages in SQLite
+    payload = db.deferred(db.Column(db.LargeBinary))
+    
+    # History is always read per user, newest first or by score, with id as the keyset tie-breaker
+    __table_args__ = (
+        db.Index('ix_seo_analysis_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_seo_analysis_user_score', 'user_id', 'seo_score', 'id'),
+        db.Index('ix_seo_analysis_user_domain_created', 'user_id', 'domain', 'created_at', 'id'),
+        db.Index('ix_seo_analysis_user_url_created', 'user_id', 'url', 'created_at', 'id'),
+        # Covers the duplicate index's load and catch-up queries, which never touch the table rows
+        db.Index('ix_seo_analysis_user_simhash', 'user_id', 'id', 'content_simhash'),
+    )
+    
+    @classmethod
+    def from_analysis(cls, user_id, url, analysis, encoded=None):
+        """Row for analysis; encoded is its results.encode_json bytes when the caller already has them"""
+        return cls(
+            user_id=user_id,
+            url=url,
+            payload=payload_store.compress(encoded) if encoded is not None else payload_store.encode(analysis),
+            **summary_columns(url, analysis)
+        )
+    
+    def load_analysis(self):
+        """The full analysis dict, or None if it cannot be read; decompresses the payload on access"""
+        try:
+            analysis = decode_analysis(self.payload, self.analysis_data)
+        except (ValueError, zlib.error) as e:
+            logger.error("could not read stored analysis", extra={'analysis_id': self.id, 'error': str(e)})
+            return None
+        if analysis is not None and self.score_profile is not None:
+            # Re-scoring only updates the columns, so they win over the payload's copy
+            analysis['seo_score'] = self.seo_score
+            analysis['score_profile'] = self.score_profile
+        return analysis
+    
+    def previous(self):
+        """The user's analysis of the same URL saved just before this one"""
+        query = SEOAnalysis.query.filter(SEOAnalysis.user_id == self.user_id, SEOAnalysis.url == self.url)
+        if self.id is not None:
+            query = query.filter(db.tuple_(SEOAnalysis.created_at, SEOAnalysis.id) < db.tuple_(self.created_at, self.id))
+        return query.order_by(SEOAnalysis.created_at.desc(), SEOAnalysis.id.desc()).first()
+
+class AnalysisDiff(db.Model):
+    """Changes between an analysis and the previous analysis of the same URL, stored at write time"""
+    id = db.Column(db.Integer, primary_key=True)
+    analysis_id = db.Column(db.Integer, db.ForeignKey('seo_analysis.id'), nullable=False, unique=True)
+    previous_id = db.Column(db.Integer, db.ForeignKey('seo_analysis.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    url = db.Column(db.String(500), nullable=False)
+    seo_score_delta = db.Column(db.Float)
+    changes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('ix_analysis_diff_user_url_created', 'user_id', 'url', 'created_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'analysis_id': self.analysis_id,
+            'previous_id': self.previous_id,
+            'seo_score_delta': self.seo_score_delta,
+            'changes': json.loads(self.changes),
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+def _add_diff(row, previous, analysis, previous_analysis):
+    changes = diff_analyses(previous_analysis, analysis)
+    diff = AnalysisDiff(
+        analysis_id=row.id,
+        previous_id=previous.id,
+        user_id=row.user_id,
+        url=row.url,
+        seo_score_delta=changes.get('seo_score', {}).get('delta', 0.0),
+        changes=json.dumps(changes),
+        created_at=row.created_at
+    )
+    db.session.add(diff)
+    return diff
+
+def save_analysis(user_id, url, analysis, encoded=None):
+    """Add an analysis to the session, with its diff against the previous analysis of the URL.
+
+    Returns (row, diff); diff is None for the first analysis of a URL. The
+    caller commits.
+    """
+    row = SEOAnalysis.from_analysis(user_id, url, analysis, encoded)
+    previous = row.previous()
+    db.session.add(row)
+    db.session.flush()
+    previous_analysis = previous.load_analysis() if previous else None
+    if previous_analysis is None:
+        return row, None
+    return row, _add_diff(row, previous, analysis, previous_analysis)
+
+def analysis_diff(row):
+    """The stored diff for row, computed and stored now for analyses saved before diffs existed"""
+    diff = AnalysisDiff.query.filter_by(analysis_id=row.id).first()
+    if diff is not None:
+        return diff
+    previous = row.previous()
+    if previous is None:
+        return None
+    analysis, previous_analysis = row.load_analysis(), previous.load_analysis()
+    if analysis is None or previous_analysis is None:
+        return None
+    diff = _add_diff(row, previous, analysis, previous_analysis)
+    db.session.commit()
+    return diff
+
+class PayloadDictionary(db.Model):
+    """Shared compression dictionaries for SEOAnalysis.payload; rows are never modified"""
+    id = db.Column(db.Integer, primary_key=True)
+    codec = db.Column(db.String(10), nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    samples = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+def summary_columns(url, analysis):
+    """Column values promoted out of an analysis dict"""
+    columns = {'domain': urlparse(url).netloc.lower(), 'seo_score': analysis.get('seo_score'),
+               'score_profile': analysis.get('score_profile')}
+    for category in SCORE_CATEGORIES:
+        section = analysis.get(category)
+        columns[f'{category}_score'] = section.get('score') if isinstance(section, Mapping) else None
+    content = analysis.get('content')
+    columns['content_simhash'] = to_signed(from_hex(content.get('simhash'))) if isinstance(content, Mapping) else None
+    return columns
+
+def decode_analysis(payload, analysis_data=None):
+    if payload is not None:
+        try:
+            return payload_store.decode(payload)
+        except MissingDictionary as e:
+            # Trained by another worker since this one loaded its dictionaries
+            dictionary = db.session.get(PayloadDictionary, e.dict_id)
+            if dictionary is None:
+                raise
+            payload_store.add_dictionary(dictionary.id, dictionary.codec, dictionary.data)
+            return payload_store.decode(payload)
+    return json.loads(analysis_data) if analysis_data else None
+
+def load_payload_dictionaries():
+    for dictionary in PayloadDictionary.query.order_by(PayloadDictionary.id):
+        payload_store.add_dictionary(dictionary.id, dictionary.codec, dictionary.data)
+
+def train_payload_dictionary(sample_size=500):
+    """Train a dictionary on the newest analyses and use it for new payloads.
+
+    Returns the new PayloadDictionary, or None if there are no analyses yet.
+    Existing payloads keep the dictionary they were written with.
+    """
+    rows = db.session.execute(
+        db.select(SEOAnalysis.payload, SEOAnalysis.analysis_data)
+        .order_by(SEOAnalysis.id.desc()).limit(sample_size)
+    ).all()
+    samples = []
+    for payload, data in rows:
+        try:
+            analysis = decode_analysis(payload, data)
+        except (ValueError, zlib.error):
+            continue
+        if analysis is not None:
+            samples.append(encode_json(analysis))
+    if not samples:
+        return None
+    dictionary = PayloadDictionary(codec=payload_store.codec, data=payload_store.train(samples), samples=len(samples))
+    db.session.add(dictionary)
+    db.session.commit()
+    payload_store.add_dictionary(dictionary.id, dictionary.codec, dictionary.data)
+    logger.info("trained payload dictionary", extra={
+        'codec': dictionary.codec, 'dictionary_id': dictionary.id, 'bytes': len(dictionary.data), 'samples': len(samples)
+    })
+    return dictionary
+
+def migrate_payloads(batch_size=200, min_samples=None):
+    """Compress analysis_data of older rows into payload.
+
+    Trains the first dictionary for the active codec once at least
+    PAYLOAD_DICT_MIN_SAMPLES analyses exist, so the rows being converted
+    already benefit from it.
+    """
+    load_payload_dictionaries()
+    if min_samples is None:
+        min_samples = int(os.environ.get('PAYLOAD_DICT_MIN_SAMPLES', '100'))
+    if payload_store.codec not in payload_store.active and db.session.query(SEOAnalysis.id).count() >= min_samples:
+        train_payload_dictionary()
+    
+    converted = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(SEOAnalysis.id, SEOAnalysis.analysis_data)
+            .where(SEOAnalysis.id > last_id, SEOAnalysis.payload.is_(None), SEOAnalysis.analysis_data.isnot(None))
+            .order_by(SEOAnalysis.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        updates = []
+        for row_id, data in rows:
+            try:
+                updates.append({'id': row_id, 'payload': payload_store.encode(json.loads(data)), 'analysis_data': None})
+            except (ValueError, zlib.error):
+                # Unreadable JSON is left as it is rather than lost
+                continue
+        if updates:
+            db.session.execute(db.update(SEOAnalysis), updates)
+            db.session.commit()
+        converted += len(updates)
+    if converted:
+        logger.info("compressed stored analyses", extra={'rows': converted})
+        if db.engine.dialect.name == 'sqlite':
+            # Return the space the JSON text used to the filesystem
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text('VACUUM'))
+
+@contextmanager
+def migration_lock():
+    """Exclusive lock shared by every process using the database, held while migrating.
+
+    An advisory lock on PostgreSQL and a lock file next to the database on
+    SQLite; other databases, and SQLite on Windows, are not locked.
+    """
+    engine = db.engine
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as conn:
+            conn.execute(text('SELECT pg_advisory_lock(:id)'), {'id': MIGRATION_LOCK_ID})
+            try:
+                yield
+            finally:
+                conn.execute(text('SELECT pg_advisory_unlock(:id)'), {'id': MIGRATION_LOCK_ID})
+        return
+    path = engine.url.database if engine.dialect.name == 'sqlite' else None
+    if not path or path == ':memory:' or fcntl is None:
+        yield
+        return
+    with open(path + '.migrate.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def migrate_schema(batch_size=500):
+    """Create missing tables and bring existing ones up to the current models.
+
+    create_all() only creates missing tables, so this adds missing columns
+    and indexes to existing ones, backfills the promoted summary columns
+    and compresses old analysis_data into payload. Safe to run on every
+    start: workers starting together take turns under migration_lock(),
+    and those after the first find nothing left to do.
+    """
+    with migration_lock():
+        db.create_all()
+        _migrate_schema(batch_size)
+
+def _migrate_schema(batch_size):
+    engine = db.engine
+    inspector = inspect(engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        quote = engine.dialect.identifier_preparer.quote
+        with engine.begin() as conn:
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}'))
+                    logger.info("added column", extra={'table': table.name, 'column': column.name})
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    
+    backfilled = 0
+    while True:
+        rows = db.session.execute(
+            db.select(SEOAnalysis.id, SEOAnalysis.url, SEOAnalysis.payload, SEOAnalysis.analysis_data)
+            .where(SEOAnalysis.domain.is_(None)).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for row_id, url, payload, data in rows:
+            try:
+                analysis = decode_analysis(payload, data) or {}
+            except (ValueError, zlib.error):
+                analysis = {}
+            updates.append(dict(summary_columns(url, analysis), id=row_id))
+        db.session.execute(db.update(SEOAnalysis), updates)
+        db.session.commit()
+        backfilled += len(updates)
+    if backfilled:
+        logger.info("backfilled summary columns", extra={'rows': backfilled})
+    
+    migrate_payloads()
+
+class AnalysisJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False, default='analyze')
+    payload = db.Column(db.Text)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    stage = db.Column(db.String(20))
+    stages = db.Column(db.Text)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
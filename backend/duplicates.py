@@ -0,0 +1,175 @@
+"""Near-duplicate content across a user's analyses.
+
+Every analysis stores the SimHash of its main text (simhash.py) in
+SEOAnalysis.content_simhash. DuplicateIndex keeps one SimHashIndex per
+user in memory:
+
+- loaded from that column on first use, by an index-only scan of
+  ix_seo_analysis_user_simhash that never reads the payloads;
+- brought up to date with the user's rows added since, before every
+  lookup, so analyses saved by other workers are found too;
+- evicted least recently used first once all users' indexes together
+  hold more than max_entries fingerprints (about 48 bytes each);
+- rebuilt after ttl seconds, which drops deleted rows and picks up rows
+  that another process committed after a higher id was already synced.
+
+The index holds every stored analysis, older analyses of a URL included.
+find_duplicates() resolves the matches and keeps only the latest analysis
+of each other URL.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import func
+
+from database import SEOAnalysis, db
+from simhash import BITS, MAX_DISTANCE, SimHashIndex, from_signed
+
+logger = logging.getLogger(__name__)
+
+# Matches resolved against the database per lookup; older analyses of one URL can take several
+MAX_CANDIDATES = 200
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class _UserIndex:
+    __slots__ = ('index', 'synced_id', 'loaded_at', 'lock')
+
+    def __init__(self, loaded_at):
+        self.index = SimHashIndex()
+        self.synced_id = 0
+        self.loaded_at = loaded_at
+        self.lock = threading.Lock()
+
+
+class DuplicateIndex:
+    """Per-user SimHash indexes over the stored analyses, bounded to max_entries fingerprints"""
+
+    def __init__(self, max_entries=1000000, ttl=3600, max_distance=MAX_DISTANCE, limit=10):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = min(max_distance, MAX_DISTANCE)
+        self.limit = limit
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+        self.lookups = 0
+
+    def _user_index(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or now - entry.loaded_at > self.ttl:
+                entry = self._users[user_id] = _UserIndex(now)
+                self.loads += 1
+            self._users.move_to_end(user_id)
+        with entry.lock:
+            started = time.perf_counter()
+            rows = db.session.execute(
+                db.select(SEOAnalysis.id, SEOAnalysis.content_simhash)
+                .where(SEOAnalysis.user_id == user_id, SEOAnalysis.id > entry.synced_id,
+                       SEOAnalysis.content_simhash.isnot(None))
+                .order_by(SEOAnalysis.id)
+            ).all()
+            if rows:
+                entry.index.extend((row_id, from_signed(value)) for row_id, value in rows)
+                if not entry.synced_id:
+                    logger.info("loaded duplicate index", extra={
+                        'user_id': user_id, 'entries': len(rows),
+                        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+                    })
+                entry.synced_id = rows[-1][0]
+        self._evict(user_id)
+        return entry.index
+
+    def _evict(self, keep):
+        with self._lock:
+            total = sum(len(entry.index) for entry in self._users.values())
+            while total > self.max_entries and len(self._users) > 1:
+                user_id, entry = next(iter(self._users.items()))
+                if user_id == keep:
+                    break
+                del self._users[user_id]
+                total -= len(entry.index)
+                self.evictions += 1
+
+    def find_duplicates(self, row, limit=None):
+        """Latest analyses of the user's other URLs whose content is a near-duplicate of row's.
+
+        Closest first: [{analysis_id, url, distance, similarity, seo_score,
+        created_at}], where distance is the number of differing fingerprint
+        bits and similarity is 1 - distance / 64. Empty when row has no
+        fingerprint (no text, or saved before fingerprints existed).
+        """
+        if row.content_simhash is None:
+            return []
+        limit = self.limit if limit is None else limit
+        index = self._user_index(row.user_id)
+        self.lookups += 1
+        matches = [(bits, analysis_id) for bits, analysis_id in
+                   index.lookup(from_signed(row.content_simhash), self.max_distance) if analysis_id != row.id]
+        matches = matches[:MAX_CANDIDATES]
+        if not matches:
+            return []
+
+        rows = {candidate.id: candidate for candidate in db.session.execute(
+            db.select(SEOAnalysis.id, SEOAnalysis.url, SEOAnalysis.seo_score, SEOAnalysis.created_at)
+            .where(SEOAnalysis.user_id == row.user_id, SEOAnalysis.id.in_([match[1] for match in matches]))
+        )}
+        urls = {candidate.url for candidate in rows.values()} - {row.url}
+        if not urls:
+            return []
+        latest = dict(db.session.execute(
+            db.select(SEOAnalysis.url, func.max(SEOAnalysis.id))
+            .where(SEOAnalysis.user_id == row.user_id, SEOAnalysis.url.in_(urls))
+            .group_by(SEOAnalysis.url)
+        ).all())
+
+        duplicates = []
+        for bits, analysis_id in matches:
+            candidate = rows.get(analysis_id)
+            # Rows gone since they were indexed, and superseded analyses of a URL, are skipped
+            if candidate is None or candidate.url == row.url or latest.get(candidate.url) != analysis_id:
+                continue
+            duplicates.append({
+                'analysis_id': analysis_id,
+                'url': candidate.url,
+                'distance': bits,
+                'similarity': round(1 - bits / BITS, 3),
+                'seo_score': candidate.seo_score,
+                'created_at': candidate.created_at.strftime(DATE_FORMAT) if candidate.created_at else None
+            })
+            if len(duplicates) >= limit:
+                break
+        return duplicates
+
+    def stats(self):
+        with self._lock:
+            indexes = [entry.index for entry in self._users.values()]
+        return {
+            'users': len(indexes),
+            'entries': sum(len(index) for index in indexes),
+            'memory_bytes': sum(index.memory_bytes() for index in indexes),
+            'max_entries': self.max_entries,
+            'loads': self.loads,
+            'evictions': self.evictions,
+            'lookups': self.lookups
+        }
+
+
+def create_duplicate_index():
+    """DuplicateIndex from DUPLICATE_* environment variables, or None if DUPLICATE_INDEX_MAX_ENTRIES is 0"""
+    max_entries = int(os.environ.get('DUPLICATE_INDEX_MAX_ENTRIES', '1000000'))
+    if max_entries <= 0:
+        return None
+    return DuplicateIndex(
+        max_entries=max_entries,
+        ttl=int(os.environ.get('DUPLICATE_INDEX_TTL', '3600')),
+        max_distance=int(os.environ.get('DUPLICATE_MAX_DISTANCE', str(MAX_DISTANCE))),
+        limit=int(os.environ.get('DUPLICATE_LIMIT', '10'))
+    )
@@ -0,0 +1,245 @@
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+_timing = threading.local()
+
+
+class _TimedConnectionMixin:
+    """Records DNS and connect (TCP + TLS) time for newly opened connections.
+
+    The host is resolved here so the lookup can be timed, and each resolved
+    address is tried in turn, as urllib3 itself would, until one accepts
+    the connection. Reused keep-alive connections never call connect(), so
+    their timings stay 0.
+    """
+
+    def connect(self):
+        record = getattr(_timing, 'record', None)
+        start = time.perf_counter()
+        original_host = self._dns_host
+        try:
+            addresses = list(dict.fromkeys(
+                info[4][0] for info in socket.getaddrinfo(original_host, self.port, 0, socket.SOCK_STREAM)))
+        except socket.gaierror:
+            addresses = []
+        # Unresolvable: let urllib3 raise its usual resolution error from connect()
+        addresses = addresses or [original_host]
+        resolved = time.perf_counter()
+        try:
+            for attempt, address in enumerate(addresses, 1):
+                self._dns_host = address
+                try:
+                    super().connect()
+                    break
+                except (NewConnectionError, ConnectTimeoutError):
+                    if attempt == len(addresses):
+                        raise
+        finally:
+            self._dns_host = original_host
+        if record is not None:
+            record['dns'] = resolved - start
+            record['connect'] = time.perf_counter() - resolved
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+class FetchError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FetchResult:
+    __slots__ = ('url', 'final_url', 'status_code', 'body', 'encoding', 'headers',
+                 'revalidated', 'truncated', 'timings')
+
+    def __init__(self, url, final_url, status_code, body, encoding, headers, revalidated, truncated, timings):
+        self.url = url
+        self.final_url = final_url
+        self.status_code = status_code
+        self.body = body
+        self.encoding = encoding
+        self.headers = headers
+        self.revalidated = revalidated
+        self.truncated = truncated
+        self.timings = timings
+
+    def to_dict(self):
+        return {
+            'status_code': self.status_code,
+            'final_url': self.final_url,
+            'bytes': len(self.body),
+            'content_encoding': self.headers.get('Content-Encoding', 'identity'),
+            'revalidated': self.revalidated,
+            'truncated': self.truncated,
+            'timings': {name: round(value * 1000, 2) for name, value in self.timings.items()},
+        }
+
+
+class PageFetcher:
+    """Process-wide HTTP fetcher with keep-alive pools and conditional revalidation.
+
+    Connections are pooled per host by the underlying urllib3 PoolManager.
+    Bodies of previously seen pages are kept in an LRU bounded to
+    validator_cache_bytes of bodies, together with their ETag /
+    Last-Modified validators, so repeat audits can be answered with a 304
+    instead of a full download.
+    """
+
+    def __init__(self, timeout=10, max_body_bytes=5 * 1024 * 1024, pool_connections=32,
+                 pool_maxsize=8, validator_cache_bytes=32 * 1024 * 1024):
+        self.timeout = timeout
+        self.max_body_bytes = max_body_bytes
+        self.validator_cache_bytes = validator_cache_bytes
+        self._validators = OrderedDict()
+        self._validator_bytes = 0
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.8',
+            'Accept-Encoding': ACCEPT_ENCODING,
+        })
+        adapter = _TimedHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _cached(self, url):
+        with self._lock:
+            entry = self._validators.get(url)
+            if entry is not None:
+                self._validators.move_to_end(url)
+            return entry
+
+    def _remember(self, url, result):
+        etag = result.headers.get('ETag')
+        last_modified = result.headers.get('Last-Modified')
+        if not (etag or last_modified) or result.truncated:
+            return
+        if not 0 < len(result.body) <= self.validator_cache_bytes:
+            return
+        with self._lock:
+            previous = self._validators.pop(url, None)
+            if previous is not None:
+                self._validator_bytes -= len(previous[2].body)
+            self._validators[url] = (etag, last_modified, result)
+            self._validator_bytes += len(result.body)
+            while self._validator_bytes > self.validator_cache_bytes:
+                _, (_, _, evicted) = self._validators.popitem(last=False)
+                self._validator_bytes -= len(evicted.body)
+
+    def fetch(self, url):
+        headers = {}
+        cached = self._cached(url)
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        timings = {'dns': 0.0, 'connect': 0.0, 'ttfb': 0.0, 'download': 0.0}
+        _timing.record = timings
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+        except requests.exceptions.RequestException as e:
+            raise FetchError(str(e))
+        finally:
+            _timing.record = None
+        headers_at = time.perf_counter()
+        timings['ttfb'] = max(0.0, headers_at - start - timings['dns'] - timings['connect'])
+
+        try:
+            if response.status_code == 304 and cached is not None:
+                # Consume the empty body so the connection goes back to the pool
+                response.content
+                previous = cached[2]
+                result = FetchResult(url, previous.final_url, previous.status_code, previous.body,
+                                     previous.encoding, previous.headers, True, False, timings)
+                timings['download'] = time.perf_counter() - headers_at
+                return result
+
+            response.raise_for_status()
+
+            chunks = []
+            received = 0
+            truncated = False
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                chunks.append(chunk)
+                received += len(chunk)
+                if received > self.max_body_bytes:
+                    truncated = True
+                    break
+            body = b''.join(chunks)[:self.max_body_bytes]
+            timings['download'] = time.perf_counter() - headers_at
+        except requests.exceptions.RequestException as e:
+            raise FetchError(str(e), status_code=response.status_code)
+        finally:
+            response.close()
+
+        encoding = None
+        if 'charset' in response.headers.get('Content-Type', '').lower():
+            encoding = response.encoding
+
+        result = FetchResult(url, response.url, response.status_code, body, encoding,
+                             response.headers, False, truncated, timings)
+        self._remember(url, result)
+        return result
+
+
+_shared_fetcher = None
+_shared_lock = threading.Lock()
+
+
+def get_fetcher():
+    global _shared_fetcher
+    if _shared_fetcher is None:
+        with _shared_lock:
+            if _shared_fetcher is None:
+                _shared_fetcher = PageFetcher()
+    return _shared_fetcher
@@ -1,26 +1,109 @@
 import os
 import json
+import logging
+import re
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 load_dotenv()
 
-class GeminiChatbot:
+logger = logging.getLogger(__name__)
+
+RESPONSE_MARKER = "Twinkle's Response:"
+# Friendly replies sent instead of an answer when the API call fails
+ERROR_REPLIES = {
+    'not_configured': "Twinkle is unavailable: Gemini API key not configured.",
+    'connection': "Twinkle is having trouble connecting to the AI service right now. Please try again later.",
+    'bad_response': "Twinkle is having trouble processing the response. Please try again.",
+    'no_candidates': "Twinkle is temporarily unavailable. Please try again later.",
+    'timeout': "Twinkle is taking too long to respond. Please try again.",
+    'unexpected': "Twinkle encountered an unexpected error. Please try again later.",
+}
+# Trailing text the formatter must hold back: whitespace/<br> runs and a partial "<br"
+_UNSETTLED_TAIL_RE = re.compile(r'(?:\s|<br>)*(?:<(?:br?)?)?\Z')
+
+
+def _partial_suffix(text, marker):
+    """Length of the longest suffix of text that is a proper prefix of marker"""
+    for length in range(min(len(text), len(marker) - 1), 0, -1):
+        if marker.startswith(text[-length:]):
+            return length
+    return 0
+
+
+class IncrementalFormatter:
+    """Chunk-by-chunk equivalent of cleaning a reply and running GeminiChatbot.format_response.
+
+    feed() returns the formatted text that can be sent now; close() returns
+    the rest. Text whose formatting depends on what comes next (a trailing
+    newline, a run of <br>s, a partial "<br" or response marker) is held back
+    until the next chunk settles it, so the concatenated output is identical
+    to formatting the whole reply at once.
+    """
+
     def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY2")
-        if not self.api_key:
-            print("❌ GEMINI_API_KEY2 not found in environment variables")
-        self.endpoint = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+        self._raw = ''
+        self._strip_marker = None
+        self._leading = True
+        self._tail = ''
 
-    def ask(self, user_message, seo_report=None):
-        if not self.api_key:
-            return {'reply': "Twinkle is unavailable: Gemini API key not configured."}
+    def feed(self, chunk):
+        return self._format(self._clean(chunk))
 
-        headers = {
-            "Content-Type": "application/json"
-        }
+    def close(self):
+        return self._format(self._clean('', final=True), final=True)
 
-        
+    def _clean(self, chunk, final=False):
+        text = self._raw + chunk
+        self._raw = ''
+        if self._strip_marker is None:
+            # The marker is only removed when the reply starts with it
+            stripped = text.lstrip()
+            if not final and (not stripped or RESPONSE_MARKER.startswith(stripped)):
+                self._raw = text
+                return ''
+            self._strip_marker = stripped.startswith(RESPONSE_MARKER)
+            text = stripped
+        if self._strip_marker:
+            text = text.replace(RESPONSE_MARKER, '')
+            keep = 0 if final else _partial_suffix(text, RESPONSE_MARKER)
+            if keep:
+                self._raw = text[-keep:]
+                text = text[:-keep]
+        if self._leading:
+            text = text.lstrip()
+            self._leading = not text
+        return text
+
+    def _format(self, text, final=False):
+        text = self._tail + text
+        if final:
+            text = text.rstrip()
+            self._tail = ''
+        else:
+            cut = _UNSETTLED_TAIL_RE.search(text).start()
+            self._tail = text[cut:]
+            text = text[:cut]
+        return GeminiChatbot.format_response(text)
+
+
+class GeminiChatbot:
+    def __init__(self, endpoint=None, timeout=None):
+        self.api_key = os.getenv("GEMINI_API_KEY2")
+        if not self.api_key:
+            logger.error("GEMINI_API_KEY2 not found in environment variables")
+        self.endpoint = endpoint or os.getenv(
+            "GEMINI_ENDPOINT", "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent")
+        self.stream_endpoint = self.endpoint.replace(':generateContent', ':streamGenerateContent')
+        self.timeout = timeout or float(os.getenv("GEMINI_TIMEOUT", "30"))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=int(os.getenv("GEMINI_POOL_SIZE", "8")))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _build_payload(self, user_message, seo_report=None, history=None):
         system_prompt = (
             "You are Twinkle, an expert SEO assistant chatbot. "
             "You help users understand their website's SEO report and provide actionable advice. "
@@ -41,6 +124,8 @@ class GeminiChatbot:
         full_prompt = system_prompt + "\n\n"
         if seo_report:
             full_prompt += f"SEO Report Context: {seo_report}\n\n"
+        if history:
+            full_prompt += f"Conversation so far:\n{history}\n\n"
         full_prompt += f"User Question: {user_message}\n\nTwinkle's Response:"
 
         payload = {
@@ -58,21 +143,28 @@ class GeminiChatbot:
                 "maxOutputTokens": 1000,
             }
         }
+        return payload
+
+    def ask(self, user_message, seo_report=None, history=None):
+        if not self.api_key:
+            return {'reply': ERROR_REPLIES['not_configured']}
+
+        headers = {
+            "Content-Type": "application/json"
+        }
+        payload = self._build_payload(user_message, seo_report, history)
 
         try:
-            print("🤖 Making request to Gemini API for chatbot...")
-            response = requests.post(
+            response = self.session.post(
                 f"{self.endpoint}?key={self.api_key}",
                 headers=headers,
                 json=payload,
-                timeout=30
+                timeout=self.timeout
             )
 
-            print(f"📊 Gemini chatbot response status: {response.status_code}")
-            
             if response.status_code != 200:
-                print("❌ Gemini API Error:", response.text)
-                return {'reply': "Twinkle is having trouble connecting to the AI service right now. Please try again later."}
+                logger.error("Gemini API error", extra={'status': response.status_code, 'body': response.text[:500]})
+                return {'reply': ERROR_REPLIES['connection']}
 
             result = response.json()
             
@@ -80,7 +172,7 @@ class GeminiChatbot:
                 candidate = result["candidates"][0]
                 if "content" in candidate and "parts" in candidate["content"]:
                     ai_response = candidate["content"]["parts"][0]["text"]
-                    print(f"✅ Successfully got Gemini chatbot response ({len(ai_response)} characters)")
+                    logger.info("chatbot response received", extra={'chars': len(ai_response)})
                     
                    
                     cleaned_response = ai_response.strip()
@@ -93,23 +185,92 @@ class GeminiChatbot:
                     return {'reply': cleaned_response}
                     
                 else:
-                    print("❌ Unexpected response structure - no content/parts found")
-                    return {'reply': "Twinkle is having trouble processing the response. Please try again."}
+                    logger.error("unexpected Gemini response structure - no content/parts found")
+                    return {'reply': ERROR_REPLIES['bad_response']}
             else:
-                print("❌ No candidates in response")
-                return {'reply': "Twinkle is temporarily unavailable. Please try again later."}
+                logger.error("no candidates in Gemini response")
+                return {'reply': ERROR_REPLIES['no_candidates']}
                 
         except requests.exceptions.Timeout:
-            print("❌ Request timeout")
-            return {'reply': "Twinkle is taking too long to respond. Please try again."}
+            logger.warning("Gemini chatbot request timed out")
+            return {'reply': ERROR_REPLIES['timeout']}
+        except requests.exceptions.RequestException as e:
+            logger.warning("Gemini chatbot request failed", extra={'error': str(e)})
+            return {'reply': ERROR_REPLIES['connection']}
+        except Exception as e:
+            logger.exception("unexpected chatbot error")
+            return {'reply': ERROR_REPLIES['unexpected']}
+
+    def ask_stream(self, user_message, seo_report=None, history=None):
+        """Yield the formatted reply piece by piece as streamGenerateContent produces it.
+
+        The pieces concatenate to the same text ask() would return. Failures
+        yield the same friendly messages as ask().
+        """
+        if not self.api_key:
+            yield ERROR_REPLIES['not_configured']
+            return
+
+        payload = self._build_payload(user_message, seo_report, history)
+        formatter = IncrementalFormatter()
+        started = time.perf_counter()
+        first_token = None
+        received = 0
+
+        try:
+            response = self.session.post(
+                f"{self.stream_endpoint}?alt=sse&key={self.api_key}",
+                headers={"Content-Type": "application/json"},
+                json=payload,
+                stream=True,
+                timeout=self.timeout
+            )
+            with response:
+                if response.status_code != 200:
+                    logger.error("Gemini API error", extra={'status': response.status_code, 'body': response.text[:500]})
+                    yield ERROR_REPLIES['connection']
+                    return
+
+                # chunk_size=None hands lines over as soon as each chunk arrives
+                for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                    if not line or not line.startswith('data:'):
+                        continue
+                    event = json.loads(line[5:])
+                    text = ''.join(
+                        part.get('text', '')
+                        for candidate in event.get('candidates', [])[:1]
+                        for part in candidate.get('content', {}).get('parts', [])
+                    )
+                    received += len(text)
+                    piece = formatter.feed(text)
+                    if piece:
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        yield piece
+
+            rest = formatter.close()
+            if rest:
+                yield rest
+            if not received:
+                logger.error("no candidates in streamed Gemini response")
+                yield ERROR_REPLIES['no_candidates']
+                return
+            logger.info("chatbot response streamed", extra={
+                'chars': received, 'first_token_ms': round((first_token or 0) * 1000)
+            })
+
+        except requests.exceptions.Timeout:
+            logger.warning("Gemini chatbot request timed out")
+            yield ERROR_REPLIES['timeout']
         except requests.exceptions.RequestException as e:
-            print(f"❌ Request error: {e}")
-            return {'reply': "Twinkle is having trouble connecting to the AI service right now. Please try again later."}
+            logger.warning("Gemini chatbot request failed", extra={'error': str(e)})
+            yield ERROR_REPLIES['connection']
         except Exception as e:
-            print(f"❌ Unexpected error: {e}")
-            return {'reply': "Twinkle encountered an unexpected error. Please try again later."}
-    
-    def format_response(self, response):
+            logger.exception("unexpected chatbot error")
+            yield ERROR_REPLIES['unexpected']
+
+    @staticmethod
+    def format_response(response):
         """Post-process the response to ensure proper formatting"""
         
         response = response.replace('\n•', '<br>•')
@@ -1,48 +1,116 @@
 import os
+import copy
+import hashlib
 import json
+import logging
+import threading
+import time
+from collections import deque
+
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+from cache import SingleFlight, TTLCache
+from prompt_builder import compact_prompt_data, estimate_tokens
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENDPOINT = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "topK": 40,
+    "topP": 0.95,
+    "maxOutputTokens": 2048,
+}
+PROMPT_INSTRUCTIONS = (
+    "You are an expert SEO consultant. Analyze the following website data and provide detailed, actionable SEO recommendations.\n\n"
+    "IMPORTANT: Respond ONLY with valid JSON in exactly this format:\n"
+    "{\n"
+    '  "priority_issues": [\n'
+    '    {\n'
+    '      "issue": "Title tag is too long",\n'
+    '      "recommendation": "Reduce title to under 60 characters",\n'
+    '      "impact": "High",\n'
+    '      "difficulty": "easy"\n'
+    '    }\n'
+    '  ],\n'
+    '  "quick_wins": [\n'
+    '    "Add missing alt text to images",\n'
+    '    "Optimize meta description length"\n'
+    '  ],\n'
+    '  "overall_assessment": "Your website has good foundation but needs improvements in technical SEO and content optimization."\n'
+    "}\n\n"
+    "Rules:\n"
+    "- priority_issues: Array of objects with issue, recommendation, impact, difficulty\n"
+    "- difficulty must be: 'easy', 'medium', or 'hard'\n"
+    "- impact should describe the SEO benefit\n"
+    "- quick_wins: Array of simple strings (actionable items)\n"
+    "- overall_assessment: Single paragraph summary\n"
+    "- Provide 3-5 priority issues and 3-5 quick wins\n"
+    "- Response must be valid JSON only, no other text\n\n"
+    "The data below lists every check with its 0-100 score, worst first; 'failing' names the checks below 70. "
+    "Focus the priority issues on failing checks.\n\n"
+    "Website Analysis Data:\n"
+)
+
+
+def is_fallback(suggestions):
+    """True for placeholder suggestions (API errors, unparseable replies), which must not be cached"""
+    return "error" in suggestions or bool(suggestions.get("fallback"))
+
+
+def create_suggestion_cache():
+    """Suggestion cache from GEMINI_CACHE_* environment variables (None when disabled)"""
+    max_entries = int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "500"))
+    if max_entries <= 0:
+        return None
+    return TTLCache(max_entries=max_entries, ttl=int(os.getenv("GEMINI_CACHE_TTL", "86400")))
+
+
 class GeminiSEOAssistant:
-    def __init__(self):
+    """Gets SEO suggestions for an analysis from the Gemini generateContent API.
+
+    Responses are cached by a hash of the exact prompt and generation config,
+    and concurrent identical requests share one in-flight API call. Calls go
+    through a pooled requests.Session.
+    """
+
+    def __init__(self, endpoint=None, cache=None, timeout=None, prompt_token_budget=None):
         self.api_key = os.getenv("GEMINI_API_KEY")
         if not self.api_key:
-            print("❌ GEMINI_API_KEY not found in environment variables")
-        self.endpoint = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+            logger.error("GEMINI_API_KEY not found in environment variables")
+        self.endpoint = endpoint or os.getenv("GEMINI_ENDPOINT", DEFAULT_ENDPOINT)
+        self.timeout = timeout or float(os.getenv("GEMINI_TIMEOUT", "30"))
+        self.cache = cache if cache is not None else create_suggestion_cache()
+        self.prompt_token_budget = prompt_token_budget or int(os.getenv("GEMINI_PROMPT_TOKEN_BUDGET", "1200"))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=int(os.getenv("GEMINI_POOL_SIZE", "8")))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._inflight = SingleFlight()
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=512)
+        self._prompt_tokens = deque(maxlen=512)
+        self.requests = 0
+        self.cache_hits = 0
+        self.api_calls = 0
+        self.api_errors = 0
+
+    def cache_key(self, prompt_text):
+        digest = hashlib.sha256()
+        digest.update(self.endpoint.encode("utf-8"))
+        digest.update(json.dumps(GENERATION_CONFIG, sort_keys=True).encode("utf-8"))
+        digest.update(prompt_text.encode("utf-8"))
+        return digest.hexdigest()
 
     def _format_prompt(self, analysis_data):
-        prompt = (
-            "You are an expert SEO consultant. Analyze the following website data and provide detailed, actionable SEO recommendations.\n\n"
-            "IMPORTANT: Respond ONLY with valid JSON in exactly this format:\n"
-            "{\n"
-            '  "priority_issues": [\n'
-            '    {\n'
-            '      "issue": "Title tag is too long",\n'
-            '      "recommendation": "Reduce title to under 60 characters",\n'
-            '      "impact": "High",\n'
-            '      "difficulty": "easy"\n'
-            '    }\n'
-            '  ],\n'
-            '  "quick_wins": [\n'
-            '    "Add missing alt text to images",\n'
-            '    "Optimize meta description length"\n'
-            '  ],\n'
-            '  "overall_assessment": "Your website has good foundation but needs improvements in technical SEO and content optimization."\n'
-            "}\n\n"
-            "Rules:\n"
-            "- priority_issues: Array of objects with issue, recommendation, impact, difficulty\n"
-            "- difficulty must be: 'easy', 'medium', or 'hard'\n"
-            "- impact should describe the SEO benefit\n"
-            "- quick_wins: Array of simple strings (actionable items)\n"
-            "- overall_assessment: Single paragraph summary\n"
-            "- Provide 3-5 priority issues and 3-5 quick wins\n"
-            "- Response must be valid JSON only, no other text\n\n"
-            "Website Analysis Data:\n"
-            f"{json.dumps(analysis_data, indent=2)}"
-        )
-        return prompt
+        data_budget = self.prompt_token_budget - estimate_tokens(PROMPT_INSTRUCTIONS)
+        return PROMPT_INSTRUCTIONS + compact_prompt_data(analysis_data, data_budget)
 
     def generate_seo_suggestions(self, analysis_data):
         if not self.api_key:
@@ -53,15 +121,45 @@ class GeminiSEOAssistant:
                 "overall_assessment": "AI analysis unavailable: API key not configured."
             }
 
+        prompt_text = self._format_prompt(analysis_data)
+        key = self.cache_key(prompt_text)
+        with self._stats_lock:
+            self.requests += 1
+            self._prompt_tokens.append(estimate_tokens(prompt_text))
+
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                with self._stats_lock:
+                    self.cache_hits += 1
+                logger.info("AI suggestions served from cache")
+                return copy.deepcopy(cached)
+
+        suggestions, shared = self._inflight.do(key, lambda: self._generate(key, prompt_text))
+        if shared:
+            logger.info("AI suggestions shared with an in-flight request")
+        return copy.deepcopy(suggestions)
+
+    def _generate(self, key, prompt_text):
+        started = time.perf_counter()
+        suggestions = self._request(prompt_text)
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self.api_calls += 1
+            self._latencies.append(elapsed)
+            if is_fallback(suggestions):
+                self.api_errors += 1
+        # Fallback responses are not cached so the next request retries the API
+        if self.cache is not None and not is_fallback(suggestions):
+            self.cache.set(key, suggestions)
+        return suggestions
+
+    def _request(self, prompt_text):
         headers = {
             "Content-Type": "application/json"
         }
 
-        prompt_text = self._format_prompt(analysis_data)
-        
-        
-        print("🔍 Debug - Sending prompt to Gemini:")
-        print(f"Prompt length: {len(prompt_text)} characters")
+        logger.debug("sending prompt to Gemini", extra={'prompt_chars': len(prompt_text)})
 
         payload = {
             "contents": [
@@ -71,27 +169,19 @@ class GeminiSEOAssistant:
                     ]
                 }
             ],
-            "generationConfig": {
-                "temperature": 0.3,  
-                "topK": 40,
-                "topP": 0.95,
-                "maxOutputTokens": 2048,
-            }
+            "generationConfig": GENERATION_CONFIG
         }
 
         try:
-            print("📡 Making request to Gemini API...")
-            response = requests.post(
+            response = self.session.post(
                 f"{self.endpoint}?key={self.api_key}",
                 headers=headers,
                 json=payload,
-                timeout=30
+                timeout=self.timeout
             )
 
-            print(f"📊 Response status: {response.status_code}")
-            
             if response.status_code != 200:
-                print("❌ Gemini API Error:", response.text)
+                logger.error("Gemini API error", extra={'status': response.status_code, 'body': response.text[:500]})
                 return {
                     "error": f"Gemini API error (Status: {response.status_code})",
                     "priority_issues": [],
@@ -106,7 +196,7 @@ class GeminiSEOAssistant:
                 candidate = result["candidates"][0]
                 if "content" in candidate and "parts" in candidate["content"]:
                     ai_response = candidate["content"]["parts"][0]["text"]
-                    print(f"✅ Successfully got AI response ({len(ai_response)} characters)")
+                    logger.info("AI suggestions received", extra={'chars': len(ai_response)})
                     
                     
                     try:
@@ -128,39 +218,72 @@ class GeminiSEOAssistant:
                         if not isinstance(parsed_suggestions.get("overall_assessment"), str):
                             parsed_suggestions["overall_assessment"] = "Analysis completed successfully."
                         
-                        print("✅ Successfully parsed JSON response")
                         return parsed_suggestions
                         
                     except json.JSONDecodeError as e:
-                        print(f"❌ Failed to parse JSON response: {e}")
-                        print(f"Raw response: {ai_response[:500]}...")
+                        logger.warning("could not parse AI suggestions as JSON", extra={
+                            'error': str(e), 'response': ai_response[:500]
+                        })
                         
                        
                         return self._parse_text_fallback(ai_response)
                         
                 else:
-                    print("❌ Unexpected response structure - no content/parts found")
+                    logger.error("unexpected Gemini response structure - no content/parts found")
                     return self._get_fallback_response("Unexpected response format from Gemini")
             else:
-                print("❌ No candidates in response")
+                logger.error("no candidates in Gemini response")
                 return self._get_fallback_response("No response candidates from Gemini")
                 
         except requests.exceptions.Timeout:
-            print("❌ Request timeout")
+            logger.warning("Gemini request timed out")
             return self._get_fallback_response("Request timeout")
         except requests.exceptions.RequestException as e:
-            print(f"❌ Request error: {e}")
+            logger.warning("Gemini request failed", extra={'error': str(e)})
             return self._get_fallback_response(f"Request error: {str(e)}")
         except Exception as e:
-            print(f"❌ Unexpected error: {e}")
+            logger.exception("unexpected error getting AI suggestions")
             return self._get_fallback_response(f"Unexpected error: {str(e)}")
 
+    def stats(self):
+        """Request, cache and latency counters for the suggestion pipeline"""
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            prompt_tokens = list(self._prompt_tokens)
+            requests_total = self.requests
+            saved = self.cache_hits + self._inflight.coalesced
+            data = {
+                "requests": requests_total,
+                "cache_hits": self.cache_hits,
+                "coalesced": self._inflight.coalesced,
+                "api_calls": self.api_calls,
+                "api_errors": self.api_errors,
+                "hit_rate": round(saved / requests_total, 4) if requests_total else 0.0,
+            }
+        if latencies:
+            data["latency_ms"] = {
+                "samples": len(latencies),
+                "avg": round(sum(latencies) * 1000 / len(latencies), 1),
+                "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+            }
+        if prompt_tokens:
+            data["prompt_tokens"] = {
+                "budget": self.prompt_token_budget,
+                "last": prompt_tokens[-1],
+                "avg": round(sum(prompt_tokens) / len(prompt_tokens), 1),
+                "max": max(prompt_tokens),
+            }
+        data["cache"] = self.cache.stats() if self.cache is not None else None
+        return data
+
     def _parse_text_fallback(self, text_response):
         """Fallback method to extract basic info from text response"""
-        print("🔄 Using text fallback parser...")
+        logger.info("using text fallback parser")
         
         
         return {
+            "fallback": True,
             "priority_issues": [
                 {
                     "issue": "SEO Analysis Available",
@@ -0,0 +1,33 @@
+# Gunicorn settings for the backend: gunicorn -c gunicorn.conf.py app:app
+import gc
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', '4'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+
+# Import the app once in the master so workers share its memory copy-on-write
+preload_app = True
+
+# Job worker threads must be started after the fork, not in the master
+os.environ.setdefault('JOB_QUEUE_AUTOSTART', '0')
+
+
+def on_starting(server):
+    if os.environ.get('PRELOAD_NLP', '1') == '1':
+        import app
+        if app.seo_analyzer.warm_up():
+            server.log.info("spaCy model preloaded in master")
+    # Move everything loaded so far out of the GC's reach so collections in
+    # the workers do not touch (and un-share) those pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import app
+    # Connections opened in the master must not be shared with the workers
+    with app.app.app_context():
+        app.db.engine.dispose(close=False)
+    app.job_queue.ensure_started()
+    # The batch parse pool is per worker too, and its processes come from a forkserver, not this fork
+    app.get_parse_pool()
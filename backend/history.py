@@ -0,0 +1,241 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+from database import SCORE_CATEGORIES, AnalysisDiff, SEOAnalysis
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+DEFAULT_POINTS = 200
+MAX_POINTS = 1000
+SORT_COLUMNS = dict(
+    {'created_at': SEOAnalysis.created_at, 'seo_score': SEOAnalysis.seo_score},
+    **{f'{category}_score': getattr(SEOAnalysis, f'{category}_score') for category in SCORE_CATEGORIES}
+)
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class HistoryQueryError(ValueError):
+    pass
+
+
+def encode_cursor(value, row_id):
+    if isinstance(value, datetime):
+        value = value.strftime('%Y-%m-%dT%H:%M:%S.%f')
+    raw = json.dumps([value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    try:
+        value, row_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if sort == 'created_at':
+            value = datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%f')
+        elif value is not None:
+            value = float(value)
+        return value, int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HistoryQueryError('Invalid cursor')
+
+
+def _parse_float(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise HistoryQueryError(f'{name} must be a number')
+
+
+def _parse_date(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', ''))
+    except ValueError:
+        raise HistoryQueryError(f'{name} must be an ISO date or datetime')
+
+
+def parse_history_params(args):
+    """Validate /api/history query parameters; raises HistoryQueryError"""
+    sort = args.get('sort', 'created_at')
+    if sort not in SORT_COLUMNS:
+        raise HistoryQueryError(f"sort must be one of {', '.join(SORT_COLUMNS)}")
+    order = args.get('order', 'desc')
+    if order not in ('asc', 'desc'):
+        raise HistoryQueryError('order must be asc or desc')
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise HistoryQueryError('limit must be an integer')
+
+    cursor = args.get('cursor')
+    return {
+        'sort': sort,
+        'order': order,
+        'limit': max(1, min(limit, MAX_LIMIT)),
+        'cursor': decode_cursor(cursor, sort) if cursor else None,
+        'domain': (args.get('domain') or '').strip().lower() or None,
+        'url': (args.get('url') or '').strip() or None,
+        'min_score': _parse_float(args, 'min_score'),
+        'max_score': _parse_float(args, 'max_score'),
+        'since': _parse_date(args, 'since'),
+        'until': _parse_date(args, 'until'),
+    }
+
+
+def build_history_query(user_id, params):
+    """Select one page of a user's analyses using keyset pagination.
+
+    Only the promoted summary columns are read, never analysis_data, and the
+    (user_id, sort column, id) indexes serve both the filter and the order, so
+    page 1000 costs the same as page 1.
+    """
+    column = SORT_COLUMNS[params['sort']]
+    query = SEOAnalysis.query.with_entities(
+        SEOAnalysis.id, SEOAnalysis.url, SEOAnalysis.domain, SEOAnalysis.created_at,
+        SEOAnalysis.seo_score, *(getattr(SEOAnalysis, f'{category}_score') for category in SCORE_CATEGORIES)
+    ).filter(SEOAnalysis.user_id == user_id)
+
+    if params['domain']:
+        query = query.filter(SEOAnalysis.domain == params['domain'])
+    if params['url']:
+        pattern = params['url'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query = query.filter(SEOAnalysis.url.like(f'%{pattern}%', escape='\\'))
+    if params['min_score'] is not None:
+        query = query.filter(SEOAnalysis.seo_score >= params['min_score'])
+    if params['max_score'] is not None:
+        query = query.filter(SEOAnalysis.seo_score <= params['max_score'])
+    if params['since'] is not None:
+        query = query.filter(SEOAnalysis.created_at >= params['since'])
+    if params['until'] is not None:
+        query = query.filter(SEOAnalysis.created_at <= params['until'])
+
+    if params['sort'] != 'created_at':
+        # Rows without a score cannot be ordered by it
+        query = query.filter(column.isnot(None))
+    if params['cursor'] is not None:
+        position = tuple_(column, SEOAnalysis.id)
+        after = tuple_(*params['cursor'])
+        query = query.filter(position < after if params['order'] == 'desc' else position > after)
+
+    if params['order'] == 'desc':
+        query = query.order_by(column.desc(), SEOAnalysis.id.desc())
+    else:
+        query = query.order_by(column.asc(), SEOAnalysis.id.asc())
+    return query.limit(params['limit'] + 1)
+
+
+def query_history(user_id, params):
+    """Return (items, next_cursor); next_cursor is None on the last page"""
+    rows = build_history_query(user_id, params).all()
+    has_more = len(rows) > params['limit']
+    rows = rows[:params['limit']]
+
+    items = []
+    for row in rows:
+        item = {
+            'id': row.id,
+            'url': row.url,
+            'domain': row.domain,
+            'seo_score': row.seo_score,
+            'created_at': row.created_at.strftime(DATE_FORMAT),
+            'scores': {category: getattr(row, f'{category}_score') for category in SCORE_CATEGORIES}
+        }
+        items.append(item)
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, params['sort']), last.id)
+    return items, next_cursor
+
+
+def parse_trend_params(args):
+    """Validate /api/trends query parameters; raises HistoryQueryError"""
+    url = (args.get('url') or '').strip()
+    if not url:
+        raise HistoryQueryError('url is required')
+    try:
+        points = int(args.get('points', DEFAULT_POINTS))
+    except ValueError:
+        raise HistoryQueryError('points must be an integer')
+    return {
+        'url': url,
+        'points': max(2, min(points, MAX_POINTS)),
+        'since': _parse_date(args, 'since'),
+        'until': _parse_date(args, 'until'),
+    }
+
+
+def _bucket_point(bucket):
+    """One downsampled point: mean scores plus the seo_score range of the bucket"""
+    scores = [row.seo_score for row in bucket if row.seo_score is not None]
+    point = {
+        't': bucket[0].created_at.strftime(DATE_FORMAT),
+        'count': len(bucket),
+        'seo_score': round(sum(scores) / len(scores), 2) if scores else None,
+        'seo_score_min': min(scores) if scores else None,
+        'seo_score_max': max(scores) if scores else None,
+        'scores': {}
+    }
+    for category in SCORE_CATEGORIES:
+        values = [value for value in (getattr(row, f'{category}_score') for row in bucket) if value is not None]
+        point['scores'][category] = round(sum(values) / len(values), 2) if values else None
+    return point
+
+
+def query_trend(user_id, params):
+    """Score time series for one URL, downsampled to at most params['points'] points.
+
+    One range scan of the (user_id, url, created_at) index over the summary
+    columns. Longer histories are cut into equal time buckets; each point is
+    the mean of its bucket, with the seo_score min/max kept so dips survive.
+    'changes' lists the score changes recorded by the stored diffs.
+    """
+    query = SEOAnalysis.query.with_entities(
+        SEOAnalysis.id, SEOAnalysis.created_at, SEOAnalysis.seo_score,
+        *(getattr(SEOAnalysis, f'{category}_score') for category in SCORE_CATEGORIES)
+    ).filter(SEOAnalysis.user_id == user_id, SEOAnalysis.url == params['url'])
+    if params['since'] is not None:
+        query = query.filter(SEOAnalysis.created_at >= params['since'])
+    if params['until'] is not None:
+        query = query.filter(SEOAnalysis.created_at <= params['until'])
+    rows = query.order_by(SEOAnalysis.created_at, SEOAnalysis.id).all()
+
+    result = {'url': params['url'], 'total': len(rows), 'bucket_seconds': None, 'points': [], 'changes': []}
+    if len(rows) <= params['points']:
+        for row in rows:
+            point = _bucket_point([row])
+            point['analysis_id'] = row.id
+            result['points'].append(point)
+    else:
+        start = rows[0].created_at
+        span = (rows[-1].created_at - start).total_seconds()
+        width = span / params['points'] or 1
+        buckets = {}
+        for row in rows:
+            index = min(int((row.created_at - start).total_seconds() / width), params['points'] - 1)
+            buckets.setdefault(index, []).append(row)
+        result['bucket_seconds'] = round(width, 3)
+        result['points'] = [_bucket_point(buckets[index]) for index in sorted(buckets)]
+
+    if rows:
+        # Score changes from the stored diffs, newest first, to annotate the chart
+        changes = AnalysisDiff.query.with_entities(
+            AnalysisDiff.analysis_id, AnalysisDiff.created_at, AnalysisDiff.seo_score_delta
+        ).filter(
+            AnalysisDiff.user_id == user_id, AnalysisDiff.url == params['url'],
+            AnalysisDiff.created_at >= rows[0].created_at, AnalysisDiff.created_at <= rows[-1].created_at,
+            AnalysisDiff.seo_score_delta != 0
+        ).order_by(AnalysisDiff.created_at.desc()).limit(params['points'])
+        result['changes'] = [
+            {'analysis_id': analysis_id, 't': created_at.strftime(DATE_FORMAT), 'seo_score_delta': delta}
+            for analysis_id, created_at, delta in changes
+        ]
+    return result
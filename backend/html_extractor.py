@@ -0,0 +1,267 @@
+import re
+from html.parser import HTMLParser
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+SKIP_TEXT_TAGS = ('script', 'style')
+# Page chrome left out of main_text, and the containers preferred when present
+BOILERPLATE_TAGS = ('nav', 'header', 'footer', 'aside')
+MAIN_TAGS = ('main', 'article')
+# Tags that end a run of text; main_text gets a line break at each so sentences do not run together
+BLOCK_TAGS = HEADING_TAGS + ('p', 'div', 'br', 'li', 'dt', 'dd', 'tr', 'td', 'th', 'section', 'blockquote', 'pre')
+
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([a-zA-Z0-9_\-]+)', re.IGNORECASE)
+
+
+class PageFacts:
+    """Everything the analyzers need from a page, collected in a single pass"""
+
+    __slots__ = ('title', 'canonical', 'metas', 'headings', 'images', 'links', 'scripts', 'stylesheets',
+                 'text', 'main_text')
+
+    def __init__(self):
+        self.title = None
+        self.canonical = None
+        self.metas = []
+        self.headings = {tag: [] for tag in HEADING_TAGS}
+        self.images = []
+        self.links = []
+        self.scripts = []
+        self.stylesheets = []
+        self.text = ""
+        self.main_text = ""
+
+    def find_meta(self, name):
+        for meta in self.metas:
+            if meta.get('name') == name:
+                return meta
+        return None
+
+    def has_meta_attr(self, attr):
+        return any(attr in meta for meta in self.metas)
+
+
+class _FactCollector:
+    """Parser target that turns start/end/data events into PageFacts.
+
+    The method names follow the lxml parser-target protocol so the same
+    collector is driven by lxml directly and by the stdlib parser wrapper.
+    """
+
+    def __init__(self):
+        self.facts = PageFacts()
+        self._text_parts = []
+        self._content_parts = []
+        self._main_parts = []
+        self._skip_depth = 0
+        self._boilerplate_depth = 0
+        self._main_depth = 0
+        self._title_parts = None
+        self._heading_stack = []
+
+    def start(self, tag, attrs):
+        tag = tag.lower()
+        if tag in BLOCK_TAGS:
+            self._add_content('\n')
+        if tag in SKIP_TEXT_TAGS:
+            self._skip_depth += 1
+            if tag == 'script':
+                src = dict(attrs).get('src')
+                if src:
+                    self.facts.scripts.append(src)
+        elif tag in BOILERPLATE_TAGS:
+            self._boilerplate_depth += 1
+        elif tag in MAIN_TAGS:
+            self._main_depth += 1
+        elif tag == 'title':
+            if self.facts.title is None and self._title_parts is None:
+                self._title_parts = []
+        elif tag in HEADING_TAGS:
+            self._heading_stack.append((tag, []))
+        elif tag == 'meta':
+            self.facts.metas.append(dict(attrs))
+        elif tag == 'img':
+            self.facts.images.append(dict(attrs))
+        elif tag == 'a':
+            attrs = dict(attrs)
+            if attrs.get('href') is not None:
+                self.facts.links.append(attrs['href'])
+        elif tag == 'link':
+            attrs = dict(attrs)
+            rel = (attrs.get('rel') or '').lower()
+            if rel == 'canonical' and attrs.get('href') and self.facts.canonical is None:
+                self.facts.canonical = attrs['href']
+            elif 'stylesheet' in rel.split() and attrs.get('href'):
+                self.facts.stylesheets.append(attrs['href'])
+
+    def end(self, tag):
+        tag = tag.lower()
+        if tag in BLOCK_TAGS:
+            self._add_content('\n')
+        if tag in SKIP_TEXT_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+        elif tag in BOILERPLATE_TAGS:
+            if self._boilerplate_depth:
+                self._boilerplate_depth -= 1
+        elif tag in MAIN_TAGS:
+            if self._main_depth:
+                self._main_depth -= 1
+        elif tag == 'title':
+            if self._title_parts is not None:
+                self.facts.title = ''.join(self._title_parts)
+                self._title_parts = None
+        elif tag in HEADING_TAGS:
+            for index in range(len(self._heading_stack) - 1, -1, -1):
+                if self._heading_stack[index][0] == tag:
+                    name, parts = self._heading_stack.pop(index)
+                    self.facts.headings[name].append(''.join(parts).strip())
+                    break
+
+    def data(self, text):
+        if self._skip_depth:
+            return
+        self._text_parts.append(text)
+        self._add_content(text)
+        if self._title_parts is not None:
+            self._title_parts.append(text)
+        for _, parts in self._heading_stack:
+            parts.append(text)
+
+    def _add_content(self, text):
+        if self._boilerplate_depth or self._skip_depth:
+            return
+        self._content_parts.append(text)
+        if self._main_depth:
+            self._main_parts.append(text)
+
+    def close(self):
+        # Unclosed title/headings still count, as they would in a parsed tree
+        if self._title_parts is not None:
+            self.facts.title = ''.join(self._title_parts)
+            self._title_parts = None
+        while self._heading_stack:
+            name, parts = self._heading_stack.pop(0)
+            self.facts.headings[name].append(''.join(parts).strip())
+        self.facts.text = ''.join(self._text_parts)
+        main_text = ''.join(self._main_parts)
+        self.facts.main_text = main_text if main_text.strip() else ''.join(self._content_parts)
+        return self.facts
+
+
+class _StdlibParser(HTMLParser):
+    def __init__(self, collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, [(name, value or '') for name, value in attrs])
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+def decode_html(body, encoding=None):
+    """Text of an HTML body given as bytes or any buffer (such as an mmap)"""
+    if isinstance(body, str):
+        return body
+    if not encoding:
+        match = _META_CHARSET_RE.search(body[:2048])
+        encoding = match.group(1).decode('ascii') if match else 'utf-8'
+    try:
+        return str(body, encoding, errors='replace')
+    except LookupError:
+        return str(body, 'utf-8', errors='replace')
+
+
+class HTMLExtractor:
+    """Streaming extractor that builds PageFacts without materialising a DOM.
+
+    backend is 'lxml', 'stdlib' or 'auto' (lxml when installed).
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, backend='auto'):
+        if backend == 'auto':
+            backend = 'lxml' if etree is not None else 'stdlib'
+        if backend == 'lxml' and etree is None:
+            raise ValueError("lxml backend requested but lxml is not installed")
+        if backend not in ('lxml', 'stdlib'):
+            raise ValueError(f"Unknown extractor backend: {backend}")
+        self.backend = backend
+
+    def extract(self, html, encoding=None):
+        collector = _FactCollector()
+        if self.backend == 'lxml':
+            if isinstance(html, str):
+                html = html.encode('utf-8')
+                encoding = 'utf-8'
+            parser = etree.HTMLParser(target=collector, encoding=encoding, recover=True)
+            for offset in range(0, len(html), self.CHUNK_SIZE):
+                parser.feed(html[offset:offset + self.CHUNK_SIZE])
+            return parser.close()
+
+        text = decode_html(html, encoding)
+        parser = _StdlibParser(collector)
+        for offset in range(0, len(text), self.CHUNK_SIZE):
+            parser.feed(text[offset:offset + self.CHUNK_SIZE])
+        parser.close()
+        return collector.close()
+
+
+class SoupExtractor:
+    """Builds PageFacts from a BeautifulSoup tree, one scan per fact.
+
+    This is the original multi-pass behaviour and is kept as the reference
+    implementation for benchmarks and for pages the streaming parsers choke on.
+    """
+
+    backend = 'soup'
+
+    def extract(self, html, encoding=None):
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, 'html.parser', from_encoding=encoding if isinstance(html, bytes) else None)
+        facts = PageFacts()
+
+        title_tag = soup.find('title')
+        facts.title = title_tag.text if title_tag else None
+        facts.metas = [dict(meta.attrs) for meta in soup.find_all('meta')]
+        for tag in HEADING_TAGS:
+            facts.headings[tag] = [elem.text.strip() for elem in soup.find_all(tag)]
+        facts.images = [dict(img.attrs) for img in soup.find_all('img')]
+        facts.links = [link['href'] for link in soup.find_all('a', href=True)]
+        canonical = soup.find('link', rel='canonical', href=True)
+        facts.canonical = canonical['href'] if canonical else None
+        facts.scripts = [script['src'] for script in soup.find_all('script', src=True) if script['src']]
+        facts.stylesheets = [link['href'] for link in soup.find_all('link', href=True)
+                             if 'stylesheet' in [rel.lower() for rel in link.get('rel') or []] and link['href']]
+
+        for script in soup(["script", "style"]):
+            script.decompose()
+        facts.text = soup.get_text()
+
+        for chrome in soup(list(BOILERPLATE_TAGS)):
+            chrome.decompose()
+        for block in soup(list(BLOCK_TAGS)):
+            block.insert(0, '\n')
+            block.append('\n')
+        containers = [elem for elem in soup.find_all(MAIN_TAGS) if elem.find_parent(MAIN_TAGS) is None]
+        main_text = ''.join(elem.get_text() for elem in containers)
+        facts.main_text = main_text if main_text.strip() else soup.get_text()
+        return facts
+
+
+def get_extractor(backend='auto'):
+    if backend == 'soup':
+        return SoupExtractor()
+    return HTMLExtractor(backend)
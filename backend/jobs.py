@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from database import db, AnalysisJob
+from results import encode_json
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ('done', 'failed')
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """Bounded worker pool for long-running jobs, persisted in the AnalysisJob table.
+
+    runners maps a job kind to a callable ``runner(user_id, payload, progress)``
+    whose return value is stored as the job result. A runner that already has
+    its result as JSON bytes can return those, and they are stored as they are. ``progress(stage)`` records
+    the stage the job has reached so it can be polled or streamed.
+
+    Jobs are claimed with a conditional UPDATE, so several processes can recover
+    the same queued rows after a restart without running a job twice.
+    """
+
+    def __init__(self, app, runners, workers=4, max_depth=50, stale_after=300):
+        self.app = app
+        self.runners = runners
+        self.workers = workers
+        self.max_depth = max_depth
+        self.stale_after = stale_after
+        self._queue = queue.Queue()
+        self._changed = threading.Condition()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._avg_duration = 10.0
+
+    def ensure_started(self):
+        # Worker threads do not survive a fork, so (re)start them per process
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            for index in range(self.workers):
+                threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True).start()
+            self._pid = os.getpid()
+            self._recover()
+
+    def _recover(self):
+        with self.app.app_context():
+            stale = datetime.utcnow() - timedelta(seconds=self.stale_after)
+            AnalysisJob.query.filter(
+                AnalysisJob.status == 'running', AnalysisJob.updated_at < stale
+            ).update({'status': 'queued', 'stage': 'queued'}, synchronize_session=False)
+            db.session.commit()
+            pending = AnalysisJob.query.filter_by(status='queued').order_by(AnalysisJob.created_at).all()
+            for job in pending:
+                self._queue.put(job.id)
+            if pending:
+                logger.info("recovered queued jobs", extra={'jobs': len(pending)})
+
+    def depth(self):
+        """Jobs waiting in this process's queue only; see queued() for the whole deployment"""
+        return self._queue.qsize()
+
+    def queued(self):
+        """Jobs waiting across every worker process, counted from the jobs table"""
+        return db.session.query(AnalysisJob.id).filter(AnalysisJob.status == 'queued').count()
+
+    def retry_after(self):
+        return max(1, int(self.depth() * self._avg_duration / self.workers))
+
+    def submit(self, user_id, kind, payload):
+        self.ensure_started()
+        if kind not in self.runners:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self.depth() >= self.max_depth:
+            raise QueueFull(self.retry_after())
+
+        job = AnalysisJob(id=uuid.uuid4().hex, user_id=user_id, kind=kind,
+                          payload=json.dumps(payload), status='queued', stage='queued')
+        db.session.add(job)
+        db.session.commit()
+        self._queue.put(job.id)
+        return job
+
+    def _claim(self, job_id):
+        claimed = AnalysisJob.query.filter_by(id=job_id, status='queued').update(
+            {'status': 'running', 'updated_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        return claimed == 1
+
+    def _set(self, job_id, **fields):
+        fields['updated_at'] = datetime.utcnow()
+        AnalysisJob.query.filter_by(id=job_id).update(fields, synchronize_session=False)
+        db.session.commit()
+        with self._changed:
+            self._changed.notify_all()
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                with self.app.app_context():
+                    self._run(job_id)
+            except Exception:
+                logger.exception("job worker error", extra={'job_id': job_id})
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id):
+        if not self._claim(job_id):
+            return
+        job = db.session.get(AnalysisJob, job_id)
+        runner = self.runners[job.kind]
+        started = time.perf_counter()
+        stages = []
+
+        def progress(stage, **fields):
+            stages.append([stage, round(time.perf_counter() - started, 3)])
+            self._set(job_id, stage=stage, stages=json.dumps(stages), **fields)
+
+        try:
+            result = runner(job.user_id, json.loads(job.payload or '{}'), progress)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("job failed", extra={'job_id': job_id})
+            progress('failed', status='failed', error=str(e))
+        else:
+            encoded = result if isinstance(result, bytes) else encode_json(result)
+            progress('done', status='done', result=encoded.decode('utf-8'))
+        finally:
+            duration = time.perf_counter() - started
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+
+    def wait_for_change(self, timeout):
+        with self._changed:
+            self._changed.wait(timeout)
+
+
+def job_to_dict(job, include_result=True):
+    data = {
+        'job_id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'stage': job.stage,
+        'stages': json.loads(job.stages) if job.stages else [],
+        'created_at': job.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'updated_at': job.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    if job.error:
+        data['error'] = job.error
+    if include_result and job.result:
+        data['result'] = json.loads(job.result)
+    return data
+
+
+def stream_job_events(job_queue, job_id, poll_interval=0.5, timeout=120, keep_alive=15):
+    """Yield a server-sent event for every stage the job reaches until it finishes.
+
+    Stages are read back from the database, so the stream works even when the
+    job is running in another worker process.
+    """
+    sent = 0
+    announced = False
+    last_sent = time.monotonic()
+    deadline = last_sent + timeout
+    while time.monotonic() < deadline:
+        db.session.expire_all()
+        job = db.session.get(AnalysisJob, job_id)
+        if job is None:
+            yield "event: error\ndata: {\"error\": \"Job not found\"}\n\n"
+            return
+        stages = json.loads(job.stages) if job.stages else []
+        if not announced:
+            announced = True
+            yield f"event: status\ndata: {json.dumps(job_to_dict(job, include_result=False))}\n\n"
+        finished = job.status in FINISHED_STATUSES
+        if len(stages) > sent:
+            for stage, elapsed in stages[sent:]:
+                if finished and stage == job.stage:
+                    payload = json.dumps(job_to_dict(job))
+                else:
+                    payload = json.dumps({'job_id': job.id, 'stage': stage, 'elapsed': elapsed})
+                # Stages such as 'crawling 40/300' carry their counts after the event name
+                yield f"event: {stage.split(' ', 1)[0]}\ndata: {payload}\n\n"
+            sent = len(stages)
+            last_sent = time.monotonic()
+            if finished:
+                return
+        elif time.monotonic() - last_sent > keep_alive:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        job_queue.wait_for_change(poll_interval)
+    yield "event: timeout\ndata: {}\n\n"
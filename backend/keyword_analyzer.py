@@ -0,0 +1,169 @@
+import re
+from collections import Counter
+
+PHRASE_POS = ('ADJ', 'NOUN', 'PROPN')
+HEAD_POS = ('NOUN', 'PROPN')
+# Pipes the keyword stage never reads; skipping them is most of the speed-up
+UNUSED_PIPES = ('parser', 'senter', 'textcat', 'entity_linker')
+
+_BREAK_RE = re.compile(r'\s+')
+
+
+def chunk_text(text, max_chars):
+    """Split text into pieces of at most max_chars, breaking on whitespace"""
+    chunks = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + max_chars, length)
+        if end < length:
+            split = text.rfind(' ', start, end)
+            if split > start:
+                end = split
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = end
+    return chunks
+
+
+class KeywordAnalyzer:
+    """Keyphrase, entity and keyword-density analysis on top of a spaCy pipeline.
+
+    Texts are normalized, cut into max_chunk_chars pieces and run through
+    nlp.pipe in batches with the dependency parser and other unused pipes
+    disabled. analyze_batch() runs many pages through a single pipe() call.
+    """
+
+    def __init__(self, nlp, max_chunk_chars=50000, max_chars=200000, batch_size=16, top_n=10,
+                 stuffing_density=3.0, stuffing_min_count=5):
+        self.nlp = nlp
+        self.max_chunk_chars = max_chunk_chars
+        self.max_chars = max_chars
+        self.batch_size = batch_size
+        self.top_n = top_n
+        self.stuffing_density = stuffing_density
+        self.stuffing_min_count = stuffing_min_count
+        self.disabled = [name for name in nlp.pipe_names if name in UNUSED_PIPES]
+
+    def analyze(self, text, title='', h1s=()):
+        return self.analyze_batch([(text, title, h1s)])[0]
+
+    def analyze_batch(self, pages):
+        """pages is an iterable of (text, title, h1s); returns one report per page"""
+        pages = list(pages)
+        pieces = []
+        owners = []
+        for index, (text, title, h1s) in enumerate(pages):
+            text = _BREAK_RE.sub(' ', text or '')[:self.max_chars]
+            for chunk in chunk_text(text, self.max_chunk_chars):
+                pieces.append(chunk)
+                owners.append((index, 'body'))
+            target = ' '.join([title or ''] + list(h1s)).strip()
+            if target:
+                pieces.append(target)
+                owners.append((index, 'target'))
+
+        stats = [_PageStats() for _ in pages]
+        docs = self.nlp.pipe(pieces, batch_size=self.batch_size, disable=self.disabled)
+        for (index, role), doc in zip(owners, docs):
+            if role == 'body':
+                stats[index].add_body(doc)
+            else:
+                stats[index].add_target(doc)
+
+        return [self._report(page_stats) for page_stats in stats]
+
+    def _report(self, stats):
+        word_count = stats.word_count
+        density = {term: count * 100 / word_count for term, count in stats.terms.items()} if word_count else {}
+
+        target_terms = sorted(stats.target_terms)
+        target_density = [
+            {'term': term, 'count': stats.terms.get(term, 0), 'density': round(density.get(term, 0.0), 2)}
+            for term in target_terms
+        ]
+        covered = sum(1 for item in target_density if item['count'])
+        target_coverage = covered / len(target_terms) if target_terms else 0.0
+
+        stuffed = [
+            {'term': term, 'count': stats.terms[term], 'density': round(value, 2)}
+            for term, value in sorted(density.items(), key=lambda item: -item[1])
+            if value > self.stuffing_density and stats.terms[term] >= self.stuffing_min_count
+        ]
+
+        top_entities = stats.entities.most_common(self.top_n)
+        entity_labels = Counter()
+        for (_, label), count in stats.entities.items():
+            entity_labels[label] += count
+        mentioned = sum(1 for (text, _), _ in top_entities if text.lower() in stats.target_text)
+        entity_coverage = mentioned / len(top_entities) if top_entities else 0.0
+
+        score = 100
+        if stuffed:
+            score -= 50
+        if target_terms and target_coverage < 0.5:
+            score -= 25
+        if word_count and not stats.phrases:
+            score -= 25
+
+        return {
+            'available': True,
+            'word_count': word_count,
+            'top_keyphrases': [
+                {'phrase': phrase, 'count': count} for phrase, count in stats.phrases.most_common(self.top_n)
+            ],
+            'entities': {
+                'total': sum(stats.entities.values()),
+                'unique': len(stats.entities),
+                'by_label': dict(entity_labels.most_common()),
+                'top': [{'text': text, 'label': label, 'count': count} for (text, label), count in top_entities],
+                'title_h1_coverage': round(entity_coverage, 2),
+            },
+            'title_h1_keywords': target_density,
+            'title_h1_keyword_coverage': round(target_coverage, 2),
+            'keyword_stuffing': bool(stuffed),
+            'stuffed_terms': stuffed[:self.top_n],
+            'score': max(0, score),
+        }
+
+
+class _PageStats:
+    __slots__ = ('word_count', 'terms', 'phrases', 'entities', 'target_terms', 'target_text')
+
+    def __init__(self):
+        self.word_count = 0
+        self.terms = Counter()
+        self.phrases = Counter()
+        self.entities = Counter()
+        self.target_terms = set()
+        self.target_text = ''
+
+    def add_body(self, doc):
+        run = []
+        for token in doc:
+            if token.is_alpha:
+                self.word_count += 1
+                if not token.is_stop:
+                    self.terms[token.lemma_.lower() or token.lower_] += 1
+            if token.pos_ in PHRASE_POS and token.is_alpha and not token.is_stop:
+                run.append(token)
+                continue
+            self._flush_phrase(run)
+            run = []
+        self._flush_phrase(run)
+        for ent in doc.ents:
+            self.entities[(ent.text.strip(), ent.label_)] += 1
+
+    def _flush_phrase(self, run):
+        # Trim trailing adjectives so phrases end in a noun, keep at most four words
+        while run and run[-1].pos_ not in HEAD_POS:
+            run = run[:-1]
+        if run:
+            self.phrases[' '.join(token.lemma_.lower() or token.lower_ for token in run[-4:])] += 1
+
+    def add_target(self, doc):
+        self.target_text += ' ' + doc.text.lower()
+        for token in doc:
+            if token.is_alpha and not token.is_stop:
+                self.target_terms.add(token.lemma_.lower() or token.lower_)
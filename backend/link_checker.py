@@ -0,0 +1,238 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import SingleFlight, create_cache_from_env
+from fetcher import USER_AGENT
+
+# Statuses some servers return for HEAD only; those URLs are re-checked with a ranged GET
+HEAD_FALLBACK_STATUSES = {400, 403, 405, 406, 501}
+LARGEST_ASSETS = 10
+
+
+def _content_length(response):
+    # A ranged GET answers 206 with "Content-Range: bytes 0-0/<total>"
+    content_range = response.headers.get('Content-Range', '')
+    if response.status_code == 206 and '/' in content_range:
+        total = content_range.rsplit('/', 1)[1]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get('Content-Length')
+    return int(length) if length and length.isdigit() else None
+
+
+def resolve_target(base_url, ref):
+    """Absolute http(s) URL for an href/src without its fragment, or None for mailto:, javascript:, #top..."""
+    ref = (ref or '').strip()
+    if not ref or ref.startswith('#'):
+        return None
+    url = urldefrag(urljoin(base_url, ref))[0]
+    if urlparse(url).scheme not in ('http', 'https'):
+        return None
+    return url
+
+
+class LinkChecker:
+    """Checks that links and assets respond, with bounded concurrency.
+
+    Each URL gets a HEAD request, following redirects. Servers that refuse
+    HEAD get a one-byte ranged GET instead. At most `workers` checks run at
+    once per process, and at most `per_host` of them against any one host:
+    each host's URLs wait in a queue of their own, drained by up to
+    per_host pool tasks, so a busy host never holds threads other hosts
+    could use.
+    Results are kept in a TTL cache shared by every analysis, so a CDN asset
+    or footer link is checked once per ttl rather than once per page.
+    Concurrent checks of the same URL share one request. Failed checks are
+    cached for error_ttl only.
+    """
+
+    def __init__(self, timeout=5, workers=32, per_host=4, max_redirects=5, max_urls=1000, budget=30,
+                 cache=None, error_ttl=300):
+        self.timeout = timeout
+        self.per_host = per_host
+        self.max_urls = max_urls
+        self.budget = budget
+        self.cache = cache
+        self.error_ttl = error_ttl
+        self._inflight = SingleFlight()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='link-check')
+        self._host_queues = {}
+        self._host_active = {}
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.fallbacks = 0
+
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': USER_AGENT, 'Accept': '*/*'})
+        self.session.max_redirects = max_redirects
+        adapter = HTTPAdapter(pool_connections=64, pool_maxsize=per_host)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _submit(self, url):
+        """Future of check(url), queued behind the other URLs of its host"""
+        future = Future()
+        host = urlparse(url).netloc
+        with self._lock:
+            self._host_queues.setdefault(host, deque()).append((url, future))
+            active = self._host_active.get(host, 0)
+            if active < self.per_host:
+                self._host_active[host] = active + 1
+                self._pool.submit(self._drain, host)
+        return future
+
+    def _drain(self, host):
+        # One of at most per_host tasks checking host's queued URLs one after another
+        while True:
+            with self._lock:
+                queued = self._host_queues[host]
+                if not queued:
+                    self._host_active[host] -= 1
+                    if not self._host_active[host]:
+                        del self._host_active[host], self._host_queues[host]
+                    return
+                url, future = queued.popleft()
+            # False when check_page cancelled it after its budget ran out
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.check(url))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def _request(self, method, url):
+        headers = {'Range': 'bytes=0-0'} if method == 'GET' else None
+        response = self.session.request(method, url, headers=headers, timeout=self.timeout,
+                                        allow_redirects=True, stream=True)
+        if method == 'HEAD' or response.status_code == 206:
+            # Empty or one-byte body: read it so the connection goes back to the pool
+            response.content
+        else:
+            # The server ignored Range; drop the connection rather than download the asset
+            response.close()
+        return response
+
+    def _check(self, url):
+        result = {'url': url, 'status': None, 'ok': False, 'method': 'HEAD', 'redirects': [],
+                  'content_length': None, 'content_type': None, 'latency_ms': None, 'error': None}
+        start = time.perf_counter()
+        try:
+            response = self._request('HEAD', url)
+            if response.status_code in HEAD_FALLBACK_STATUSES:
+                with self._lock:
+                    self.fallbacks += 1
+                result['method'] = 'GET'
+                response = self._request('GET', url)
+        except requests.exceptions.RequestException as e:
+            result['error'] = type(e).__name__
+        else:
+            result['status'] = response.status_code
+            result['ok'] = response.status_code < 400
+            result['redirects'] = [{'url': hop.url, 'status': hop.status_code} for hop in response.history]
+            if response.history:
+                result['final_url'] = response.url
+            result['content_length'] = _content_length(response)
+            result['content_type'] = response.headers.get('Content-Type', '').split(';')[0] or None
+        result['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        with self._lock:
+            self.checks += 1
+        return result
+
+    def check(self, url):
+        """Return (result, source) where source is 'cache', 'shared' or 'checked'"""
+        if self.cache is not None:
+            cached = self.cache.get(url)
+            if cached is not None:
+                return cached, 'cache'
+        result, shared = self._inflight.do(url, lambda: self._check(url))
+        if not shared and self.cache is not None:
+            self.cache.set(url, result, ttl=None if result['ok'] else self.error_ttl)
+        return result, 'shared' if shared else 'checked'
+
+    def check_page(self, facts, base_url):
+        """The link_health section for a page: every link, image, script and stylesheet URL, checked once"""
+        started = time.perf_counter()
+        targets = {}
+        for kind, refs in (('link', facts.links), ('image', [image.get('src') for image in facts.images]),
+                           ('script', facts.scripts), ('stylesheet', facts.stylesheets)):
+            for ref in refs:
+                url = resolve_target(base_url, ref)
+                if url is not None and url not in targets:
+                    targets[url] = kind
+        skipped = max(0, len(targets) - self.max_urls)
+        targets = dict(list(targets.items())[:self.max_urls])
+
+        futures = {self._submit(url): url for url in targets}
+        done, not_done = wait(futures, timeout=self.budget)
+        results, sources = [], {'cache': 0, 'shared': 0, 'checked': 0}
+        for future, url in futures.items():
+            if future in done:
+                result, source = future.result()
+                sources[source] += 1
+                results.append(dict(result, kind=targets[url]))
+            else:
+                future.cancel()
+                results.append({'url': url, 'kind': targets[url], 'status': None, 'ok': False,
+                                'error': 'not checked within budget'})
+
+        by_kind = {}
+        for result in results:
+            counts = by_kind.setdefault(result['kind'], {'total': 0, 'broken': 0, 'redirected': 0})
+            counts['total'] += 1
+            counts['broken'] += not result['ok']
+            counts['redirected'] += bool(result.get('redirects'))
+        assets = [result for result in results if result['kind'] != 'link' and result.get('content_length')]
+        assets.sort(key=lambda result: -result['content_length'])
+        return {
+            'checked': len(results),
+            'skipped': skipped,
+            'broken': sum(not result['ok'] for result in results),
+            'redirected': sum(bool(result.get('redirects')) for result in results),
+            'unfinished': len(not_done),
+            'cache_hits': sources['cache'] + sources['shared'],
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+            'by_kind': by_kind,
+            'largest_assets': [{'url': result['url'], 'kind': result['kind'], 'content_length': result['content_length']}
+                               for result in assets[:LARGEST_ASSETS]],
+            'results': results
+        }
+
+    def stats(self):
+        return {
+            'checks': self.checks,
+            'head_fallbacks': self.fallbacks,
+            'coalesced': self._inflight.coalesced,
+            'cache': self.cache.stats() if self.cache is not None else None
+        }
+
+
+def create_link_checker():
+    """Link checker from LINK_CHECK_* environment variables; its cache from LINK_CHECK_CACHE_*"""
+    return LinkChecker(
+        timeout=float(os.environ.get('LINK_CHECK_TIMEOUT', '5')),
+        workers=int(os.environ.get('LINK_CHECK_WORKERS', '32')),
+        per_host=int(os.environ.get('LINK_CHECK_PER_HOST', '4')),
+        max_urls=int(os.environ.get('LINK_CHECK_MAX_URLS', '1000')),
+        budget=float(os.environ.get('LINK_CHECK_BUDGET', '30')),
+        cache=create_cache_from_env('LINK_CHECK_CACHE', 3600, 50000, os.path.join('instance', 'link_cache.db')),
+        error_ttl=int(os.environ.get('LINK_CHECK_ERROR_TTL', '300'))
+    )
+
+
+_shared_checker = None
+_shared_lock = threading.Lock()
+
+
+def get_link_checker():
+    global _shared_checker
+    if _shared_checker is None:
+        with _shared_lock:
+            if _shared_checker is None:
+                _shared_checker = create_link_checker()
+    return _shared_checker
@@ -0,0 +1,212 @@
+"""Pages stored on disk: HTML files, directory trees and WARC archives.
+
+iter_pages() yields one PageRecord per page in a deterministic order, so a
+run over the same inputs can be resumed by position. Plain HTML files are
+not read here: the record carries the path and the worker that analyzes it
+maps the file into memory. WARC files are read sequentially, through mmap
+(.warc) or incremental gzip decompression (.warc.gz, one member per record
+or one for the whole file), one record at a time.
+"""
+
+import gzip
+import mmap
+import os
+import re
+import zlib
+from pathlib import Path
+from urllib.parse import quote, urljoin
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+HTML_EXTENSIONS = ('.html', '.htm', '.xhtml')
+WARC_EXTENSIONS = ('.warc', '.warc.gz')
+_CHARSET_RE = re.compile(rb'charset=["\']?([\w.:-]+)', re.I)
+
+
+class PageRecord:
+    """One page to analyze: a file to map (path) or bytes already in memory (body)"""
+
+    __slots__ = ('source', 'url', 'path', 'body', 'encoding', 'error')
+
+    def __init__(self, source, url, path=None, body=None, encoding=None, error=None):
+        self.source = source
+        self.url = url
+        self.path = path
+        self.body = body
+        self.encoding = encoding
+        self.error = error
+
+
+def open_mapped(path):
+    """Read-only mmap of a file, or b'' for an empty file (which cannot be mapped)"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _file_url(path, root, base_url):
+    if base_url:
+        relative = os.path.relpath(path, root) if root else os.path.basename(path)
+        return urljoin(base_url, quote(relative.replace(os.sep, '/')))
+    return Path(path).resolve().as_uri()
+
+
+def _is_html(name):
+    name = name.lower()
+    return name.endswith(HTML_EXTENSIONS) or name.endswith(tuple(ext + '.gz' for ext in HTML_EXTENSIONS))
+
+
+def _is_warc(name):
+    return name.lower().endswith(WARC_EXTENSIONS)
+
+
+def _iter_file(path, root, base_url):
+    if _is_warc(path):
+        yield from iter_warc(path)
+    elif path.lower().endswith('.gz'):
+        try:
+            with gzip.open(path, 'rb') as f:
+                body = f.read()
+        except (OSError, EOFError) as e:
+            yield PageRecord(path, _file_url(path[:-3], root, base_url), error=f"Unreadable gzip file: {e}")
+        else:
+            yield PageRecord(path, _file_url(path[:-3], root, base_url), body=body)
+    else:
+        yield PageRecord(path, _file_url(path, root, base_url), path=path)
+
+
+def iter_pages(paths, base_url=None):
+    """PageRecords for files, directories (walked in sorted order) and WARC archives.
+
+    Files given explicitly are analyzed whatever their extension; inside
+    directories only HTML files (optionally gzipped) and WARC archives are.
+    With base_url, file pages get base_url plus their path relative to the
+    directory given, otherwise a file:// URL.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if _is_html(name) or _is_warc(name):
+                        yield from _iter_file(os.path.join(directory, name), path, base_url)
+        elif os.path.exists(path):
+            yield from _iter_file(path, None, base_url)
+        else:
+            raise FileNotFoundError(f"No such file or directory: {path}")
+
+
+def _dechunk(body):
+    chunks = []
+    offset = 0
+    while True:
+        end = body.find(b'\r\n', offset)
+        if end < 0:
+            break
+        size = int(body[offset:end].split(b';')[0] or b'0', 16)
+        if size == 0:
+            break
+        chunks.append(body[end + 2:end + 2 + size])
+        offset = end + 2 + size + 2
+    return b''.join(chunks)
+
+
+def _decode_body(body, transfer_encoding, content_encoding):
+    if b'chunked' in transfer_encoding:
+        body = _dechunk(body)
+    if content_encoding in (b'gzip', b'x-gzip'):
+        body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    elif content_encoding == b'deflate':
+        try:
+            body = zlib.decompress(body)
+        except zlib.error:
+            body = zlib.decompress(body, -zlib.MAX_WBITS)
+    elif content_encoding == b'br':
+        if brotli is None:
+            raise ValueError("Brotli-encoded body but brotli is not installed")
+        body = brotli.decompress(body)
+    return body
+
+
+def _parse_headers(lines):
+    headers = {}
+    for line in lines:
+        name, _, value = line.partition(b':')
+        headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def _http_response(block):
+    """(status, headers, body) of an HTTP response stored in a WARC response record"""
+    head, _, body = block.partition(b'\r\n\r\n')
+    lines = head.split(b'\r\n')
+    parts = lines[0].split(None, 2)
+    status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+    return status, _parse_headers(lines[1:]), body
+
+
+def _open_warc(path):
+    if path.lower().endswith('.gz'):
+        # Reads gzip members one after another, decompressing as the parser asks for bytes
+        return gzip.open(path, 'rb')
+    stream = open_mapped(path)
+    if stream == b'':
+        return open(path, 'rb')
+    return stream
+
+
+def iter_warc(path):
+    """PageRecords for the successful HTML responses in a WARC file.
+
+    Other records (requests, metadata, redirects, images...) are skipped.
+    Transfer and content encodings stored with the response are undone;
+    a body that cannot be decoded is yielded with its error.
+    """
+    stream = _open_warc(path)
+    try:
+        index = 0
+        while True:
+            line = stream.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            if not line.startswith(b'WARC/'):
+                raise ValueError(f"{path}: expected a WARC record header, got {line[:40]!r}")
+            header_lines = []
+            while True:
+                line = stream.readline()
+                if not line.strip():
+                    break
+                header_lines.append(line.rstrip(b'\r\n'))
+            headers = _parse_headers(header_lines)
+            block = stream.read(int(headers.get(b'content-length', b'0')))
+            index += 1
+
+            is_http = headers.get(b'content-type', b'').startswith(b'application/http')
+            if headers.get(b'warc-type') != b'response' or not is_http:
+                continue
+            url = headers.get(b'warc-target-uri', b'').strip(b'<>').decode('utf-8', errors='replace')
+            status, http_headers, body = _http_response(block)
+            content_type = http_headers.get(b'content-type', b'')
+            if status != 200 or b'html' not in content_type.lower():
+                continue
+            source = f"{path}#{index}"
+            match = _CHARSET_RE.search(content_type)
+            encoding = match.group(1).decode('ascii') if match else None
+            try:
+                body = _decode_body(body, http_headers.get(b'transfer-encoding', b'').lower(),
+                                    http_headers.get(b'content-encoding', b'').lower())
+            except (ValueError, zlib.error) as e:
+                yield PageRecord(source, url, error=f"Undecodable response body: {e}")
+                continue
+            yield PageRecord(source, url, body=body, encoding=encoding)
+    finally:
+        stream.close()
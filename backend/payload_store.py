@@ -0,0 +1,136 @@
+import logging
+import os
+import re
+import struct
+import zlib
+from collections import Counter
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from results import decode_json, encode_json
+
+logger = logging.getLogger(__name__)
+
+# Blob header: codec id (1 byte) + dictionary id (2 bytes, 0 = none)
+HEADER = struct.Struct('>BH')
+CODECS = {'zlib': 1, 'zstd': 2}
+CODEC_NAMES = {number: name for name, number in CODECS.items()}
+# zlib can only look back 32 KB, so a bigger preset dictionary is wasted
+ZLIB_DICT_SIZE = 32 * 1024
+# Keys, punctuation runs and values that repeat across analyses
+_FRAGMENT_RE = re.compile(r'"(?:[^"\\]|\\.){1,200}"[:,]?|[\[\]{},:]+|-?\d+(?:\.\d+)?,?|true,?|false,?|null,?')
+
+
+class MissingDictionary(ValueError):
+    def __init__(self, dict_id):
+        super().__init__(f"Payload dictionary {dict_id} is not loaded")
+        self.dict_id = dict_id
+
+
+def train_zlib_dictionary(samples, size=ZLIB_DICT_SIZE):
+    """Preset dictionary for zlib built from the fragments that repeat most across samples.
+
+    Fragments are scored by how many bytes they would save (count x length)
+    and the best ones are placed last, closest to the data, where zlib's
+    matches are cheapest.
+    """
+    counts = Counter()
+    for sample in samples:
+        counts.update(set(_FRAGMENT_RE.findall(sample.decode('utf-8', errors='replace'))))
+    threshold = max(2, len(samples) // 100)
+    fragments = [(count * len(fragment), fragment) for fragment, count in counts.items() if count >= threshold]
+    fragments.sort(reverse=True)
+
+    chosen = []
+    used = 0
+    for _, fragment in fragments:
+        data = fragment.encode('utf-8')
+        if used + len(data) > size:
+            continue
+        chosen.append(data)
+        used += len(data)
+    return b''.join(reversed(chosen))
+
+
+class PayloadStore:
+    """Compresses full analysis payloads for the seo_analysis.payload column.
+
+    Analyses share almost all of their JSON keys and many of their values,
+    so each blob is compressed against a shared dictionary trained on
+    earlier payloads. Every blob starts with a header naming its codec and
+    dictionary, so payloads written before a retrain, or with another codec,
+    stay readable. Dictionaries never change once saved; retraining adds a
+    new one and new writes use the newest dictionary for the active codec.
+    """
+
+    def __init__(self, codec='zlib', level=None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown payload codec: {codec}")
+        if codec == 'zstd' and zstandard is None:
+            logger.warning("zstandard not installed - storing payloads with zlib")
+            codec = 'zlib'
+        self.codec = codec
+        self.level = level if level is not None else (6 if codec == 'zlib' else 9)
+        self.dictionaries = {}
+        self.active = {}
+        self._zstd_dicts = {}
+
+    def add_dictionary(self, dict_id, codec, data):
+        # PostgreSQL drivers return BYTEA as memoryview
+        data = bytes(data)
+        self.dictionaries[dict_id] = (codec, data)
+        if codec == 'zstd' and zstandard is not None:
+            self._zstd_dicts[dict_id] = zstandard.ZstdCompressionDict(data)
+        if dict_id > self.active.get(codec, 0):
+            self.active[codec] = dict_id
+
+    def train(self, samples):
+        """Dictionary bytes for the active codec trained on sample payloads (encoded JSON)"""
+        if self.codec == 'zstd':
+            return zstandard.train_dictionary(64 * 1024, samples).as_bytes()
+        return train_zlib_dictionary(samples)
+
+    def encode(self, analysis):
+        return self.compress(encode_json(analysis))
+
+    def compress(self, data):
+        """Blob for an analysis already encoded with results.encode_json"""
+        dict_id = self.active.get(self.codec, 0)
+        if self.codec == 'zstd':
+            compressor = zstandard.ZstdCompressor(level=self.level, dict_data=self._zstd_dicts.get(dict_id))
+            body = compressor.compress(data)
+        elif dict_id:
+            compressor = zlib.compressobj(self.level, zdict=self.dictionaries[dict_id][1])
+            body = compressor.compress(data) + compressor.flush()
+        else:
+            body = zlib.compress(data, self.level)
+        return HEADER.pack(CODECS[self.codec], dict_id) + body
+
+    def decode(self, blob):
+        codec_id, dict_id = HEADER.unpack_from(blob)
+        codec = CODEC_NAMES.get(codec_id)
+        if dict_id and dict_id not in self.dictionaries:
+            raise MissingDictionary(dict_id)
+        body = memoryview(blob)[HEADER.size:]
+        if codec == 'zstd':
+            if zstandard is None:
+                raise ValueError("Payload was stored with zstd but zstandard is not installed")
+            data = zstandard.ZstdDecompressor(dict_data=self._zstd_dicts.get(dict_id)).decompress(body)
+        elif codec == 'zlib':
+            decompressor = zlib.decompressobj(zdict=self.dictionaries[dict_id][1]) if dict_id else zlib.decompressobj()
+            data = decompressor.decompress(body) + decompressor.flush()
+        else:
+            raise ValueError(f"Unknown payload codec id: {codec_id}")
+        return decode_json(data)
+
+
+def create_payload_store():
+    """Build the payload store from PAYLOAD_CODEC (zlib|zstd) and PAYLOAD_COMPRESSION_LEVEL"""
+    level = os.environ.get('PAYLOAD_COMPRESSION_LEVEL')
+    return PayloadStore(
+        codec=os.environ.get('PAYLOAD_CODEC', 'zlib').lower(),
+        level=int(level) if level else None
+    )
@@ -0,0 +1,139 @@
+import json
+from collections.abc import Mapping
+
+CHARS_PER_TOKEN = 4
+FAILING_SCORE = 70
+
+# (max list items, max text chars, include details of passing checks), from richest to leanest
+COMPACTION_LEVELS = (
+    (8, 160, True),
+    (5, 100, True),
+    (3, 80, False),
+    (1, 60, False),
+    (0, 40, False),
+)
+
+
+def estimate_tokens(text):
+    """Rough token count for Gemini-style tokenizers (about four characters per token)"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def minify(data):
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+def _clip(text, limit):
+    text = ' '.join((text or '').split())
+    return text if len(text) <= limit else text[:max(0, limit - 1)] + '…'
+
+
+def _sample(items, limit, text_limit):
+    """Up to limit clipped items, spread evenly over the list so long lists keep their shape"""
+    items = [_clip(item, text_limit) for item in items if item]
+    if len(items) <= limit:
+        return items
+    step = len(items) / limit
+    return [items[int(index * step)] for index in range(limit)]
+
+
+def _text_facts(section, items, chars):
+    return {
+        'text': _clip(section.get('text'), chars),
+        'length': section.get('length'),
+        'optimal_length': section.get('optimal_length'),
+    }
+
+
+def _heading_facts(section, items, chars):
+    structure = section.get('structure') or {}
+    facts = {
+        'h1_count': section.get('h1_count'),
+        'proper_structure': section.get('proper_structure'),
+        'counts': {tag: len(texts) for tag, texts in structure.items() if texts},
+    }
+    if items:
+        for tag in ('h1', 'h2'):
+            if structure.get(tag):
+                facts[tag] = _sample(structure[tag], items, chars)
+    return facts
+
+
+def _readability_facts(section, items, chars):
+    keys = ('flesch_reading_ease', 'flesch_kincaid_grade', 'smog_index', 'gunning_fog', 'coleman_liau_index')
+    return {key: section[key] for key in keys if key in section}
+
+
+def _keyword_facts(section, items, chars):
+    facts = {
+        'keyword_stuffing': section.get('keyword_stuffing'),
+        'title_h1_keyword_coverage': section.get('title_h1_keyword_coverage'),
+    }
+    if items:
+        facts['top_keyphrases'] = _sample([item['phrase'] for item in section.get('top_keyphrases', [])], items, chars)
+        facts['stuffed_terms'] = [item['term'] for item in section.get('stuffed_terms', [])[:items]]
+    return facts
+
+
+def _scalar_facts(section, items, chars):
+    facts = {}
+    for key, value in section.items():
+        if key in ('score', 'simhash') or isinstance(value, (dict, list)):
+            continue
+        if isinstance(value, float):
+            value = round(value, 2)
+        elif isinstance(value, str):
+            value = _clip(value, chars)
+        facts[key] = value
+    return facts
+
+
+SECTION_FACTS = {
+    'title': _text_facts,
+    'meta_description': _text_facts,
+    'headings': _heading_facts,
+    'readability': _readability_facts,
+    'keywords': _keyword_facts,
+}
+
+
+def compact_analysis(analysis, max_items=5, max_chars=100, detail_passing=True):
+    """Score-relevant facts from an analysis, checks ordered worst first.
+
+    Only sections carrying a score are kept; heading and keyphrase lists are
+    sampled down to max_items and every text is clipped to max_chars. With
+    detail_passing=False, checks scoring at least FAILING_SCORE keep only
+    their score.
+    """
+    checks = []
+    for name, section in analysis.items():
+        if not isinstance(section, Mapping) or 'score' not in section or section.get('available') is False:
+            continue
+        check = {'check': name, 'score': round(section['score'], 1)}
+        if detail_passing or check['score'] < FAILING_SCORE:
+            check.update(SECTION_FACTS.get(name, _scalar_facts)(section, max_items, max_chars))
+        checks.append(check)
+    checks.sort(key=lambda check: check['score'])
+    return {
+        'url': analysis.get('url'),
+        'seo_score': analysis.get('seo_score'),
+        'failing': [check['check'] for check in checks if check['score'] < FAILING_SCORE],
+        'checks': checks,
+    }
+
+
+def compact_prompt_data(analysis, token_budget):
+    """Minified compact analysis that fits in token_budget.
+
+    Tries each COMPACTION_LEVELS entry in turn; if even the leanest is too
+    large, the best-scoring checks are dropped until it fits.
+    """
+    for max_items, max_chars, detail_passing in COMPACTION_LEVELS:
+        data = compact_analysis(analysis, max_items, max_chars, detail_passing)
+        text = minify(data)
+        if estimate_tokens(text) <= token_budget:
+            return text
+    while data['checks'] and estimate_tokens(text) > token_budget:
+        data['checks'].pop()
+        text = minify(data)
+    return text
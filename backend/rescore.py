@@ -0,0 +1,135 @@
+import json
+import logging
+import time
+
+from sqlalchemy import bindparam
+from sqlalchemy.orm import aliased
+
+from analysis_diff import rescored_changes
+from database import db, AnalysisDiff, SCORE_CATEGORIES, SEOAnalysis
+from scoring import get_scoring_profile
+
+logger = logging.getLogger(__name__)
+
+
+def rescore_analyses(profile, batch_size=5000, dry_run=False):
+    """Recompute seo_score of stored analyses with a scoring profile.
+
+    Reads only the promoted <category>_score columns, never the payloads,
+    one keyset-paginated batch at a time. Each batch is scored in one go by
+    profile.score_rows() and written back with a single executemany UPDATE
+    (a Core statement; the ORM bulk update spends more time building
+    parameters than the database spends updating). Rows already scored with
+    this profile version are skipped, so an interrupted run can simply be
+    started again. Stored diffs are then brought in line with the new
+    scores. Rows without any section score (unreadable analyses) are left
+    alone.
+
+    Returns a summary: rows re-scored, rows whose score changed, diffs
+    updated, seconds and rows/sec.
+    """
+    missing = [category for category in profile.categories if category not in SCORE_CATEGORIES]
+    if missing:
+        raise ValueError(f"Scoring profile {profile.version} weights {', '.join(missing)}, "
+                         f"which stored analyses have no score column for")
+    columns = [getattr(SEOAnalysis, f'{category}_score') for category in profile.categories]
+    table = SEOAnalysis.__table__
+    update = (db.update(table).where(table.c.id == bindparam('row_id'))
+              .values(seo_score=bindparam('new_score'), score_profile=profile.version))
+    started = time.perf_counter()
+    rows_read = changed = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(SEOAnalysis.id, SEOAnalysis.seo_score, *columns)
+            .where(SEOAnalysis.id > last_id,
+                   db.or_(SEOAnalysis.score_profile.is_(None), SEOAnalysis.score_profile != profile.version),
+                   db.or_(*(column.isnot(None) for column in columns)))
+            .order_by(SEOAnalysis.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        rows_read += len(rows)
+        scores = profile.score_rows([row[2:] for row in rows])
+        changed += sum(score != row[1] for row, score in zip(rows, scores))
+        if not dry_run:
+            db.session.connection().execute(update, [{'row_id': row[0], 'new_score': score}
+                                                     for row, score in zip(rows, scores)])
+            db.session.commit()
+
+    diffs = 0 if dry_run or not changed else refresh_diff_scores(batch_size)
+    seconds = time.perf_counter() - started
+    summary = {
+        'profile': profile.version,
+        'rows': rows_read,
+        'changed': changed,
+        'diffs_updated': diffs,
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(rows_read / seconds) if seconds else None,
+        'dry_run': dry_run
+    }
+    logger.info("re-scored stored analyses", extra=summary)
+    return summary
+
+
+def refresh_diff_scores(batch_size=5000):
+    """Update the seo_score change of stored diffs whose analyses were re-scored; returns the number updated"""
+    current, previous = aliased(SEOAnalysis), aliased(SEOAnalysis)
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(AnalysisDiff.id, AnalysisDiff.seo_score_delta, previous.seo_score, current.seo_score)
+            .join(current, current.id == AnalysisDiff.analysis_id)
+            .join(previous, previous.id == AnalysisDiff.previous_id)
+            .where(AnalysisDiff.id > last_id)
+            .order_by(AnalysisDiff.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        stale = {}
+        for diff_id, delta, previous_score, current_score in rows:
+            scores = rescored_changes({}, previous_score, current_score)
+            if scores.get('seo_score', {}).get('delta', 0.0) != delta:
+                stale[diff_id] = (previous_score, current_score)
+        if not stale:
+            continue
+        updates = []
+        for diff in AnalysisDiff.query.filter(AnalysisDiff.id.in_(stale)):
+            changes = rescored_changes(json.loads(diff.changes), *stale[diff.id])
+            updates.append({'id': diff.id, 'changes': json.dumps(changes),
+                            'seo_score_delta': changes.get('seo_score', {}).get('delta', 0.0)})
+        db.session.execute(db.update(AnalysisDiff), updates)
+        db.session.commit()
+        updated += len(updates)
+    return updated
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from dotenv import load_dotenv
+    from flask import Flask
+
+    from database import configure_database, migrate_schema
+    from telemetry import configure_logging
+
+    parser = argparse.ArgumentParser(description="Re-score stored analyses with a scoring profile")
+    parser.add_argument('--profile', help='profile version (default: SCORING_PROFILE)')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--dry-run', action='store_true', help='count the scores that would change, write nothing')
+    args = parser.parse_args()
+
+    load_dotenv()
+    configure_logging()
+    app = Flask(__name__)
+    configure_database(app)
+    with app.app_context():
+        migrate_schema()
+        summary = rescore_analyses(get_scoring_profile(args.profile), batch_size=args.batch_size,
+                                   dry_run=args.dry_run)
+    print(f"{summary['rows']} rows in {summary['seconds']} s ({summary['rows_per_sec']} rows/sec): "
+          f"{summary['changed']} scores changed, "
+          f"{summary['diffs_updated']} diffs updated{' (dry run)' if args.dry_run else ''}")
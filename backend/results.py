@@ -0,0 +1,157 @@
+"""Typed results of the analysis sections, and the JSON encoding shared by every consumer.
+
+Each _analyze_* stage of SEOAnalyzer returns one of the slotted dataclasses
+below instead of a dict. Sections are also read-only Mappings, so code that
+reads analyses (section['score'], section.get('text'), iteration) works the
+same on fresh results and on analyses decoded from storage, which stay dicts.
+The keywords and link_health sections stay dicts: their shape depends on
+whether spaCy is installed and on the page.
+
+encode_json() turns an analysis into compact UTF-8 JSON with the same keys,
+in the same order, as the dicts it replaces. run_analysis() encodes once and
+reuses the bytes for the stored payload, the HTTP response and the job
+result. orjson is used when it is installed, with the standard library as
+fallback.
+"""
+
+import json
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Section(Mapping):
+    """Base of the section results. __slots__ doubles as the ordered list of fields."""
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+# __slots__ is declared by hand (dataclass(slots=True) needs Python 3.10) and
+# must list the fields in declaration order
+
+
+@dataclass
+class TitleResult(Section):
+    __slots__ = ('text', 'length', 'optimal_length', 'score')
+    text: str
+    length: int
+    optimal_length: bool
+    score: float
+
+
+@dataclass
+class MetaDescriptionResult(Section):
+    __slots__ = ('text', 'length', 'optimal_length', 'score')
+    text: str
+    length: int
+    optimal_length: bool
+    score: float
+
+
+@dataclass
+class HeadingsResult(Section):
+    __slots__ = ('structure', 'h1_count', 'proper_structure', 'score')
+    structure: Dict[str, List[str]]
+    h1_count: int
+    proper_structure: bool
+    score: float
+
+
+@dataclass
+class ContentResult(Section):
+    __slots__ = ('word_count', 'adequate_length', 'simhash', 'score')
+    word_count: int
+    adequate_length: bool
+    simhash: Optional[str]
+    score: float
+
+
+@dataclass
+class ImagesResult(Section):
+    __slots__ = ('total_images', 'images_with_alt', 'alt_ratio', 'score')
+    total_images: int
+    images_with_alt: int
+    alt_ratio: float
+    score: float
+
+
+@dataclass
+class LinksResult(Section):
+    __slots__ = ('total_links', 'internal_links', 'external_links', 'score')
+    total_links: int
+    internal_links: int
+    external_links: int
+    score: float
+
+
+@dataclass
+class TechnicalResult(Section):
+    __slots__ = ('meta_viewport', 'meta_charset', 'score')
+    meta_viewport: bool
+    meta_charset: bool
+    score: float
+
+
+@dataclass
+class ReadabilityResult(Section):
+    __slots__ = ('sentences', 'words', 'syllables', 'polysyllables', 'flesch_reading_ease', 'flesch_kincaid_grade',
+                 'smog_index', 'gunning_fog', 'coleman_liau_index', 'score')
+    sentences: int
+    words: int
+    syllables: int
+    polysyllables: int
+    flesch_reading_ease: float
+    flesch_kincaid_grade: float
+    smog_index: float
+    gunning_fog: float
+    coleman_liau_index: float
+    score: float
+
+
+def _default(obj):
+    if isinstance(obj, Section):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def encode_json(data):
+        """Compact UTF-8 JSON bytes; sections are serialized natively by orjson"""
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+    decode_json = orjson.loads
+else:
+    def encode_json(data):
+        """Compact UTF-8 JSON bytes"""
+        return json.dumps(data, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    decode_json = json.loads
+
+
+def extend_json(encoded, extra):
+    """Encoded JSON object with the keys of extra added, without decoding it again"""
+    if not extra:
+        return encoded
+    tail = encode_json(extra)
+    if encoded == b'{}':
+        return tail
+    return encoded[:-1] + b',' + tail[1:]
@@ -0,0 +1,101 @@
+import json
+import logging
+import os
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+if numpy is None:
+    logger.warning("numpy not installed - bulk re-scoring falls back to a slower pure Python loop")
+
+# Analysis sections a profile can weight
+CATEGORIES = ('title', 'meta_description', 'headings', 'content', 'images', 'links', 'technical', 'readability',
+              'keywords')
+
+# Built-in profiles. A version's weights never change once scores have been
+# stored with it; tuning means adding a new version and re-scoring.
+BUILTIN_PROFILES = {
+    '1': {
+        'title': 0.2,
+        'meta_description': 0.15,
+        'headings': 0.15,
+        'content': 0.15,
+        'images': 0.1,
+        'links': 0.1,
+        'technical': 0.1,
+        'readability': 0.05
+    }
+}
+DEFAULT_PROFILE = '1'
+
+
+class ScoringProfile:
+    """Weights that combine section scores into seo_score, under a version name.
+
+    score() rates one analysis dict. score_rows() rates many rows of section
+    scores at once for bulk re-scoring. Both give exactly the same result:
+    the weighted sum is accumulated category by category in weight order,
+    the same floating point operations as the single-page loop, and rounded
+    with Python's round(). A BLAS matrix-vector product or numpy.round()
+    would differ in the last bit for some rows and flip their rounding.
+    """
+
+    def __init__(self, version, weights):
+        unknown = set(weights) - set(CATEGORIES)
+        if unknown:
+            raise ValueError(f"Scoring profile {version} weights unknown categories: {', '.join(sorted(unknown))}")
+        if any(not isinstance(weight, (int, float)) or weight < 0 for weight in weights.values()):
+            raise ValueError(f"Scoring profile {version} weights must be non-negative numbers")
+        self.version = str(version)
+        self.weights = dict(weights)
+        self.categories = tuple(weights)
+
+    def score(self, analysis):
+        total_score = 0
+        for category, weight in self.weights.items():
+            if category in analysis:
+                total_score += analysis[category]['score'] * weight
+
+        return round(total_score, 1)
+
+    def score_rows(self, rows):
+        """seo_score for each row of section scores, given in self.categories order (None when missing)"""
+        if numpy is None:
+            return [self.score({category: {'score': value} for category, value in zip(self.categories, row)
+                                if value is not None}) for row in rows]
+        matrix = numpy.array(rows, dtype=float).reshape(-1, len(self.categories))
+        # A missing section adds nothing, as in score()
+        numpy.nan_to_num(matrix, copy=False, nan=0.0)
+        totals = numpy.zeros(len(matrix))
+        for column, weight in enumerate(self.weights.values()):
+            totals += matrix[:, column] * weight
+        return [round(total, 1) for total in totals.tolist()]
+
+    def to_dict(self):
+        return {'version': self.version, 'weights': self.weights}
+
+
+def load_profiles(path=None):
+    """Built-in profiles plus those in the JSON file at path ({"<version>": {"<category>": weight}})"""
+    profiles = {version: ScoringProfile(version, weights) for version, weights in BUILTIN_PROFILES.items()}
+    if path:
+        with open(path) as f:
+            extra = json.load(f)
+        for version, weights in extra.items():
+            if version in profiles and profiles[version].weights != weights:
+                raise ValueError(f"Scoring profile {version} already exists with other weights; use a new version")
+            profiles[version] = ScoringProfile(version, weights)
+    return profiles
+
+
+def get_scoring_profile(version=None):
+    """Profile by version; by default SCORING_PROFILE, looked up in SCORING_PROFILES_FILE and the built-ins"""
+    profiles = load_profiles(os.environ.get('SCORING_PROFILES_FILE'))
+    version = str(version or os.environ.get('SCORING_PROFILE', DEFAULT_PROFILE))
+    if version not in profiles:
+        raise ValueError(f"Unknown scoring profile: {version}")
+    return profiles[version]
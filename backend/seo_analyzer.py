@@ -1,132 +1,257 @@
-import requests
-from bs4 import BeautifulSoup
-import spacy
-import nltk
-from textstat import flesch_reading_ease, flesch_kincaid_grade
+import logging
+import multiprocessing
+import os
 import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from urllib.parse import urljoin, urlparse
+from html_extractor import get_extractor
+from fetcher import get_fetcher
+from keyword_analyzer import KeywordAnalyzer
+from link_checker import get_link_checker
+from readability import readability_scores
+from results import (ContentResult, HeadingsResult, ImagesResult, LinksResult, MetaDescriptionResult,
+                     ReadabilityResult, TechnicalResult, TitleResult)
+from scoring import get_scoring_profile
+from simhash import simhash, to_hex
+from telemetry import observe_stages, span, trace
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever extraction or scoring changes so cached analyses are not reused
+ANALYZER_VERSION = '5'
 
 class SEOAnalyzer:
-    def __init__(self):
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            print("Please install spaCy English model: python -m spacy download en_core_web_sm")
-        
-        
+    def __init__(self, extractor='auto', fetcher=None, keywords=True, link_checker=None, scoring=None):
+        self.extractor = get_extractor(extractor)
+        self.fetcher = fetcher or get_fetcher()
+        self.keywords = keywords
+        self.scoring = scoring or get_scoring_profile()
+        self._link_checker = link_checker
+        self._keyword_analyzer = None
+        self._nlp = None
+        self._nlp_loaded = False
+        self._nlp_lock = threading.Lock()
+    
+    @property
+    def nlp(self):
+        """spaCy pipeline, loaded on first use (None if the model is not installed)"""
+        if not self._nlp_loaded:
+            with self._nlp_lock:
+                if not self._nlp_loaded:
+                    self._nlp = self._load_nlp()
+                    self._nlp_loaded = True
+        return self._nlp
+    
+    def _load_nlp(self):
         try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
+            import spacy
+            return spacy.load("en_core_web_sm")
+        except (ImportError, OSError):
+            logger.warning("spaCy English model not installed: python -m spacy download en_core_web_sm")
+            return None
+    
+    @property
+    def link_checker(self):
+        if self._link_checker is None:
+            self._link_checker = get_link_checker()
+        return self._link_checker
+    
+    @property
+    def keyword_analyzer(self):
+        if self._keyword_analyzer is None and self.nlp is not None:
+            self._keyword_analyzer = KeywordAnalyzer(self.nlp)
+        return self._keyword_analyzer
+    
+    def warm_up(self):
+        """Load lazy components now, e.g. in a pre-fork master so workers share them copy-on-write"""
+        return self.nlp is not None
     
     def scrape_page(self, url):
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
+            return self.fetcher.fetch(url)
         except Exception as e:
             raise Exception(f"Error scraping page: {str(e)}")
     
-    def analyze_page(self, url):
-        soup = self.scrape_page(url)
+    def analyze_page(self, url, check_links=False):
+        with span('fetch'):
+            page = self.scrape_page(url)
+        analysis = self.analyze_html(page.body, url, page.encoding, check_links=check_links)
+        analysis['fetch'] = page.to_dict()
+        return analysis
+    
+    def analyze_many(self, urls, fetch_workers=16, per_host=4, processes=None, pool=None):
+        """Analyze many URLs, yielding each analysis as soon as it is ready.
+
+        Pages are fetched on a thread pool with at most per_host concurrent
+        requests per host, and parsed/scored on a process pool: pool if
+        given (see get_parse_pool), else one of processes workers started
+        for this call (processes=0 parses on the fetch threads instead).
+        Failed URLs are yielded as
+        {'url': ..., 'error': ...} so one bad page does not stop the batch.
+        Each analysis carries the 'timings' of its own stages.
+        """
+        host_limits = {}
+        host_lock = threading.Lock()
+        inline = processes == 0
+        
+        def fetch(url):
+            host = urlparse(url).netloc
+            with host_lock:
+                limit = host_limits.setdefault(host, threading.BoundedSemaphore(per_host))
+            with trace() as timings:
+                with limit, span('fetch'):
+                    page = self.scrape_page(url)
+                if inline:
+                    analysis = self.analyze_html(page.body, url, page.encoding)
+                    analysis['timings'] = timings
+                    return page, analysis
+            return page, {'timings': timings}
+        
+        own_pool = pool is None and not inline
+        parse_pool = ProcessPoolExecutor(max_workers=processes) if own_pool else pool
+        try:
+            with ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool:
+                pending = {fetch_pool.submit(fetch, url): (url, None, None) for url in urls}
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        url, page, fetch_timings = pending.pop(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            yield {'url': url, 'error': str(e)}
+                            continue
+                        
+                        if page is None:
+                            page, analysis = result
+                            if 'url' not in analysis:
+                                job = parse_pool.submit(_analyze_in_process, self.extractor.backend, self.scoring,
+                                                        page.body, url, page.encoding)
+                                pending[job] = (url, page, analysis['timings'])
+                                continue
+                        else:
+                            # Stages timed in a worker process are recorded here
+                            analysis = result
+                            observe_stages(analysis['timings'])
+                            analysis['timings'] = dict(fetch_timings, **analysis['timings'])
+                        analysis['fetch'] = page.to_dict()
+                        yield analysis
+        finally:
+            if own_pool:
+                parse_pool.shutdown(cancel_futures=True)
+    
+    def analyze_html(self, html, url, encoding=None, progress=None, check_links=False):
+        with span('parse'):
+            facts = self.extractor.extract(html, encoding)
+        if progress:
+            progress('parsed')
+        return self.analyze_facts(facts, url, progress=progress, check_links=check_links)
+    
+    def analyze_facts(self, facts, url, progress=None, keywords=None, check_links=False):
+        if keywords is None:
+            keywords = self.keywords
+        stages = [
+            ('title', self._analyze_title),
+            ('meta_description', self._analyze_meta_description),
+            ('headings', self._analyze_headings),
+            ('content', self._analyze_content),
+            ('images', self._analyze_images),
+            ('links', lambda facts: self._analyze_links(facts, url)),
+            ('technical', self._analyze_technical),
+            ('readability', self._analyze_readability)
+        ]
+        if keywords:
+            stages.append(('keywords', self._analyze_keywords))
+        
+        analysis = {'url': url}
+        for name, analyze in stages:
+            with span(f'analyze_{name}'):
+                analysis[name] = analyze(facts)
         
-        analysis = {
-            'url': url,
-            'title': self._analyze_title(soup),
-            'meta_description': self._analyze_meta_description(soup),
-            'headings': self._analyze_headings(soup),
-            'content': self._analyze_content(soup),
-            'images': self._analyze_images(soup),
-            'links': self._analyze_links(soup, url),
-            'technical': self._analyze_technical(soup),
-            'readability': self._analyze_readability(soup)
-        }
+        with span('score'):
+            analysis['seo_score'] = self._calculate_seo_score(analysis)
+            analysis['score_profile'] = self.scoring.version
+        if progress:
+            progress('scored')
         
-       
-        analysis['seo_score'] = self._calculate_seo_score(analysis)
+        if check_links:
+            # Not scored: link health changes independently of the page
+            with span('check_links'):
+                analysis['link_health'] = self.link_checker.check_page(facts, url)
+            if progress:
+                progress('links_checked')
         
         return analysis
     
-    def _analyze_title(self, soup):
-        title_tag = soup.find('title')
-        title = title_tag.text.strip() if title_tag else ""
+    def _analyze_title(self, facts):
+        title = facts.title.strip() if facts.title is not None else ""
         
-        return {
-            'text': title,
-            'length': len(title),
-            'optimal_length': 30 <= len(title) <= 60,
-            'score': 100 if 30 <= len(title) <= 60 else max(0, 100 - abs(len(title) - 50) * 2)
-        }
+        return TitleResult(
+            text=title,
+            length=len(title),
+            optimal_length=30 <= len(title) <= 60,
+            score=100 if 30 <= len(title) <= 60 else max(0, 100 - abs(len(title) - 50) * 2)
+        )
     
-    def _analyze_meta_description(self, soup):
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
+    def _analyze_meta_description(self, facts):
+        meta_desc = facts.find_meta('description')
         description = meta_desc.get('content', '').strip() if meta_desc else ""
         
-        return {
-            'text': description,
-            'length': len(description),
-            'optimal_length': 120 <= len(description) <= 160,
-            'score': 100 if 120 <= len(description) <= 160 else max(0, 100 - abs(len(description) - 140) * 2)
-        }
+        return MetaDescriptionResult(
+            text=description,
+            length=len(description),
+            optimal_length=120 <= len(description) <= 160,
+            score=100 if 120 <= len(description) <= 160 else max(0, 100 - abs(len(description) - 140) * 2)
+        )
     
-    def _analyze_headings(self, soup):
-        headings = {}
-        heading_tags = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
-        
-        for tag in heading_tags:
-            elements = soup.find_all(tag)
-            headings[tag] = [elem.text.strip() for elem in elements]
+    def _analyze_headings(self, facts):
+        headings = {tag: list(texts) for tag, texts in facts.headings.items()}
         
         h1_count = len(headings.get('h1', []))
         has_proper_structure = h1_count == 1 and len(headings.get('h2', [])) > 0
         
-        return {
-            'structure': headings,
-            'h1_count': h1_count,
-            'proper_structure': has_proper_structure,
-            'score': 100 if has_proper_structure else 50
-        }
+        return HeadingsResult(
+            structure=headings,
+            h1_count=h1_count,
+            proper_structure=has_proper_structure,
+            score=100 if has_proper_structure else 50
+        )
     
-    def _analyze_content(self, soup):
-        
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        text = soup.get_text()
+    def _analyze_content(self, facts):
+        text = facts.text
         word_count = len(text.split())
         
-        return {
-            'word_count': word_count,
-            'adequate_length': word_count >= 300,
-            'score': min(100, word_count / 3) if word_count < 300 else 100
-        }
+        return ContentResult(
+            word_count=word_count,
+            adequate_length=word_count >= 300,
+            # Main text only, so pages sharing a template but not their content stay apart
+            simhash=to_hex(simhash(facts.main_text)),
+            score=min(100, word_count / 3) if word_count < 300 else 100
+        )
     
-    def _analyze_images(self, soup):
-        images = soup.find_all('img')
+    def _analyze_images(self, facts):
+        images = facts.images
         total_images = len(images)
         images_with_alt = sum(1 for img in images if img.get('alt', '').strip())
         
         alt_ratio = images_with_alt / total_images if total_images > 0 else 1
         
-        return {
-            'total_images': total_images,
-            'images_with_alt': images_with_alt,
-            'alt_ratio': alt_ratio,
-            'score': alt_ratio * 100
-        }
+        return ImagesResult(
+            total_images=total_images,
+            images_with_alt=images_with_alt,
+            alt_ratio=alt_ratio,
+            score=alt_ratio * 100
+        )
     
-    def _analyze_links(self, soup, base_url):
-        links = soup.find_all('a', href=True)
+    def _analyze_links(self, facts, base_url):
+        links = facts.links
         internal_links = 0
         external_links = 0
         
         base_domain = urlparse(base_url).netloc
         
-        for link in links:
-            href = link['href']
+        for href in links:
             if href.startswith('http'):
                 if urlparse(href).netloc == base_domain:
                     internal_links += 1
@@ -135,54 +260,77 @@ class SEOAnalyzer:
             elif href.startswith('/'):
                 internal_links += 1
         
-        return {
-            'total_links': len(links),
-            'internal_links': internal_links,
-            'external_links': external_links,
-            'score': min(100, (internal_links + external_links) * 10)
-        }
+        return LinksResult(
+            total_links=len(links),
+            internal_links=internal_links,
+            external_links=external_links,
+            score=min(100, (internal_links + external_links) * 10)
+        )
     
-    def _analyze_technical(self, soup):
-        has_meta_viewport = bool(soup.find('meta', attrs={'name': 'viewport'}))
-        has_meta_charset = bool(soup.find('meta', attrs={'charset': True}))
+    def _analyze_technical(self, facts):
+        has_meta_viewport = bool(facts.find_meta('viewport'))
+        has_meta_charset = facts.has_meta_attr('charset')
         
-        return {
-            'meta_viewport': has_meta_viewport,
-            'meta_charset': has_meta_charset,
-            'score': (has_meta_viewport + has_meta_charset) * 50
-        }
+        return TechnicalResult(
+            meta_viewport=has_meta_viewport,
+            meta_charset=has_meta_charset,
+            score=(has_meta_viewport + has_meta_charset) * 50
+        )
+    
+    def _analyze_readability(self, facts):
+        # Score the main content only; nav/footer link text is not prose
+        scores = readability_scores(facts.main_text)
+        return ReadabilityResult(score=max(0, min(100, scores['flesch_reading_ease'])), **scores)
     
-    def _analyze_readability(self, soup):
-        text = soup.get_text()
+    def _analyze_keywords(self, facts):
+        if self.keyword_analyzer is None:
+            return {'available': False, 'score': 0}
         
-        try:
-            flesch_score = flesch_reading_ease(text)
-            fk_grade = flesch_kincaid_grade(text)
-        except:
-            flesch_score = 0
-            fk_grade = 12
-        
-        return {
-            'flesch_reading_ease': flesch_score,
-            'flesch_kincaid_grade': fk_grade,
-            'score': max(0, min(100, flesch_score))
-        }
+        title = facts.title.strip() if facts.title is not None else ""
+        return self.keyword_analyzer.analyze(facts.text, title, facts.headings.get('h1', []))
     
     def _calculate_seo_score(self, analysis):
-        weights = {
-            'title': 0.2,
-            'meta_description': 0.15,
-            'headings': 0.15,
-            'content': 0.15,
-            'images': 0.1,
-            'links': 0.1,
-            'technical': 0.1,
-            'readability': 0.05
-        }
-        
-        total_score = 0
-        for category, weight in weights.items():
-            if category in analysis:
-                total_score += analysis[category]['score'] * weight
-        
-        return round(total_score, 1)
\ No newline at end of file
+        return self.scoring.score(analysis)
+
+
+_process_analyzer = None
+_parse_pool = None
+_parse_pool_pid = None
+_parse_pool_lock = threading.Lock()
+
+def _init_process_analyzer(extractor):
+    global _process_analyzer
+    _process_analyzer = SEOAnalyzer(extractor=extractor)
+    _process_analyzer.warm_up()
+
+def get_parse_pool(extractor='auto'):
+    """This process's long-lived pool for analyze_many, or None when BATCH_PROCESSES is 0.
+
+    Its BATCH_PROCESSES workers (default 2) are started from a forkserver
+    (spawn where there is none), never forked from a process already
+    running threads, and load their analyzer and spaCy model once.
+    """
+    global _parse_pool, _parse_pool_pid
+    processes = int(os.environ.get('BATCH_PROCESSES', '2'))
+    if processes <= 0:
+        return None
+    if _parse_pool_pid != os.getpid():
+        with _parse_pool_lock:
+            if _parse_pool_pid != os.getpid():
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                _parse_pool = ProcessPoolExecutor(max_workers=processes, mp_context=context,
+                                                  initializer=_init_process_analyzer, initargs=(extractor,))
+                _parse_pool_pid = os.getpid()
+    return _parse_pool
+
+def _analyze_in_process(extractor, scoring, html, url, encoding):
+    # Runs in ProcessPoolExecutor workers; each process keeps one analyzer
+    global _process_analyzer
+    if _process_analyzer is None:
+        _process_analyzer = SEOAnalyzer(extractor=extractor, scoring=scoring)
+    _process_analyzer.scoring = scoring
+    with trace() as timings:
+        analysis = _process_analyzer.analyze_html(html, url, encoding)
+    analysis['timings'] = timings
+    return analysis
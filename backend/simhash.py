@@ -0,0 +1,212 @@
+"""SimHash content fingerprints and a banded index for near-duplicate lookups.
+
+simhash() reduces the main text of a page to 64 bits: every distinct
+three-word shingle is hashed and each bit of the fingerprint is the
+majority vote of that bit over the shingle hashes. Pages that share most
+of their shingles get fingerprints a few bits apart, so near-duplicates
+are pages whose fingerprints differ in at most MAX_DISTANCE bits.
+
+SimHashIndex finds those without comparing against every page. The 64
+bits are split into BANDS blocks of 16; two fingerprints at most BANDS - 1
+bits apart agree exactly on at least one block, so looking up the blocks
+of the query finds every near-duplicate (no false negatives). Each band is
+a sorted array of (block << 32 | position) keys searched by bisection, and
+an entry costs 48 bytes: its fingerprint, analysis id and one key per band.
+
+Fingerprints are stored and compared across processes and releases, so
+both paths of simhash() (NumPy and pure Python) compute exactly the same
+value, from word hashes that do not depend on PYTHONHASHSEED.
+"""
+
+import hashlib
+import logging
+import string
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import chain
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+if numpy is None:
+    logger.warning("numpy not installed - content fingerprints fall back to a slower pure Python path")
+
+BITS = 64
+BANDS = 4
+BAND_BITS = BITS // BANDS
+MAX_DISTANCE = BANDS - 1
+SHINGLE_WORDS = 3
+# New entries are scanned linearly until this many are merged into the sorted bands at once
+MERGE_EVERY = 256
+
+_MASK = (1 << BITS) - 1
+_BAND_MASK = (1 << BAND_BITS) - 1
+_POSITION_MASK = (1 << 32) - 1
+_MULTIPLIER = 0x9E3779B97F4A7C15
+_MIX1 = 0xBF58476D1CE4E5B9
+_MIX2 = 0x94D049BB133111EB
+# Punctuation becomes word breaks; str.translate is several times faster than a \w+ regex on long pages
+_WORD_BREAKS = str.maketrans(dict.fromkeys(string.punctuation + '\u2018\u2019\u201c\u201d\u2013\u2014\u2026\u00ab\u00bb'
+                                           '\u00b7\u2022', ' '))
+
+
+def _word_hash(word):
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _mix(z):
+    # splitmix64 finalizer: spreads the combined word hashes over all 64 bits
+    z = ((z ^ (z >> 30)) * _MIX1) & _MASK
+    z = ((z ^ (z >> 27)) * _MIX2) & _MASK
+    return z ^ (z >> 31)
+
+
+def _shingle_hashes(words):
+    table = {word: _word_hash(word) for word in set(words)}
+    hashes = [table[word] for word in words]
+    width = min(SHINGLE_WORDS, len(hashes))
+    count = len(hashes) - width + 1
+    if numpy is not None:
+        hashes = numpy.array(hashes, dtype=numpy.uint64)
+        combined = hashes[:count].copy()
+        for offset in range(1, width):
+            combined = combined * numpy.uint64(_MULTIPLIER) + hashes[offset:offset + count]
+        combined ^= combined >> numpy.uint64(30)
+        combined *= numpy.uint64(_MIX1)
+        combined ^= combined >> numpy.uint64(27)
+        combined *= numpy.uint64(_MIX2)
+        combined ^= combined >> numpy.uint64(31)
+        return numpy.unique(combined)
+    shingles = set()
+    for start in range(count):
+        combined = hashes[start]
+        for offset in range(1, width):
+            combined = (combined * _MULTIPLIER + hashes[start + offset]) & _MASK
+        shingles.add(_mix(combined))
+    return list(shingles)
+
+
+def simhash(text):
+    """64-bit fingerprint of the words of text, or None if it has no words"""
+    words = text.lower().translate(_WORD_BREAKS).split()
+    if not words:
+        return None
+    shingles = _shingle_hashes(words)
+    if numpy is not None:
+        bits = numpy.unpackbits(shingles.astype('<u8').view(numpy.uint8), bitorder='little')
+        counts = bits.reshape(-1, BITS).sum(axis=0, dtype=numpy.int64).tolist()
+    else:
+        counts = [sum((shingle >> bit) & 1 for shingle in shingles) for bit in range(BITS)]
+    # Ties round down, so a page with one shingle gets that shingle's hash
+    return sum(1 << bit for bit, count in enumerate(counts) if count * 2 > len(shingles))
+
+
+def distance(a, b):
+    """Number of bits in which two fingerprints differ"""
+    return bin(a ^ b).count('1')
+
+
+def to_hex(fingerprint):
+    return None if fingerprint is None else f'{fingerprint:016x}'
+
+
+def from_hex(text):
+    return None if text is None else int(text, 16)
+
+
+def to_signed(fingerprint):
+    """The fingerprint as a signed 64-bit integer, for BIGINT columns"""
+    if fingerprint is None:
+        return None
+    return fingerprint - (1 << BITS) if fingerprint >> (BITS - 1) else fingerprint
+
+
+def from_signed(value):
+    return None if value is None else value & _MASK
+
+
+class SimHashIndex:
+    """Fingerprints of analyses, searchable for those within MAX_DISTANCE bits.
+
+    Entries are only appended. Fresh entries sit in a short unsorted list
+    that lookups scan, and are merged into the sorted bands every
+    MERGE_EVERY additions, which copies each band once.
+    """
+
+    def __init__(self):
+        self.fingerprints = array('Q')
+        self.ids = array('q')
+        self._bands = [array('Q') for _ in range(BANDS)]
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, analysis_id, fingerprint):
+        with self._lock:
+            self._pending.append(len(self.ids))
+            self.fingerprints.append(fingerprint)
+            self.ids.append(analysis_id)
+            if len(self._pending) >= MERGE_EVERY:
+                self._merge()
+
+    def extend(self, entries):
+        """Add (analysis_id, fingerprint) pairs with a single merge, for loading many at once"""
+        with self._lock:
+            for analysis_id, fingerprint in entries:
+                self._pending.append(len(self.ids))
+                self.fingerprints.append(fingerprint)
+                self.ids.append(analysis_id)
+            if self._pending:
+                self._merge()
+
+    def _merge(self):
+        fingerprints = self.fingerprints
+        for band, keys in enumerate(self._bands):
+            shift = band * BAND_BITS
+            new = sorted(((fingerprints[position] >> shift) & _BAND_MASK) << 32 | position
+                         for position in self._pending)
+            if len(new) >= len(keys):
+                self._bands[band] = array('Q', sorted(chain(keys, new)))
+                continue
+            # Few new keys: copy the runs of the band between their insertion points, without unboxing it
+            merged = array('Q')
+            start = 0
+            for key in new:
+                end = bisect_left(keys, key, start)
+                merged.extend(keys[start:end])
+                merged.append(key)
+                start = end
+            merged.extend(keys[start:])
+            self._bands[band] = merged
+        self._pending = []
+
+    def lookup(self, fingerprint, max_distance=MAX_DISTANCE):
+        """[(distance, analysis_id)] of the entries within max_distance bits, closest and newest first"""
+        max_distance = min(max_distance, MAX_DISTANCE)
+        with self._lock:
+            fingerprints = self.fingerprints
+            positions = set(self._pending)
+            for band, keys in enumerate(self._bands):
+                block = (fingerprint >> (band * BAND_BITS)) & _BAND_MASK
+                start = bisect_left(keys, block << 32)
+                end = bisect_left(keys, (block + 1) << 32, start)
+                positions.update(key & _POSITION_MASK for key in keys[start:end])
+            matches = []
+            for position in positions:
+                bits = distance(fingerprint, fingerprints[position])
+                if bits <= max_distance:
+                    matches.append((bits, self.ids[position]))
+        matches.sort(key=lambda match: (match[0], -match[1]))
+        return matches
+
+    def memory_bytes(self):
+        """Bytes held by the arrays (what grows with the number of entries)"""
+        arrays = [self.fingerprints, self.ids] + self._bands
+        return sum(values.itemsize * len(values) for values in arrays) + 8 * len(self._pending)
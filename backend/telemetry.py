@@ -0,0 +1,292 @@
+import cProfile
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+# Upper bounds in seconds; page stages take microseconds, fetches and Gemini seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_LOG_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+# Client-supplied X-Request-ID values are echoed and logged only if they look like this
+_REQUEST_ID_RE = re.compile(r'[A-Za-z0-9-]{1,64}')
+
+_trace = ContextVar('seo_trace', default=None)
+_memory_trace = ContextVar('seo_memory_trace', default=None)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with one series per label value tuple"""
+
+    def __init__(self, name, help_text, labels, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((key, (list(counts), count, total)) for key, (counts, count, total) in self._series.items())
+        for label_values, (counts, count, total) in series:
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            prefix = f'{labels},' if labels else ''
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            suffix = f'{{{labels}}}' if labels else ''
+            lines.append(f'{self.name}_sum{suffix} {total:.6f}')
+            lines.append(f'{self.name}_count{suffix} {count}')
+        return lines
+
+
+STAGE_SECONDS = Histogram('seo_stage_duration_seconds', 'Time spent in each analysis stage', ('stage',))
+REQUEST_SECONDS = Histogram('seo_http_request_duration_seconds', 'HTTP request latency',
+                            ('method', 'endpoint', 'status'))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+@contextmanager
+def trace():
+    """Collect the spans run inside this block into a dict of stage -> milliseconds.
+
+    Nested trace() blocks share the outermost dict. The outermost block feeds
+    the stage histograms when it exits.
+    """
+    timings = _trace.get()
+    if timings is not None:
+        yield timings
+        return
+    timings = {}
+    token = _trace.set(timings)
+    try:
+        yield timings
+    finally:
+        _trace.reset(token)
+        observe_stages(timings)
+
+
+@contextmanager
+def memory_trace():
+    """Collect the peak memory (bytes above the level at entry) of each span run inside this block.
+
+    Needs tracemalloc to be tracing; meant for benchmarks, since tracing
+    slows everything down. Spans must not be nested inside this block.
+    """
+    peaks = {}
+    token = _memory_trace.set(peaks)
+    try:
+        yield peaks
+    finally:
+        _memory_trace.reset(token)
+
+
+@contextmanager
+def span(stage):
+    """Time a block as one stage, recorded in the current trace (or directly in the histogram)"""
+    peaks = _memory_trace.get()
+    if peaks is not None and tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if peaks is not None and tracemalloc.is_tracing():
+            peaks[stage] = max(peaks.get(stage, 0), tracemalloc.get_traced_memory()[1] - baseline)
+        timings = _trace.get()
+        if timings is None:
+            STAGE_SECONDS.observe(elapsed, stage)
+        else:
+            timings[stage] = round(timings.get(stage, 0.0) + elapsed * 1000, 3)
+
+
+def observe_stages(timings):
+    """Feed a stage -> milliseconds dict into the stage histogram, e.g. one returned by a worker process"""
+    for stage, ms in timings.items():
+        STAGE_SECONDS.observe(ms / 1000, stage)
+
+
+def _gauge_lines(prefix, value, lines):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _gauge_lines(f'{prefix}_{key}', item, lines)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        name = re.sub(r'[^a-zA-Z0-9_]', '_', prefix)
+        lines.append(f'# TYPE {name} gauge')
+        lines.append(f'{name} {value}')
+
+
+def render_metrics(gauges=None):
+    """Prometheus text exposition: the histograms plus every number in the gauges dict, flattened"""
+    lines = STAGE_SECONDS.render() + REQUEST_SECONDS.render()
+    for section, values in (gauges or {}).items():
+        if values is not None:
+            _gauge_lines(f'seo_{section}', values, lines)
+    return '\n'.join(lines) + '\n'
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; fields passed with extra={...} are included as keys"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _LOG_RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current request's id to log records emitted while handling it"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            from flask import g, has_request_context
+            if has_request_context() and 'request_id' in g:
+                record.request_id = g.request_id
+        return True
+
+
+def configure_logging():
+    """Route all logging to stderr, as JSON lines unless LOG_FORMAT=text; level from LOG_LEVEL"""
+    handler = logging.StreamHandler(sys.stderr)
+    if os.environ.get('LOG_FORMAT', 'json') == 'text':
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    else:
+        handler.setFormatter(JsonFormatter())
+    handler.addFilter(RequestIdFilter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+
+
+class RequestProfiler:
+    """Profiles single requests that ask for it with an X-Profile: 1 header.
+
+    Only active when PROFILE_REQUESTS=1. Uses pyinstrument when installed
+    (HTML report), else cProfile (a .prof file for pstats or snakeviz).
+    Reports go to PROFILE_DIR and the file name is returned in X-Profile-File.
+    For streamed responses only the time until the view returns is covered.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        try:
+            import pyinstrument
+            self._pyinstrument = pyinstrument
+        except ImportError:
+            self._pyinstrument = None
+
+    def start(self):
+        try:
+            if self._pyinstrument is not None:
+                profiler = self._pyinstrument.Profiler()
+                profiler.start()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+        except (RuntimeError, ValueError):
+            # Another profiler is already active in this thread
+            return None
+        return profiler
+
+    @staticmethod
+    def discard(profiler):
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+        else:
+            profiler.stop()
+
+    def stop(self, profiler, name):
+        os.makedirs(self.directory, exist_ok=True)
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            path = os.path.join(self.directory, f'{name}.prof')
+            profiler.dump_stats(path)
+        else:
+            profiler.stop()
+            path = os.path.join(self.directory, f'{name}.html')
+            with open(path, 'w') as f:
+                f.write(profiler.output_html())
+        return path
+
+
+def init_telemetry(app):
+    """Request ids, request latency histogram and the opt-in per-request profiler"""
+    from flask import g, request
+
+    logger = logging.getLogger('http')
+    profiler = None
+    if os.environ.get('PROFILE_REQUESTS', '0') == '1':
+        profiler = RequestProfiler(os.environ.get('PROFILE_DIR', os.path.join(app.instance_path, 'profiles')))
+
+    @app.before_request
+    def start_request():
+        request_id = request.headers.get('X-Request-ID', '')
+        g.request_id = request_id if _REQUEST_ID_RE.fullmatch(request_id) else uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+        if profiler is not None and request.headers.get('X-Profile') == '1':
+            g.profiler = profiler.start()
+
+    @app.after_request
+    def finish_request(response):
+        if 'request_started' not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_started
+        if g.get('profiler') is not None:
+            # Never named after the client's request id
+            name = f"{datetime.utcnow():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:12]}"
+            path = profiler.stop(g.pop('profiler'), name)
+            response.headers['X-Profile-File'] = os.path.basename(path)
+            logger.info('request profiled', extra={'profile': path})
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_SECONDS.observe(elapsed, request.method, endpoint, response.status_code)
+        response.headers['X-Request-ID'] = g.request_id
+        logger.debug('request finished', extra={
+            'method': request.method, 'path': request.path, 'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2)
+        })
+        return response
+
+    @app.teardown_request
+    def stop_profiler(error):
+        # after_request is skipped when the view raises; never leave a profiler running
+        if g.get('profiler') is not None:
+            profiler.discard(g.pop('profiler'))
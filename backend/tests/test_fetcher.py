@@ -0,0 +1,107 @@
+import gzip
+import socket
+
+import pytest
+
+from benchmarks.fixture_server import FixtureServer, brotli
+from fetcher import FetchError, PageFetcher
+
+PAGES = {
+    'landing': b'<html><head><title>Landing</title></head><body><p>Welcome</p></body></html>',
+    'article': b'<html><head><title>Article</title></head><body>' + b'<p>Some article text.</p>' * 200 + b'</body></html>',
+    'catalog': b'<html><head><title>Catalog</title></head><body>' + b'<li>Item</li>' * 100 + b'</body></html>',
+}
+
+
+@pytest.fixture
+def server():
+    with FixtureServer(PAGES) as server:
+        yield server
+
+
+def test_repeat_fetch_is_revalidated(server):
+    fetcher = PageFetcher()
+    first = fetcher.fetch(server.url('article'))
+    second = fetcher.fetch(server.url('article'))
+    assert not first.revalidated
+    assert second.revalidated
+    assert second.body == first.body == PAGES['article']
+    assert server.handler.stats['not_modified'] == 1
+
+
+def test_connections_are_kept_alive(server):
+    fetcher = PageFetcher(validator_cache_bytes=0)
+    fetcher.fetch(server.url('landing'))
+    reused = fetcher.fetch(server.url('landing'))
+    assert not reused.revalidated
+    assert reused.timings['dns'] == reused.timings['connect'] == 0
+
+
+def test_body_is_capped_and_not_remembered(server):
+    fetcher = PageFetcher(max_body_bytes=256 * 1024)
+    url = server.url('large?kb=1024')
+    result = fetcher.fetch(url)
+    assert result.truncated
+    assert len(result.body) == 256 * 1024
+    assert not fetcher.fetch(url).revalidated
+
+
+def test_gzip_body_is_decoded(server):
+    fetcher = PageFetcher()
+    fetcher.session.headers['Accept-Encoding'] = 'gzip'
+    result = fetcher.fetch(server.url('catalog'))
+    assert result.headers['Content-Encoding'] == 'gzip'
+    assert result.body == PAGES['catalog']
+    assert int(result.headers['Content-Length']) == len(gzip.compress(PAGES['catalog'], compresslevel=5))
+
+
+@pytest.mark.skipif(brotli is None, reason='brotli is not installed')
+def test_brotli_body_is_decoded(server):
+    result = PageFetcher().fetch(server.url('catalog'))
+    assert result.headers['Content-Encoding'] == 'br'
+    assert result.to_dict()['content_encoding'] == 'br'
+    assert result.body == PAGES['catalog']
+    assert server.handler.stats['br'] == 1
+
+
+def test_http_error_carries_status_code(server):
+    with pytest.raises(FetchError) as error:
+        PageFetcher().fetch(server.url('missing'))
+    assert error.value.status_code == 404
+
+
+def test_unreachable_address_falls_back_to_the_next(server, monkeypatch):
+    port = server.httpd.server_address[1]
+    resolve = socket.getaddrinfo
+
+    def getaddrinfo(host, *args, **kwargs):
+        if host == 'multi.test':
+            # Nothing listens on 127.0.0.2; the server is bound to 127.0.0.1 only
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.2', port)),
+                    (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.1', port))]
+        return resolve(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, 'getaddrinfo', getaddrinfo)
+    result = PageFetcher().fetch(f'http://multi.test:{port}/landing')
+    assert result.status_code == 200
+    assert result.body == PAGES['landing']
+
+
+def test_validator_cache_is_bounded_by_bytes(server):
+    budget = len(PAGES['article']) + len(PAGES['landing'])
+    fetcher = PageFetcher(validator_cache_bytes=budget)
+    for name in ('landing', 'article', 'landing'):
+        fetcher.fetch(server.url(name))
+    assert fetcher._validator_bytes == budget
+    fetcher.fetch(server.url('catalog'))
+    assert fetcher._validator_bytes <= budget
+    assert fetcher._validator_bytes == sum(len(entry[2].body) for entry in fetcher._validators.values())
+    # The least recently used page was evicted, so it is downloaded again
+    assert not fetcher.fetch(server.url('article')).revalidated
+
+
+def test_body_larger_than_the_cache_is_not_remembered(server):
+    fetcher = PageFetcher(validator_cache_bytes=len(PAGES['landing']))
+    fetcher.fetch(server.url('article'))
+    assert not fetcher._validators
+    assert fetcher._validator_bytes == 0
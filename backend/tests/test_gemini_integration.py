@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from benchmarks.gemini_stub import SUGGESTIONS, GeminiStub
+from cache import TTLCache
+from gemini_integration import GeminiSEOAssistant, is_fallback
+from seo_analyzer import SEOAnalyzer
+
+HTML = b'<html><head><title>Pricing</title></head><body><h1>Plans</h1><p>Simple pricing for teams.</p></body></html>'
+
+
+@pytest.fixture(scope='module')
+def analysis():
+    return SEOAnalyzer(keywords=False).analyze_html(HTML, 'https://example.com/pricing')
+
+
+@pytest.fixture(autouse=True)
+def api_key(monkeypatch):
+    monkeypatch.setenv('GEMINI_API_KEY', 'stub-key')
+
+
+def assistant_for(stub):
+    return GeminiSEOAssistant(endpoint=stub.endpoint(), cache=TTLCache(max_entries=10, ttl=60))
+
+
+def test_repeat_request_is_served_from_cache(analysis):
+    with GeminiStub() as stub:
+        assistant = assistant_for(stub)
+        first = assistant.generate_seo_suggestions(analysis)
+        second = assistant.generate_seo_suggestions(analysis)
+    assert first == second == SUGGESTIONS
+    assert stub.handler.stats['calls'] == 1
+    stats = assistant.stats()
+    assert stats['cache_hits'] == 1
+    assert stats['api_calls'] == 1
+
+
+def test_concurrent_requests_share_one_call(analysis):
+    callers = 4
+    barrier = threading.Barrier(callers)
+    results = []
+
+    def ask():
+        barrier.wait()
+        results.append(assistant.generate_seo_suggestions(analysis))
+
+    with GeminiStub(latency_ms=300) as stub:
+        assistant = assistant_for(stub)
+        threads = [threading.Thread(target=ask) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert results == [SUGGESTIONS] * callers
+    assert stub.handler.stats['calls'] == 1
+    assert assistant.stats()['coalesced'] == callers - 1
+
+
+def test_api_errors_are_not_cached(analysis):
+    with GeminiStub(status=500) as stub:
+        assistant = assistant_for(stub)
+        first = assistant.generate_seo_suggestions(analysis)
+        assistant.generate_seo_suggestions(analysis)
+    assert 'error' in first and is_fallback(first)
+    assert stub.handler.stats['calls'] == 2
+    assert len(assistant.cache) == 0
+    assert assistant.stats()['api_errors'] == 2
+
+
+def test_text_fallback_is_not_cached(analysis):
+    with GeminiStub(reply='The page looks fine overall, but the title could be longer.') as stub:
+        assistant = assistant_for(stub)
+        first = assistant.generate_seo_suggestions(analysis)
+        assistant.generate_seo_suggestions(analysis)
+    assert first['fallback'] is True
+    assert 'error' not in first
+    assert is_fallback(first)
+    assert stub.handler.stats['calls'] == 2
+    assert len(assistant.cache) == 0
+    assert assistant.stats()['api_errors'] == 2
@@ -1,6 +1,6 @@
 import React, { useState, useRef, useEffect, useCallback } from 'react';
 import { FaComments, FaTimes, FaPaperPlane, FaRobot, FaSmile, FaPlus, FaTrash, FaHistory } from 'react-icons/fa';
-import api from '../utils/api';
+import { streamChat } from '../utils/api';
 
 const Chatbot = ({ username, seoReport }) => {
   const [open, setOpen] = useState(false);
@@ -210,45 +210,27 @@ const Chatbot = ({ username, seoReport }) => {
     
     try {
       const payload = { message: input };
-      if (seoReport) payload.seo_report = JSON.stringify(seoReport);
-      const res = await api.post('/chatbot', payload);
-      
-      
+      if (currentChatId) payload.conversation_id = String(currentChatId);
+      // The server keeps a summary of stored analyses, so only the id has to be sent
+      if (seoReport?.analysis_id) payload.analysis_id = seoReport.analysis_id;
+      else if (seoReport) payload.seo_report = JSON.stringify(seoReport);
       const typingMsg = { sender: 'bot', text: '', isTyping: true };
       const messagesWithTyping = [...newMessages, typingMsg];
       setMessages(messagesWithTyping);
       updateCurrentChat(messagesWithTyping);
-      
-      
-      const animateBotResponse = async () => {
-        const response = res.data.reply;
-        const words = response.split(' ');
-        let typedText = '';
-        
-        for (let i = 0; i < words.length; i++) {
-          typedText += (i > 0 ? ' ' : '') + words[i];
-          const typingMsg = { sender: 'bot', text: typedText, isTyping: true };
-          const updatedMessages = messagesWithTyping.map((msg, idx) => 
-            idx === messagesWithTyping.length - 1 
-              ? typingMsg
-              : msg
-          );
-          setMessages(updatedMessages);
-          updateCurrentChat(updatedMessages);
-          await new Promise(resolve => setTimeout(resolve, 40 + Math.random() * 40));
-        }
-        
-        const finalMsg = { sender: 'bot', text: response, isTyping: false };
-        const finalMessages = messagesWithTyping.map((msg, idx) => 
-          idx === messagesWithTyping.length - 1 
-            ? finalMsg
-            : msg
-        );
-        setMessages(finalMessages);
-        updateCurrentChat(finalMessages);
-      };
-      
-      animateBotResponse();
+
+      const withBotMessage = (botMsg) => messagesWithTyping.map((msg, idx) =>
+        idx === messagesWithTyping.length - 1 ? botMsg : msg
+      );
+
+      // Show the reply as the server streams it instead of waiting for all of it
+      const response = await streamChat(payload, (textSoFar) => {
+        setMessages(withBotMessage({ sender: 'bot', text: textSoFar, isTyping: true }));
+      });
+
+      const finalMessages = withBotMessage({ sender: 'bot', text: response, isTyping: false });
+      setMessages(finalMessages);
+      updateCurrentChat(finalMessages);
       
     } catch (err) {
       const errorMessage = { sender: 'bot', text: 'Sorry, Twinkle is having trouble responding right now.' };
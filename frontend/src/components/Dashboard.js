@@ -94,6 +94,20 @@ const Dashboard = ({ user, onLogout }) => {
     }
   };
 
+  const handleViewAnalysis = async (analysisId) => {
+    setLoading(true);
+    setError('');
+
+    try {
+      const response = await api.get(`/history/${analysisId}`);
+      setResults(response.data);
+    } catch (error) {
+      setError(error.response?.data?.error || 'Failed to load the analysis');
+    } finally {
+      setLoading(false);
+    }
+  };
+
   const exportToPDF = () => {
     if (!results) return;
     
@@ -509,6 +523,15 @@ const Dashboard = ({ user, onLogout }) => {
                         </div>
                       </div>
                       <div className="analysis-date">{analysis.created_at}</div>
+                      <button 
+                        onClick={() => handleViewAnalysis(analysis.id)}
+                        className="reanalyze-btn"
+                        disabled={loading}
+                        style={{ marginRight: '8px' }}
+                      >
+                        <i className="fas fa-eye" style={{ marginRight: '5px' }}></i>
+                        View
+                      </button>
                       <button 
                         onClick={() => handleReanalyze(analysis.url)}
                         className="reanalyze-btn"
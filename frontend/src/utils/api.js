@@ -36,4 +36,47 @@ api.interceptors.response.use(
   }
 );
 
+// POST to an SSE endpoint and call onDelta with each streamed piece of text.
+// Resolves with the complete reply from the final "done" event.
+export const streamChat = async (payload, onDelta) => {
+  const token = localStorage.getItem('token');
+  const response = await fetch(`${API_BASE_URL}/chatbot/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify(payload),
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Chat stream failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let reply = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const type = (rawEvent.match(/^event: (.*)$/m) || [])[1];
+      const data = (rawEvent.match(/^data: (.*)$/m) || [])[1];
+      if (!data) continue;
+      const parsed = JSON.parse(data);
+      if (type === 'delta') {
+        reply += parsed.text;
+        onDelta(reply);
+      } else if (type === 'done') {
+        reply = parsed.reply;
+      }
+    }
+  }
+  return reply;
+};
+
 export default api;
\ No newline at end of file